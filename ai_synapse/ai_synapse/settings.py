@@ -190,10 +190,159 @@ LOGGING = {
 TAILSCALE_AUTH_KEY = os.getenv("TAILSCALE_AUTH_KEY")
 SSH_USERNAME = os.getenv("SSH_USERNAME", "ubuntu")
 
+# Pooled SSH connections to GPU servers, shared by every instance operation in a process
+SSH_POOL_SETTINGS = {
+    'port': int(os.environ.get('SSH_PORT', '22')),
+    'key_filename': os.environ.get('SSH_KEY_FILENAME') or None,
+    'connect_timeout': int(os.environ.get('SSH_CONNECT_TIMEOUT', '60')),
+    'idle_ttl': int(os.environ.get('SSH_POOL_IDLE_TTL', '300')),
+    'health_check_interval': int(os.environ.get('SSH_POOL_HEALTH_CHECK_INTERVAL', '30')),
+    'keepalive_interval': int(os.environ.get('SSH_POOL_KEEPALIVE_INTERVAL', '30')),
+    'max_sessions_per_connection': int(os.environ.get('SSH_POOL_MAX_SESSIONS', '8')),
+    'max_connections_per_host': int(os.environ.get('SSH_POOL_MAX_CONNECTIONS_PER_HOST', '4')),
+}
+
+# Thread pool behind the asyncio orchestration engine for concurrent instance operations
+ORCHESTRATOR_SETTINGS = {
+    'max_workers': int(os.environ.get('ORCHESTRATOR_MAX_WORKERS', '64')),
+    'max_concurrency_per_server': int(os.environ.get('ORCHESTRATOR_MAX_CONCURRENCY_PER_SERVER', '8')),
+}
+
+# Background job queue for launch/start/stop, run by `manage.py run_job_workers`
+JOB_QUEUE_SETTINGS = {
+    'workers': int(os.environ.get('JOB_WORKERS', '4')),
+    'poll_interval': float(os.environ.get('JOB_POLL_INTERVAL', '1.0')),
+    'heartbeat_interval': float(os.environ.get('JOB_HEARTBEAT_INTERVAL', '15')),
+    'stale_after': float(os.environ.get('JOB_STALE_AFTER', '120')),
+    'max_attempts': int(os.environ.get('JOB_MAX_ATTEMPTS', '3')),
+}
+
+# Limits for the admin bulk launch/start/stop endpoints
+BULK_OPERATION_SETTINGS = {
+    'max_launch_items': int(os.environ.get('BULK_LAUNCH_MAX_ITEMS', '200')),
+    # Default and upper bound for concurrent operations of api/instance/bulk-action/
+    'max_concurrency': int(os.environ.get('BULK_ACTION_MAX_CONCURRENCY', '16')),
+    'max_concurrency_limit': int(os.environ.get('BULK_ACTION_MAX_CONCURRENCY_LIMIT', '64')),
+}
+
+# GPU placement of new instances: 'best_fit' packs servers, 'worst_fit' spreads across them
+SCHEDULER_SETTINGS = {
+    'policy': os.environ.get('SCHEDULER_POLICY', 'best_fit'),
+    # GPUs of packing a server already holding the launched image is worth (0 disables)
+    'locality_weight': float(os.environ.get('SCHEDULER_LOCALITY_WEIGHT', '8')),
+    # GPUs of packing a server with a warm container the launch can take over is worth (0 disables)
+    'warm_weight': float(os.environ.get('SCHEDULER_WARM_WEIGHT', '16')),
+}
+
+# Launches that find no free GPUs wait for capacity, served by per-account fair share
+WAITLIST_SETTINGS = {
+    'usage_window': int(os.environ.get('WAITLIST_USAGE_WINDOW', '86400')),
+    'max_wait': int(os.environ.get('WAITLIST_MAX_WAIT', '86400')),
+    'max_waiting_per_account': int(os.environ.get('WAITLIST_MAX_WAITING_PER_ACCOUNT', '3')),
+    # Launches waiting longer than this go to the head of the waitlist and keep
+    # smaller launches from taking the GPUs they need
+    'starvation_after': int(os.environ.get('WAITLIST_STARVATION_AFTER', '3600')),
+}
+
+# In-memory NumPy index of server capacity used for placement on large fleets
+FLEET_INDEX_SETTINGS = {
+    'enabled': os.environ.get('FLEET_INDEX_ENABLED', 'false').lower() == 'true',
+    'refresh_interval': float(os.environ.get('FLEET_INDEX_REFRESH_INTERVAL', '1')),
+    'reload_interval': float(os.environ.get('FLEET_INDEX_RELOAD_INTERVAL', '30')),
+    'max_staleness': float(os.environ.get('FLEET_INDEX_MAX_STALENESS', '5')),
+}
+
+# Which images each server holds locally, so starts skip `podman pull` for cached
+# images, and the warmer that pre-pulls popular images onto idle servers
+IMAGE_CACHE_SETTINGS = {
+    'enabled': os.environ.get('IMAGE_CACHE_ENABLED', 'true').lower() == 'true',
+    'presence_ttl': int(os.environ.get('IMAGE_CACHE_PRESENCE_TTL', '3600')),
+    'warm_interval': float(os.environ.get('IMAGE_WARM_INTERVAL', '300')),
+    'warm_top_images': int(os.environ.get('IMAGE_WARM_TOP_IMAGES', '5')),
+    'warm_usage_window': int(os.environ.get('IMAGE_WARM_USAGE_WINDOW', '604800')),
+    'warm_max_pulls': int(os.environ.get('IMAGE_WARM_MAX_PULLS', '2')),
+}
+
+# Control-plane checks of custom_registry_image_name against the registry's manifest API
+REGISTRY_SETTINGS = {
+    'enabled': os.environ.get('REGISTRY_CHECK_ENABLED', 'true').lower() == 'true',
+    'ttl': int(os.environ.get('REGISTRY_CHECK_TTL', '300')),
+    'negative_ttl': int(os.environ.get('REGISTRY_CHECK_NEGATIVE_TTL', '30')),
+    'timeout': float(os.environ.get('REGISTRY_CHECK_TIMEOUT', '5')),
+    'refresh_workers': int(os.environ.get('REGISTRY_REFRESH_WORKERS', '8')),
+    # REGISTRY_INSECURE='registry.local:5000,10.0.0.5:5000' are spoken to over plain http
+    'insecure_registries': [item.strip() for item in os.environ.get('REGISTRY_INSECURE', '').split(',') if item.strip()],
+    'platform': os.environ.get('REGISTRY_PLATFORM', 'linux/amd64'),
+    'username': os.environ.get('REGISTRY_USERNAME', ''),
+    'password': os.environ.get('REGISTRY_PASSWORD', ''),
+    # Bytes per second a server pulls at, for pull time estimates
+    'pull_bandwidth': int(os.environ.get('REGISTRY_PULL_BANDWIDTH', str(100 * 1024 * 1024))),
+}
+
+# Booted, unowned containers kept per frequently launched image, which launches
+# take over instead of running a new container (run_warm_pool keeps it filled)
+WARM_POOL_SETTINGS = {
+    'enabled': os.environ.get('WARM_POOL_ENABLED', 'false').lower() == 'true',
+    'interval': float(os.environ.get('WARM_POOL_INTERVAL', '15')),
+    # Pool size per image = launches expected within 'cover_seconds' at its rate over 'rate_window'
+    'rate_window': int(os.environ.get('WARM_POOL_RATE_WINDOW', '3600')),
+    'cover_seconds': int(os.environ.get('WARM_POOL_COVER_SECONDS', '600')),
+    'max_per_image': int(os.environ.get('WARM_POOL_MAX_PER_IMAGE', '4')),
+    'max_per_server': int(os.environ.get('WARM_POOL_MAX_PER_SERVER', '2')),
+    'max_starts': int(os.environ.get('WARM_POOL_MAX_STARTS', '4')),
+    # GPUs each warm container holds; only launches of that many GPUs can take one over
+    'gpus': int(os.environ.get('WARM_POOL_GPUS', '1')),
+}
+
+# Lazy pulls of eStargz / zstd:chunked images. Only enable once every server's
+# storage.conf mounts such layers on demand (stargz-store as an additional layer
+# store); starts then wait for the manifests only and prefetch the image's
+# hot files inside the running container.
+LAZY_PULL_SETTINGS = {
+    'enabled': os.environ.get('LAZY_PULL_ENABLED', 'false').lower() == 'true',
+    'pull_timeout': int(os.environ.get('LAZY_PULL_TIMEOUT', '60')),
+}
+
+# How images reach servers: 'registry' (every server pulls) or 'peer' (servers
+# copy images from a server that already has them, over the LAN)
+DISTRIBUTION_SETTINGS = {
+    'mode': os.environ.get('IMAGE_DISTRIBUTION_MODE', 'registry'),
+    'fanout': int(os.environ.get('IMAGE_DISTRIBUTION_FANOUT', '3')),
+    'seeds': int(os.environ.get('IMAGE_DISTRIBUTION_SEEDS', '1')),
+    # Run as root on the receiving server; {user}@{source} must accept root's ssh
+    # key there. Images are in root's storage, which podman only reads as root.
+    'peer_copy_command': os.environ.get('IMAGE_PEER_COPY_COMMAND', 'sudo podman image scp {user}@{source}::{image}'),
+    'peer_user': os.environ.get('IMAGE_PEER_USER', 'root'),
+}
+
+# Server-sent events stream of instance status changes (api/instance/events/)
+INSTANCE_EVENTS_SETTINGS = {
+    'heartbeat_interval': float(os.environ.get('INSTANCE_EVENTS_HEARTBEAT_INTERVAL', '15')),
+    'listen_timeout': float(os.environ.get('INSTANCE_EVENTS_LISTEN_TIMEOUT', '5')),
+    'max_queued': int(os.environ.get('INSTANCE_EVENTS_MAX_QUEUED', '100')),
+}
+
 # PODMAN_MOUNT_PATHS='/host/data/{username}:/container/data,/host/conf/{username}:/container/conf'
 raw_mount_paths = os.environ.get('PODMAN_MOUNT_PATHS', '')
 parsed_mount_paths = [path.strip() for path in raw_mount_paths.split(',') if path.strip()]
 
+# PODMAN_SERVER_EXECUTORS='gpu-01=api,gpu-02=cli'
+raw_server_executors = os.environ.get('PODMAN_SERVER_EXECUTORS', '')
+parsed_server_executors = dict(
+    item.strip().split('=', 1) for item in raw_server_executors.split(',') if '=' in item
+)
+
+# PODMAN_SERVICE_PORTS='ssh=22,jupyter=8888' (service name = container port, ssh is always published)
+raw_service_ports = os.environ.get('PODMAN_SERVICE_PORTS', '')
+parsed_service_ports = {'ssh': 22}
+parsed_service_ports.update(
+    (name.strip(), int(port)) for name, port in (item.split('=', 1) for item in raw_service_ports.split(',') if '=' in item)
+)
+
+# PODMAN_HOST_PORT_RANGE='20000-29999'
+raw_host_port_range = os.environ.get('PODMAN_HOST_PORT_RANGE', '20000-29999')
+parsed_host_port_range = tuple(int(port) for port in raw_host_port_range.split('-', 1))
+
 PODMAN_SETTINGS = {
     'mount_paths': parsed_mount_paths or [
         "/mnt/data/:/mnt/data/:ro",
@@ -201,7 +350,33 @@ PODMAN_SETTINGS = {
     ],
     'default_shm_size': os.environ.get('PODMAN_DEFAULT_SHM_SIZE', '1G'),
     'default_pid_limit': int(os.environ.get('PODMAN_DEFAULT_PID_LIMIT', '-1')),
+    # CDI name of one GPU, '{index}' is the host device index of the allocated GPU
+    'gpu_device_template': os.environ.get('PODMAN_GPU_DEVICE_TEMPLATE', 'nvidia.com/gpu={index}'),
+    # Container ports published per instance, each on its own host port from
+    # 'host_port_range' so several instances can share a server
+    'service_ports': parsed_service_ports,
+    'host_port_range': parsed_host_port_range,
     'default_registry': os.environ.get('DEFAULT_REGISTRY', 'docker.io'),
     'default_namespace': os.environ.get('DEFAULT_NAMESPACE', 'adityadockerhub6767'),
     'default_image_repository': os.environ.get('DEFAULT_IMAGE_REPOSITORY', 'podman_images'),
+    # Host directory of the files (SSH key, login profile, locale) generated
+    # for each container and mounted into it when it is created
+    'config_dir': os.environ.get('PODMAN_CONFIG_DIR', '/var/lib/synapse/containers'),
+    # uid:gid of the image's 'ubuntu' user, who is given the home volume
+    'home_owner': os.environ.get('PODMAN_HOME_OWNER', '1000:1000'),
+    # 'sequential' runs inspect/pull/run/configure as separate SSH execs,
+    # 'script' ships them as one remote script over a single channel
+    'launch_mode': os.environ.get('PODMAN_LAUNCH_MODE', 'sequential'),
+    # 'cli' shells out to `sudo podman` per operation, 'api' talks to the libpod
+    # REST API of `podman system service` over the pooled SSH connection.
+    # 'server_executors' overrides the default for individual servers by name.
+    'executor': os.environ.get('PODMAN_EXECUTOR', 'cli'),
+    'server_executors': parsed_server_executors,
+    'api_socket_path': os.environ.get('PODMAN_API_SOCKET_PATH', '/run/podman/podman.sock'),
+    'api_version': os.environ.get('PODMAN_API_VERSION', 'v4.0.0'),
+    'api_bridge_command': os.environ.get('PODMAN_API_BRIDGE_COMMAND', 'sudo socat STDIO UNIX-CONNECT:{socket_path}'),
+    # Suspend checkpoints containers with CRIU to the server's local disk;
+    # containers with CUDA processes need CRIU's CUDA plugin on the server.
+    'checkpoint_tcp_established': os.environ.get('PODMAN_CHECKPOINT_TCP_ESTABLISHED', 'true').lower() == 'true',
+    'checkpoint_timeout': int(os.environ.get('PODMAN_CHECKPOINT_TIMEOUT', '600')),
 }
\ No newline at end of file
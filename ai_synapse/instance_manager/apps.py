@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InstanceManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'instance_manager'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,191 @@
+import time
+import random
+import logging
+
+from django.conf import settings
+from paramiko import SSHClient
+from typing import Any, Dict, List, Optional
+
+from .image_cache import pull_server_image
+from .remote import get_connection_pool, get_orchestrator, Operation
+from .remote.streaming import run_command
+
+
+logger = logging.getLogger(__name__)
+
+DISTRIBUTION_MODE_REGISTRY = 'registry'
+DISTRIBUTION_MODE_PEER = 'peer'
+
+# Run on the server that needs the image; podman fetches it from the peer over ssh.
+# Images live in root's storage on both ends, and `podman image scp` reads the
+# storage of the user it logs in as, so it has to reach the peer as root.
+DEFAULT_PEER_COPY_COMMAND = "sudo podman image scp {user}@{source}::{image}"
+DEFAULT_PEER_USER = "root"
+
+
+def _distribution_settings() -> Dict[str, Any]:
+    return getattr(settings, 'DISTRIBUTION_SETTINGS', {})
+
+
+def find_peer(image, exclude=None):
+    """
+    An active server holding the current copy of `image` (see
+    ServerImage.locality()), picked at random so copies spread over the
+    holders. None when no other server has it.
+    """
+    from .models import Server
+
+    holders = [server_id for server_id, score in image_locality(image).items() if score >= 1.0]
+    peers = list(Server.objects.filter(id__in=holders, is_active=True).exclude(pk=getattr(exclude, "pk", None)))
+    return random.choice(peers) if peers else None
+
+
+def image_locality(image) -> Dict[int, float]:
+    from .models import ServerImage
+
+    return ServerImage.locality(image)
+
+
+def peer_copy_command(source, image) -> str:
+    """The command run on a server to copy `image` from `source` (DISTRIBUTION_SETTINGS['peer_copy_command'])."""
+    distribution_settings = _distribution_settings()
+    return distribution_settings.get('peer_copy_command', DEFAULT_PEER_COPY_COMMAND).format(
+        user=distribution_settings.get('peer_user') or DEFAULT_PEER_USER,
+        source=source.ip_address,
+        image=image.custom_registry_image_name,
+    )
+
+
+def copy_from_peer(ssh: SSHClient, source, target, image) -> None:
+    """
+    Copies `image` from `source` to `target` over the LAN by running
+    DISTRIBUTION_SETTINGS['peer_copy_command'] on the target through `ssh`,
+    then records it there with the source's digest (saved and loaded images
+    don't always keep their registry digest).
+    """
+    from .models import ServerImage
+
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout_pull', 300)
+    result = run_command(ssh, peer_copy_command(source, image), timeout=timeout)
+    if result.exit_status != 0:
+        raise Exception(f"Copy of '{image.custom_registry_image_name}' from {source.name} to {target.name} failed: {result.stderr.strip()}")
+    source_copy = ServerImage.objects.filter(server=source, image=image).first()
+    ServerImage.record_copy(target, image, source_copy.digest if source_copy else "")
+    logger.info(f"Copied '{image.custom_registry_image_name}' from {source.name} to {target.name} in {result.elapsed:.1f}s")
+
+
+def fetch_from_peer(ssh: SSHClient, server, image) -> bool:
+    """
+    In 'peer' distribution mode, copies `image` onto `server` from another
+    server that has it. Returns False (so the caller pulls from the registry)
+    when the mode is off, no peer has the image or the copy fails.
+    """
+    if _distribution_settings().get('mode', DISTRIBUTION_MODE_REGISTRY) != DISTRIBUTION_MODE_PEER:
+        return False
+    source = find_peer(image, exclude=server)
+    if source is None:
+        return False
+    try:
+        copy_from_peer(ssh, source, server, image)
+        return True
+    except Exception as e:
+        logger.warning(f"{e}, pulling from the registry instead")
+        return False
+
+
+def copy_server_image(source, target, image) -> None:
+    with get_connection_pool().connection(target.ip_address) as ssh:
+        copy_from_peer(ssh, source, target, image)
+
+
+def distribute_image(
+    image,
+    servers: Optional[list] = None,
+    fanout: Optional[int] = None,
+    seeds: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Rolls `image` out to `servers` (default: every active server) as a
+    fan-out tree. If no server holds it yet, `seeds` servers pull it from the
+    registry; after that each round, every holder copies it to up to `fanout`
+    servers that lack it, so holders multiply by (1 + fanout) per round and
+    40 servers take ~3 rounds instead of 40 registry pulls. Servers whose copy
+    fails pull from the registry at the end. Returns a report of the rollout.
+    """
+    from .models import Server
+
+    distribution_settings = _distribution_settings()
+    fanout = max(1, fanout or distribution_settings.get('fanout', 3))
+    seeds = max(1, seeds or distribution_settings.get('seeds', 1))
+    servers = list(servers if servers is not None else Server.objects.filter(is_active=True).order_by("id"))
+    started = time.monotonic()
+
+    holder_ids = {server_id for server_id, score in image_locality(image).items() if score >= 1.0}
+    holders = list(Server.objects.filter(id__in=holder_ids, is_active=True).order_by("id"))
+    missing = [server for server in servers if server.id not in holder_ids]
+    report: Dict[str, Any] = {
+        "image": image.custom_registry_image_name,
+        "servers": len(servers),
+        "already_present": len(servers) - len(missing),
+        "registry_pulls": 0,
+        "rounds": [],
+        "failed": [],
+    }
+
+    fallback = []
+    if not holders and missing:
+        seeded, failed = _run_round(
+            [Operation(str(server.id), "pull", str(server.id), pull_server_image, server, image, from_peers=False) for server in missing[:seeds]],
+            missing[:seeds], timeout,
+        )
+        report["registry_pulls"] += len(seeded)
+        report["rounds"].append({"kind": "seed", "targets": seeds, "ok": len(seeded), "seconds": round(time.monotonic() - started, 3)})
+        holders, missing = seeded, missing[seeds:]
+        report["failed"] += [server.name for server in failed]
+
+    while missing and holders:
+        round_started = time.monotonic()
+        targets = missing[:len(holders) * fanout]
+        operations = [
+            Operation(str(target.id), "peer_copy", str(target.id), copy_server_image, holders[i % len(holders)], target, image)
+            for i, target in enumerate(targets)
+        ]
+        copied, failed = _run_round(operations, targets, timeout)
+        report["rounds"].append({
+            "kind": "peer", "sources": len(holders), "targets": len(targets), "ok": len(copied),
+            "seconds": round(time.monotonic() - round_started, 3),
+        })
+        holders += copied
+        missing = missing[len(targets):]
+        fallback += failed
+
+    fallback += missing
+    if fallback:
+        pulled, failed = _run_round(
+            [Operation(str(server.id), "pull", str(server.id), pull_server_image, server, image, from_peers=False) for server in fallback],
+            fallback, timeout,
+        )
+        report["registry_pulls"] += len(pulled)
+        report["failed"] += [server.name for server in failed]
+
+    report["seconds"] = round(time.monotonic() - started, 3)
+    logger.info(
+        f"Distributed '{image.custom_registry_image_name}' to {len(servers)} servers in {report['seconds']}s: "
+        f"{len(report['rounds'])} rounds, {report['registry_pulls']} registry pulls, {len(report['failed'])} failed"
+    )
+    return report
+
+
+def _run_round(operations: List[Operation], servers: list, timeout: Optional[float]):
+    """Runs one round of operations concurrently. Returns (succeeded servers, failed servers)."""
+    by_id = {str(server.id): server for server in servers}
+    orchestrator = get_orchestrator()
+    succeeded, failed = [], []
+    for result in orchestrator.run_sync(orchestrator.run_many(operations, timeout=timeout)):
+        if result.ok:
+            succeeded.append(by_id[result.key])
+        else:
+            logger.warning(f"Distribution to {by_id[result.key].name} failed: {result.error}")
+            failed.append(by_id[result.key])
+    return succeeded, failed
@@ -0,0 +1,167 @@
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from typing import Any, Dict, Iterator, Optional, Set
+
+
+logger = logging.getLogger(__name__)
+
+INSTANCE_EVENTS_CHANNEL = "instance_status"
+
+# Put on a subscriber's queue when it fell behind and must reload its snapshot.
+RESYNC = object()
+
+
+def build_instance_event(instance, previous_status: Optional[str] = None) -> Dict[str, Any]:
+    event = instance.serialize()
+    event["account_id"] = instance.account_id
+    event["previous_status"] = previous_status
+    event["emitted_at"] = time.time()
+    return event
+
+
+def publish_instance_event(instance, previous_status: Optional[str] = None) -> None:
+    """
+    Announces an instance status change once the current transaction commits.
+    On Postgres this is a NOTIFY, so every web process (and the job workers'
+    changes) reaches every listener; other databases only reach this process.
+    """
+    payload = json.dumps(build_instance_event(instance, previous_status), cls=DjangoJSONEncoder)
+    if connection.vendor == "postgresql":
+        # NOTIFY is transactional: delivered on commit, dropped on rollback.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [INSTANCE_EVENTS_CHANNEL, payload])
+    else:
+        transaction.on_commit(lambda: get_event_broker().dispatch(json.loads(payload)))
+
+
+def wait_for_notifications(raw, timeout: float) -> Iterator[str]:
+    """Yields NOTIFY payloads of a LISTENing connection as they arrive for up to ``timeout`` seconds."""
+    if callable(getattr(raw, "notifies", None)):
+        # psycopg 3
+        for notify in raw.notifies(timeout=timeout):
+            yield notify.payload
+        return
+    # psycopg2
+    if select.select([raw], [], [], timeout) == ([], [], []):
+        return
+    raw.poll()
+    while raw.notifies:
+        yield raw.notifies.pop(0).payload
+
+
+class Subscription:
+    """One SSE client's queue of events, fed from the broker's listener thread."""
+
+    def __init__(self, account_id: int, all_accounts: bool, loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.account_id = account_id
+        self.all_accounts = all_accounts
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        return self.all_accounts or event.get("account_id") == self.account_id
+
+    def put(self, event: Any) -> None:
+        """Runs on the subscriber's event loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog, the client reloads the full list instead.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InstanceEventBroker:
+    """
+    Fans instance status events out to the SSE subscribers of this process.
+    A single background thread LISTENs on a dedicated Postgres connection
+    while there are subscribers, reconnecting with backoff if it drops.
+    """
+
+    def __init__(self, listen_timeout: float = 5.0, max_queued: int = 100, reconnect_delay: float = 1.0):
+        self.listen_timeout = listen_timeout
+        self.max_queued = max_queued
+        self.reconnect_delay = reconnect_delay
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self.delivered = 0
+
+    def subscribe(self, account_id: int, all_accounts: bool = False) -> Subscription:
+        subscription = Subscription(account_id, all_accounts, asyncio.get_running_loop(), self.max_queued)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if connection.vendor == "postgresql" and (self._listener is None or not self._listener.is_alive()):
+                self._listener = threading.Thread(target=self._listen_loop, name="instance-events-listener", daemon=True)
+                self._listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.wants(event)]
+            self.delivered += len(targets)
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's loop is gone, it will never unsubscribe itself.
+                self.unsubscribe(subscription)
+
+    def _listen_loop(self) -> None:
+        while self.subscriber_count():
+            wrapper = connections.create_connection("default")
+            try:
+                wrapper.ensure_connection()
+                wrapper.set_autocommit(True)
+                raw = wrapper.connection
+                with wrapper.cursor() as cursor:
+                    cursor.execute(f"LISTEN {INSTANCE_EVENTS_CHANNEL}")
+                logger.info(f"Listening for instance events on channel '{INSTANCE_EVENTS_CHANNEL}'")
+                while self.subscriber_count():
+                    for payload in wait_for_notifications(raw, self.listen_timeout):
+                        try:
+                            self.dispatch(json.loads(payload))
+                        except ValueError:
+                            logger.warning(f"Ignoring malformed instance event: {payload[:200]}")
+            except Exception as e:
+                logger.exception(f"Instance event listener failed, reconnecting: {e}")
+                time.sleep(self.reconnect_delay)
+            finally:
+                wrapper.close()
+        logger.info("No instance event subscribers left, listener stopped")
+
+
+_broker: Optional[InstanceEventBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_event_broker() -> InstanceEventBroker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            events_settings = getattr(settings, 'INSTANCE_EVENTS_SETTINGS', {})
+            _broker = InstanceEventBroker(
+                listen_timeout=events_settings.get('listen_timeout', 5.0),
+                max_queued=events_settings.get('max_queued', 100),
+            )
+        return _broker
@@ -7,3 +7,36 @@ class InstanceAlreadyStoppedException(Exception):
     """Raised when an attempt to start an instance fails for technical reasons."""
     # You could add more specific failure exceptions inheriting from this
     pass
+
+
+class RemoteCommandTimeoutException(Exception):
+    """Raised when a remote command does not finish before its deadline."""
+    pass
+
+
+class RemoteCommandCancelledException(Exception):
+    """Raised in an orchestrated operation whose SSH channels were closed because it was cancelled."""
+    pass
+
+
+class PodmanAPIException(Exception):
+    """Raised when the libpod REST API answers with an error response."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+class NoAvailableServerException(Exception):
+    """Raised when no active server can take a new instance."""
+    pass
+
+
+class RegistryException(Exception):
+    """Raised when the image registry can't be reached or answers with an error."""
+    pass
+
+
+class ImageNotFoundException(Exception):
+    """Raised when an image is missing from its registry."""
+    pass
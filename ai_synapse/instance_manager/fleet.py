@@ -0,0 +1,241 @@
+import json
+import time
+import logging
+import threading
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .events import wait_for_notifications
+
+
+logger = logging.getLogger(__name__)
+
+SERVER_STATE_CHANNEL = "server_state"
+
+
+def build_server_state(server, deleted: bool = False) -> Dict[str, Any]:
+    return {
+        "id": server.id,
+        "total_gpus": server.total_gpus,
+        "available_gpus": server.available_gpus,
+        "is_active": server.is_active and not deleted,
+    }
+
+
+def publish_server_state(server, deleted: bool = False) -> None:
+    """
+    Announces a server's new capacity once the current transaction commits.
+    On Postgres this is a NOTIFY picked up by the fleet index of every process;
+    other databases only update this process's index.
+    """
+    state = build_server_state(server, deleted)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [SERVER_STATE_CHANNEL, json.dumps(state)])
+    elif _index is not None:
+        index = _index
+        transaction.on_commit(lambda: index.apply(state))
+
+
+class FleetIndex:
+    """
+    In-memory copy of every server's GPU capacity and health as NumPy arrays,
+    so placement across the whole fleet is one vectorized pass instead of a
+    join over Server and Instance. A background thread keeps it in sync from
+    server_state notifications and periodic full reloads; callers check
+    is_fresh() and use the database when the index has fallen behind.
+    """
+
+    def __init__(self, refresh_interval: float = 1.0, reload_interval: float = 30.0, max_staleness: float = 5.0):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._total = np.empty(0, dtype=np.int32)
+        self._free = np.empty(0, dtype=np.int32)
+        self._active = np.empty(0, dtype=bool)
+        self._positions: Dict[int, int] = {}
+        self._synced_at: Optional[float] = None
+        self._reloaded_at: Optional[float] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.events_applied = 0
+        self.picks = 0
+        self.fallbacks = 0
+
+    def load(self, rows: Iterable[Tuple[int, int, int, bool]]) -> None:
+        """Replaces the index with (id, total_gpus, available_gpus, is_active) rows."""
+        rows = sorted(rows)
+        with self._lock:
+            self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+            self._total = np.array([row[1] for row in rows], dtype=np.int32)
+            self._free = np.array([row[2] for row in rows], dtype=np.int32)
+            self._active = np.array([row[3] for row in rows], dtype=bool)
+            self._positions = {server_id: position for position, server_id in enumerate(self._ids.tolist())}
+            self._reloaded_at = self._synced_at = time.monotonic()
+            self.reloads += 1
+
+    def reload(self) -> None:
+        from .models import Server
+
+        self.load(Server.objects.values_list("id", "total_gpus", "available_gpus", "is_active"))
+
+    def apply(self, state: Dict[str, Any]) -> None:
+        """Applies one server_state event."""
+        with self._lock:
+            position = self._positions.get(state["id"])
+            if position is None:
+                # A server we have not seen yet, insert it in id order.
+                position = int(np.searchsorted(self._ids, state["id"]))
+                self._ids = np.insert(self._ids, position, state["id"])
+                self._total = np.insert(self._total, position, 0)
+                self._free = np.insert(self._free, position, 0)
+                self._active = np.insert(self._active, position, False)
+                self._positions = {server_id: i for i, server_id in enumerate(self._ids.tolist())}
+            self._total[position] = state["total_gpus"]
+            self._free[position] = state["available_gpus"]
+            self._active[position] = state["is_active"]
+            self.events_applied += 1
+
+    def pick(
+        self, n_gpus: int, spread: bool = False, exclude: Iterable[int] = (), bonus: Optional[Dict[int, float]] = None,
+    ) -> Optional[int]:
+        """
+        Returns the id of the active server with at least `n_gpus` free and the
+        fewest free GPUs (best fit), or the most with `spread`. Ties go to the
+        lowest id. Servers in `exclude` are skipped. `bonus` maps server ids to
+        GPUs counted in their favour, as in Server._pick().
+        """
+        with self._lock:
+            self.picks += 1
+            fits = self._active & (self._free >= n_gpus)
+            exclude = list(exclude)
+            if exclude:
+                fits &= ~np.isin(self._ids, np.array(exclude, dtype=np.int64))
+            if not fits.any():
+                return None
+            score = self._free.astype(np.float64)
+            if bonus:
+                boost = np.zeros(self._ids.size)
+                for server_id, value in bonus.items():
+                    position = self._positions.get(server_id)
+                    if position is not None:
+                        boost[position] = value
+                score = score + boost if spread else score - boost
+            if spread:
+                position = np.argmax(np.where(fits, score, -np.inf))
+            else:
+                position = np.argmin(np.where(fits, score, np.inf))
+            return int(self._ids[position])
+
+    def refresh_lag(self) -> Optional[float]:
+        """Seconds since the index was last known to match the database."""
+        synced_at = self._synced_at
+        return None if synced_at is None else time.monotonic() - synced_at
+
+    def is_fresh(self) -> bool:
+        lag = self.refresh_lag()
+        return lag is not None and lag <= self.max_staleness
+
+    def note_fallback(self) -> None:
+        self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lag = self.refresh_lag()
+        with self._lock:
+            servers = int(self._ids.size)
+            active = int(self._active.sum())
+            free_gpus = int(self._free[self._active].sum())
+        return {
+            "servers": servers,
+            "active_servers": active,
+            "free_gpus": free_gpus,
+            "fresh": self.is_fresh(),
+            "refresh_lag_seconds": None if lag is None else round(lag, 3),
+            "max_staleness_seconds": self.max_staleness,
+            "reloads": self.reloads,
+            "events_applied": self.events_applied,
+            "picks": self.picks,
+            "fallbacks": self.fallbacks,
+        }
+
+    def start(self) -> "FleetIndex":
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="fleet-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval * 2)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if connection.vendor == "postgresql":
+                    self._listen()
+                else:
+                    self.reload()
+                    self._stopped.wait(self.refresh_interval)
+            except Exception as e:
+                logger.exception(f"Fleet index refresh failed, retrying: {e}")
+                self._stopped.wait(self.refresh_interval)
+        connections.close_all()
+
+    def _listen(self) -> None:
+        wrapper = connections.create_connection("default")
+        try:
+            wrapper.ensure_connection()
+            wrapper.set_autocommit(True)
+            raw = wrapper.connection
+            with wrapper.cursor() as cursor:
+                cursor.execute(f"LISTEN {SERVER_STATE_CHANNEL}")
+            # Listening before the reload means no change after it is missed.
+            self.reload()
+            logger.info(f"Fleet index loaded {self._ids.size} servers, listening on '{SERVER_STATE_CHANNEL}'")
+            while not self._stopped.is_set():
+                for payload in wait_for_notifications(raw, self.refresh_interval):
+                    try:
+                        self.apply(json.loads(payload))
+                    except (ValueError, KeyError):
+                        logger.warning(f"Ignoring malformed server state: {payload[:200]}")
+                # The connection is alive, so everything up to now has been applied.
+                self._synced_at = time.monotonic()
+                if time.monotonic() - self._reloaded_at >= self.reload_interval:
+                    self.reload()
+        finally:
+            wrapper.close()
+
+
+_index: Optional[FleetIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_fleet_index() -> Optional[FleetIndex]:
+    """The process-wide fleet index, or None when it is disabled."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index_settings = getattr(settings, 'FLEET_INDEX_SETTINGS', {})
+            if not index_settings.get('enabled', False):
+                return None
+            _index = FleetIndex(
+                refresh_interval=index_settings.get('refresh_interval', 1.0),
+                reload_interval=index_settings.get('reload_interval', 30.0),
+                max_staleness=index_settings.get('max_staleness', 5.0),
+            ).start()
+        return _index
+
+
+def set_fleet_index(index: Optional[FleetIndex]) -> None:
+    global _index
+    with _index_lock:
+        _index = index
@@ -0,0 +1,199 @@
+import json
+import logging
+import threading
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+from paramiko import SSHClient
+from typing import Any, Dict, List, Optional
+
+from .remote import get_connection_pool, get_podman_api_client, PodmanAPIExecutor
+from .remote.streaming import run_command
+
+
+logger = logging.getLogger(__name__)
+
+
+def list_server_images(ssh: SSHClient, server) -> List[Dict[str, Any]]:
+    """The images in `server`'s local Podman storage, as `podman images --format json` reports them."""
+    from .models.instance import get_podman_executor, PODMAN_EXECUTOR_API
+
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+    if get_podman_executor(server.name) == PODMAN_EXECUTOR_API:
+        return PodmanAPIExecutor(get_podman_api_client(), ssh).list_images(server.name, timeout=timeout)
+    result = run_command(ssh, "sudo podman images --format json", timeout=timeout)
+    if result.exit_status != 0:
+        raise Exception(f"Failed to list images on {server.name}: {result.stderr.strip()}")
+    return json.loads(result.stdout or "[]")
+
+
+def sweep_server(server, ssh: Optional[SSHClient] = None, pulled=None) -> int:
+    """Records which Images `server` holds. Returns how many were found."""
+    from .models import ServerImage
+
+    if ssh is None:
+        with get_connection_pool().connection(server.ip_address) as ssh:
+            entries = list_server_images(ssh, server)
+    else:
+        entries = list_server_images(ssh, server)
+    return ServerImage.record_images(server, entries, pulled=pulled)
+
+
+def pull_server_image(server, image, from_peers: bool = True) -> None:
+    """
+    Pulls `image` onto `server` and records it there. With `from_peers` it is
+    copied from another server instead when distribution.fetch_from_peer() can.
+    """
+    from .distribution import fetch_from_peer
+    from .models.instance import get_podman_executor, PODMAN_EXECUTOR_API
+
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout_pull', 300)
+    reference = image.custom_registry_image_name
+    with get_connection_pool().connection(server.ip_address) as ssh:
+        if from_peers and fetch_from_peer(ssh, server, image):
+            return
+        if get_podman_executor(server.name) == PODMAN_EXECUTOR_API:
+            PodmanAPIExecutor(get_podman_api_client(), ssh).ensure_image_pulled(reference, server.name, timeout=timeout)
+        else:
+            result = run_command(ssh, f"sudo podman pull --quiet {reference}", timeout=timeout)
+            if result.exit_status != 0:
+                raise Exception(f"Image '{reference}' not found or pull failed: {result.stderr.strip()}")
+        sweep_server(server, ssh, pulled=image)
+
+
+def popular_images(limit: int, window: float) -> list:
+    """Available Images with the most instances created in the last `window` seconds."""
+    from .models import Image
+
+    since = timezone.now() - timedelta(seconds=window)
+    return list(
+        Image.objects.filter(is_available=True, instances__created_at__gte=since)
+        .annotate(launches=Count("instances"))
+        .order_by("-launches", "name")[:limit]
+    )
+
+
+def idle_servers() -> list:
+    """Active servers with free GPUs that are not in the middle of starting an instance."""
+    from .models import Server
+    from .models.instance import InstanceStatus
+
+    return list(
+        Server.objects.filter(is_active=True, available_gpus__gt=0)
+        .exclude(instances__status=InstanceStatus.PENDING)
+        .distinct().order_by("id")
+    )
+
+
+class ImageWarmer:
+    """
+    Keeps the ServerImage cache in sync with what servers actually hold and
+    pre-pulls the most launched images onto idle servers, so launches there
+    skip the pull. Each cycle refreshes expired registry answers of the
+    catalog, sweeps every active server with `podman images`, then pulls at
+    most `max_pulls` missing images.
+    """
+
+    def __init__(
+        self,
+        interval: float = 300.0,
+        top_images: int = 5,
+        usage_window: float = 7 * 86400,
+        max_pulls: int = 2,
+    ):
+        self.interval = interval
+        self.top_images = top_images
+        self.usage_window = usage_window
+        self.max_pulls = max_pulls
+        self.sweeps = 0
+        self.pulls = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "ImageWarmer":
+        cache_settings = getattr(settings, 'IMAGE_CACHE_SETTINGS', {})
+        options = {
+            "interval": cache_settings.get('warm_interval', 300.0),
+            "top_images": cache_settings.get('warm_top_images', 5),
+            "usage_window": cache_settings.get('warm_usage_window', 7 * 86400),
+            "max_pulls": cache_settings.get('warm_max_pulls', 2),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def sweep(self) -> int:
+        """Refreshes the cache of every active server. Returns the number swept."""
+        from .models import Server
+
+        swept = 0
+        for server in Server.objects.filter(is_active=True).order_by("id"):
+            try:
+                sweep_server(server)
+                swept += 1
+            except Exception as e:
+                logger.warning(f"Image sweep of {server.name} failed: {e}")
+        self.sweeps += swept
+        return swept
+
+    def warm(self) -> int:
+        """Pulls popular images missing from idle servers. Returns the number of pulls."""
+        from .models import ServerImage
+
+        pulls = 0
+        servers = idle_servers()
+        for image in popular_images(self.top_images, self.usage_window):
+            for server in servers:
+                if pulls >= self.max_pulls:
+                    return pulls
+                if ServerImage.is_present(server, image):
+                    continue
+                logger.info(f"Pre-pulling '{image.custom_registry_image_name}' onto idle server {server.name}")
+                try:
+                    pull_server_image(server, image)
+                    pulls += 1
+                    self.pulls += 1
+                except Exception as e:
+                    logger.warning(f"Pre-pull of '{image.custom_registry_image_name}' onto {server.name} failed: {e}")
+        return pulls
+
+    def run_once(self) -> Dict[str, int]:
+        from .models import Image
+
+        # Registry answers first, so only images that exist are pre-pulled.
+        checked = Image.refresh_registry()
+        return {"checked": checked, "swept": self.sweep(), "pulled": self.warm()}
+
+    def start(self) -> "ImageWarmer":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="image-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait(self) -> None:
+        while not self._stop.wait(1.0):
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                result = self.run_once()
+                logger.info(
+                    f"Image warmer checked {result['checked']} images, swept {result['swept']} servers "
+                    f"and pre-pulled {result['pulled']} images"
+                )
+            except Exception as e:
+                logger.exception(f"Image warmer cycle failed: {e}")
+            finally:
+                close_old_connections()
+            self._stop.wait(self.interval)
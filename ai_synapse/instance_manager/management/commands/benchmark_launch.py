@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from instance_manager.simulation import FakePodmanHost
+from instance_manager.simulation.benchmark import run_launch_benchmark
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark each phase of Instance.launch() against a simulated Podman host"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=10, help="Number of instances to launch")
+        parser.add_argument("--mode", choices=["sequential", "script"], default="sequential", help="Podman launch mode")
+        parser.add_argument("--handshake-latency", type=float, default=0.0, help="Seconds added to each SSH handshake")
+        parser.add_argument("--exec-latency", type=float, default=0.0, help="Seconds added to every SSH exec channel (network round trip)")
+        parser.add_argument("--command-latency", type=float, default=0.0, help="Seconds added to every podman command")
+        parser.add_argument("--pull-latency", type=float, default=0.0, help="Seconds spent pulling an image")
+        parser.add_argument("--pull-layers", type=int, default=4, help="Layers reported by each pull")
+        parser.add_argument("--output-size", type=int, default=0, help="Extra bytes of output per pulled layer")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability that any podman command fails")
+        parser.add_argument("--cold", action="store_true", help="Close pooled SSH connections before every launch")
+        parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+
+    def handle(self, *args, **options):
+        subcommands = ["inspect", "image-exists", "pull", "run", "exec", "stop", "start", "rm"]
+        latency = {name: options["command_latency"] for name in subcommands}
+        latency["pull"] = options["pull_latency"] or options["command_latency"]
+        host = FakePodmanHost(
+            latency=latency,
+            failure_rate={name: options["failure_rate"] for name in subcommands},
+            pull_layers=options["pull_layers"],
+            output_size=options["output_size"],
+        )
+
+        report = {}
+        try:
+            with transaction.atomic():
+                report = run_launch_benchmark(
+                    iterations=options["iterations"],
+                    launch_mode=options["mode"],
+                    host=host,
+                    handshake_latency=options["handshake_latency"],
+                    exec_latency=options["exec_latency"],
+                    cold_connections=options["cold"],
+                )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['iterations']} launches, mode={report['launch_mode']}, "
+            f"ssh execs={report['ssh_execs']}, failures={len(report['failures'])}"
+        )
+        self.stdout.write(f"{'phase':<15}{'count':>7}{'mean ms':>11}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}")
+        for name, stats in report["phases"].items():
+            self.stdout.write(
+                f"{name:<15}{stats['count']:>7}{stats['mean_ms']:>11.2f}{stats['p50_ms']:>11.2f}{stats['p95_ms']:>11.2f}{stats['max_ms']:>11.2f}"
+            )
+        pool = report["pool"]
+        self.stdout.write(
+            f"ssh pool: hits={pool['hits']} misses={pool['misses']} handshakes={pool['handshakes']} "
+            f"avg handshake={pool['handshake_seconds_avg'] * 1000:.2f}ms"
+        )
+        for failure in report["failures"][:5]:
+            self.stdout.write(self.style.WARNING(failure))
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from instance_manager.distribution import distribute_image
+from instance_manager.models import Image, Server
+
+
+class Command(BaseCommand):
+    help = "Roll an image out to servers as a fan-out tree of server-to-server copies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("image", help="Image id or tag")
+        parser.add_argument("--fanout", type=int, help="Servers each holder copies the image to per round")
+        parser.add_argument("--seeds", type=int, help="Servers that pull from the registry when none holds the image")
+        parser.add_argument("--server", action="append", help="Only these servers (by name, repeatable)")
+        parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+
+    def handle(self, *args, **options):
+        lookup = {"id": int(options["image"])} if options["image"].isdigit() else {"tag": options["image"]}
+        image = Image.objects.filter(**lookup).first()
+        if image is None:
+            raise CommandError(f"Image '{options['image']}' not found")
+
+        servers = None
+        if options["server"]:
+            servers = list(Server.objects.filter(name__in=options["server"], is_active=True).order_by("id"))
+            unknown = set(options["server"]) - {server.name for server in servers}
+            if unknown:
+                raise CommandError(f"Unknown or inactive servers: {', '.join(sorted(unknown))}")
+
+        report = distribute_image(image, servers=servers, fanout=options["fanout"], seeds=options["seeds"])
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for i, stage in enumerate(report["rounds"]):
+            self.stdout.write(f"Round {i}: {stage['kind']} {stage['ok']}/{stage['targets']} in {stage['seconds']}s")
+        self.stdout.write(
+            f"{report['image']} on {report['servers']} servers in {report['seconds']}s "
+            f"({report['already_present']} already had it, {report['registry_pulls']} registry pulls, "
+            f"{len(report['failed'])} failed)"
+        )
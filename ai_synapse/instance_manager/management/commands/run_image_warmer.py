@@ -0,0 +1,41 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from instance_manager.image_cache import ImageWarmer
+
+
+class Command(BaseCommand):
+    help = "Refresh registry checks, sweep servers for cached images and pre-pull popular images onto idle servers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Seconds between warming cycles")
+        parser.add_argument("--top-images", type=int, help="How many of the most launched images to keep warm")
+        parser.add_argument("--max-pulls", type=int, help="Pre-pulls per cycle")
+        parser.add_argument("--once", action="store_true", help="Run a single cycle, then exit")
+
+    def handle(self, *args, **options):
+        warmer = ImageWarmer.from_settings(
+            interval=options["interval"],
+            top_images=options["top_images"],
+            max_pulls=options["max_pulls"],
+        )
+
+        if options["once"]:
+            result = warmer.run_once()
+            self.stdout.write(
+                f"Checked {result['checked']} images, swept {result['swept']} servers, pre-pulled {result['pulled']} images"
+            )
+            return
+
+        def _shutdown(signum, frame):
+            self.stdout.write("Stopping image warmer...")
+            warmer.stop()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        warmer.start()
+        self.stdout.write(f"Image warmer running every {warmer.interval}s")
+        warmer.wait()
+        self.stdout.write(f"Image warmer stopped after {warmer.pulls} pre-pulls")
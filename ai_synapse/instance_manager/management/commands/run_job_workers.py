@@ -0,0 +1,41 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from instance_manager.workers import JobWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers that execute queued launch/start/stop jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, help="Worker threads in this process")
+        parser.add_argument("--poll-interval", type=float, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--heartbeat-interval", type=float, help="Seconds between heartbeats of running jobs")
+        parser.add_argument("--stale-after", type=float, help="Seconds without a heartbeat before a job is requeued")
+        parser.add_argument("--once", action="store_true", help="Run queued jobs until the queue is empty, then exit")
+
+    def handle(self, *args, **options):
+        pool = JobWorkerPool.from_settings(
+            workers=options["workers"],
+            poll_interval=options["poll_interval"],
+            heartbeat_interval=options["heartbeat_interval"],
+            stale_after=options["stale_after"],
+        )
+
+        if options["once"]:
+            processed = pool.drain()
+            self.stdout.write(f"Processed {processed} jobs")
+            return
+
+        def _shutdown(signum, frame):
+            self.stdout.write("Stopping job workers after their current jobs...")
+            pool.stop()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        pool.start()
+        self.stdout.write(f"Started {pool.workers} job workers as {pool.worker_prefix}")
+        pool.wait()
+        self.stdout.write(f"Job workers stopped after {pool.processed} jobs")
@@ -0,0 +1,41 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from instance_manager.warm_pool import WarmPool
+
+
+class Command(BaseCommand):
+    help = "Keep booted containers of frequently launched images on idle servers for launches to take over"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Seconds between pool cycles")
+        parser.add_argument("--max-per-image", type=int, help="Most warm containers of one image")
+        parser.add_argument("--max-starts", type=int, help="Warm containers started per cycle")
+        parser.add_argument("--once", action="store_true", help="Run a single cycle, then exit")
+
+    def handle(self, *args, **options):
+        pool = WarmPool.from_settings(
+            interval=options["interval"],
+            max_per_image=options["max_per_image"],
+            max_starts=options["max_starts"],
+        )
+
+        if options["once"]:
+            result = pool.run_once()
+            self.stdout.write(
+                f"Dropped {result['reconciled']} lost containers, retired {result['retired']}, started {result['started']}"
+            )
+            return
+
+        def _shutdown(signum, frame):
+            self.stdout.write("Stopping warm pool...")
+            pool.stop()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        pool.start()
+        self.stdout.write(f"Warm pool running every {pool.interval}s")
+        pool.wait()
+        self.stdout.write(f"Warm pool stopped after starting {pool.starts} containers")
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from instance_manager.simulation.placement import export_instance_trace, generate_trace, parse_fleet, replay_trace
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Replay a launch/stop trace against a virtual fleet with the real placement code"
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--trace", help="JSON lines trace file to replay")
+        source.add_argument("--synthetic", type=int, metavar="LAUNCHES", help="Replay a generated trace with this many launches")
+        source.add_argument("--export", metavar="PATH", help="Write the trace of recorded Instance history to PATH and exit")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic trace")
+        parser.add_argument("--fleet", default="16x8", help="Virtual fleet as COUNTxGPUS[,COUNTxGPUS...]")
+        parser.add_argument("--policy", action="append", choices=["best_fit", "worst_fit"], help="Placement policy, repeat to compare")
+        parser.add_argument("--json", action="store_true", help="Print the raw JSON report")
+
+    def handle(self, *args, **options):
+        if options["export"]:
+            trace = export_instance_trace()
+            with open(options["export"], "w") as f:
+                for event in trace:
+                    f.write(json.dumps(event) + "\n")
+            self.stdout.write(f"Wrote {len(trace)} events to {options['export']}")
+            return
+
+        if options["trace"]:
+            with open(options["trace"]) as f:
+                trace = [json.loads(line) for line in f if line.strip()]
+        else:
+            trace = generate_trace(launches=options["synthetic"], seed=options["seed"])
+        try:
+            fleet = parse_fleet(options["fleet"])
+        except ValueError:
+            raise CommandError(f"Invalid fleet '{options['fleet']}', expected e.g. 16x8,4x4")
+
+        reports = []
+        for policy in options["policy"] or [None]:
+            try:
+                with transaction.atomic():
+                    reports.append(replay_trace(trace, fleet, policy=policy))
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        self.stdout.write(f"{len(trace)} events on {len(fleet)} servers ({sum(fleet)} GPUs)")
+        self.stdout.write(
+            f"{'policy':<11}{'placed':>8}{'queued':>8}{'util':>8}{'frag':>8}"
+            f"{'wait p50 s':>12}{'wait p95 s':>12}{'sched p50 ms':>14}{'sched p99 ms':>14}"
+        )
+        for report in reports:
+            wait, latency = report["queue_wait_seconds"], report["scheduling_latency_ms"]
+            self.stdout.write(
+                f"{report['policy']:<11}{report['placed']:>8}{report['queued']:>8}"
+                f"{report['gpu_utilization']:>8.2%}{report['fragmentation']:>8.2%}"
+                f"{wait['p50']:>12.1f}{wait['p95']:>12.1f}{latency['p50']:>14.3f}{latency['p99']:>14.3f}"
+            )
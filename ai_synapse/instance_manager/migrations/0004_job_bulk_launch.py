@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0003_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('launch', 'Launch'), ('start', 'Start'), ('stop', 'Stop'), ('bulk_launch', 'Bulk launch')], max_length=20),
+        ),
+    ]
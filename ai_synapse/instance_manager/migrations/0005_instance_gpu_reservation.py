@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0004_job_bulk_launch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instance',
+            name='reserved_gpus',
+            field=models.IntegerField(default=0, help_text='GPUs this instance currently holds on its server.'),
+        ),
+        migrations.AlterField(
+            model_name='instance',
+            name='instance_ip',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0005_instance_gpu_reservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='instance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0006_instance_updated_at_datetime'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('waiting', 'Waiting for capacity'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0007_job_waiting_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instance',
+            name='gpu_indices',
+            field=models.JSONField(blank=True, default=list, help_text='Device indices of the GPUs it holds.'),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='allocated_gpu_indices',
+            field=models.JSONField(blank=True, default=list, help_text='GPU device indices held by instances.'),
+        ),
+    ]
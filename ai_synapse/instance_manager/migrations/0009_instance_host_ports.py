@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:42
+
+from django.db import migrations, models
+
+
+def record_legacy_ssh_port(apps, schema_editor):
+    # Containers started before port allocation all published ssh on 2222.
+    Instance = apps.get_model('instance_manager', 'Instance')
+    Instance.objects.filter(status__in=['pending', 'running']).update(host_ports={'ssh': 2222})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0008_gpu_device_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instance',
+            name='host_ports',
+            field=models.JSONField(blank=True, default=dict, help_text="Host port published for each service, e.g. {'ssh': 20000}."),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='allocated_host_ports',
+            field=models.JSONField(blank=True, default=list, help_text='Host ports published by instances.'),
+        ),
+        migrations.RunPython(record_legacy_ssh_port, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0009_instance_host_ports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServerImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(blank=True, default='', max_length=100)),
+                ('pulled_at', models.DateTimeField(blank=True, help_text='When we last pulled it onto the server.', null=True)),
+                ('verified_at', models.DateTimeField(help_text='When the server last reported having it.')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='server_copies', to='instance_manager.image')),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='instance_manager.server')),
+            ],
+            options={
+                'unique_together': {('server', 'image')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0010_server_image_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='registry_checked_at',
+            field=models.DateTimeField(blank=True, help_text='When the registry was last asked about it.', null=True),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='registry_digest',
+            field=models.CharField(blank=True, default='', help_text='Manifest digest last seen in the registry.', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='registry_size',
+            field=models.BigIntegerField(blank=True, help_text='Bytes a pull downloads (layers and config).', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0011_image_registry_check'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='image_format',
+            field=models.CharField(choices=[('oci', 'OCI (gzip layers)'), ('estargz', 'eStargz'), ('zstd:chunked', 'zstd:chunked')], default='oci', help_text='Layer format the image was pushed in; eStargz and zstd:chunked images can be pulled lazily.', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='prefetch_files',
+            field=models.JSONField(blank=True, default=list, help_text='Paths inside the image read in the background after a lazy start, e.g. the CUDA and Python libraries.'),
+        ),
+    ]
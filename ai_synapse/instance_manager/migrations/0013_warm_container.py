@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0012_image_lazy_pull'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WarmContainer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('container_name', models.CharField(max_length=100, unique=True)),
+                ('container_id', models.CharField(blank=True, default='', max_length=100)),
+                ('host_ports', models.JSONField(blank=True, default=dict, help_text="Host port published for each service, e.g. {'ssh': 20000}.")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='warm_containers', to='instance_manager.image')),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='warm_containers', to='instance_manager.server')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0013_warm_container'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instance',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict, help_text="GPU indices and host ports a suspended instance's container was checkpointed with."),
+        ),
+        migrations.AlterField(
+            model_name='instance',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('stopped', 'Stopped'), ('suspended', 'Suspended')], default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('launch', 'Launch'), ('start', 'Start'), ('stop', 'Stop'), ('suspend', 'Suspend'), ('bulk_launch', 'Bulk launch')], max_length=20),
+        ),
+    ]
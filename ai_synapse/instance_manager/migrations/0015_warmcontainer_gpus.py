@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0014_instance_suspend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warmcontainer',
+            name='gpu_indices',
+            field=models.JSONField(blank=True, default=list, help_text='Device indices of the GPUs it holds.'),
+        ),
+        migrations.AddField(
+            model_name='warmcontainer',
+            name='n_gpus',
+            field=models.IntegerField(default=0),
+        ),
+    ]
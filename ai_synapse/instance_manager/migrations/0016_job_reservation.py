@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0015_warmcontainer_gpus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='reservation',
+            field=models.JSONField(blank=True, default=dict, help_text='GPUs and host ports a running launch holds until its instance exists.'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:37
+
+import re
+
+from django.db import migrations, models
+
+
+def record_legacy_container_names(apps, schema_editor):
+    # Containers created before per-instance names were named after their user.
+    Instance = apps.get_model('instance_manager', 'Instance')
+    for instance in Instance.objects.select_related('account'):
+        instance.container_name = re.sub(r"[._]", "-", f"{instance.account.username}-container")
+        instance.save(update_fields=['container_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instance_manager', '0016_job_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instance',
+            name='container_name',
+            field=models.CharField(blank=True, default='', help_text='Name of a container created before they were named per instance, see _get_container_name().', max_length=100),
+        ),
+        migrations.RunPython(record_legacy_container_names, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
 from .instance import Instance
 from .server import Server
-from .image import Image
\ No newline at end of file
+from .image import Image
+from .server_image import ServerImage
+from .warm_container import WarmContainer
+from .job import Job
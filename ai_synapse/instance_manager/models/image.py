@@ -1,13 +1,30 @@
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
-from typing import List
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from typing import List, Optional
+
+from ..exceptions import RegistryException
+from ..remote.registry import ManifestInfo, get_registry_client
 
 
 logger = logging.getLogger(__name__)
 
 
+class ImageFormat(models.TextChoices):
+    OCI = 'oci', _('OCI (gzip layers)')
+    ESTARGZ = 'estargz', _('eStargz')
+    ZSTD_CHUNKED = 'zstd:chunked', _('zstd:chunked')
+
+
+# Formats whose layers a server's lazy layer store can mount before they are downloaded.
+LAZY_IMAGE_FORMATS = (ImageFormat.ESTARGZ, ImageFormat.ZSTD_CHUNKED)
+
+
 class Image(models.Model):
     name = models.CharField(
         max_length=255,
@@ -44,6 +61,17 @@ class Image(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_available = models.BooleanField(default=False) # only mark True if the image is available in the registry
+    registry_digest = models.CharField(max_length=100, blank=True, default="", help_text="Manifest digest last seen in the registry.")
+    registry_size = models.BigIntegerField(null=True, blank=True, help_text="Bytes a pull downloads (layers and config).")
+    registry_checked_at = models.DateTimeField(null=True, blank=True, help_text="When the registry was last asked about it.")
+    image_format = models.CharField(
+        max_length=20, choices=ImageFormat.choices, default=ImageFormat.OCI,
+        help_text="Layer format the image was pushed in; eStargz and zstd:chunked images can be pulled lazily."
+    )
+    prefetch_files = models.JSONField(
+        default=list, blank=True,
+        help_text="Paths inside the image read in the background after a lazy start, e.g. the CUDA and Python libraries."
+    )
     custom_registry_image_name = models.CharField(
         max_length=512, # Allow for long names like registry/namespace/repo:tag
         unique=True,
@@ -69,6 +97,8 @@ class Image(models.Model):
         cuda_version: str = "",
         cudnn_version: str = "",
         is_available: bool = False,
+        image_format: str = ImageFormat.OCI,
+        prefetch_files: Optional[List[str]] = None,
     ) -> None:
         default_registry = settings.PODMAN_SETTINGS["default_registry"]
         default_namespace = settings.PODMAN_SETTINGS["default_namespace"]
@@ -84,9 +114,114 @@ class Image(models.Model):
             cudnn_version=cudnn_version,
             custom_registry_image_name=custom_registry_image_name,
             is_available=is_available,
+            image_format=image_format,
+            prefetch_files=prefetch_files or [],
         )
         logger.info(f"Image {name} with tag {tag} created with description {description}")
 
+    @property
+    def pulls_lazily(self) -> bool:
+        """Whether starts may run the image before its layers are downloaded (see LAZY_PULL_SETTINGS)."""
+        return self.image_format in LAZY_IMAGE_FORMATS and getattr(settings, 'LAZY_PULL_SETTINGS', {}).get('enabled', False)
+
     @classmethod
     def list_all(cls) -> List["Image"]:
-        return list(cls.objects.values())
\ No newline at end of file
+        return list(cls.objects.values())
+
+    def check_registry(self, force: bool = False) -> Optional[bool]:
+        """
+        Whether the image exists in its registry, from a HEAD of its manifest.
+        Answers are cached on the row for REGISTRY_SETTINGS['ttl'] seconds
+        ('negative_ttl' for missing images, so a fresh push shows up quickly)
+        and update `is_available`. Returns None when it can't be known: checks
+        are disabled, the image is local-only or the registry is unreachable.
+        """
+        if not self._registry_checked():
+            return None
+        if not force and self._registry_answer_fresh():
+            return self.is_available
+        try:
+            info = get_registry_client().check(self.custom_registry_image_name, known=self._known_manifest())
+        except RegistryException as e:
+            logger.warning(f"Could not check '{self.custom_registry_image_name}' in its registry: {e}")
+            return None
+        self._record_manifest(info)
+        return self.is_available
+
+    @classmethod
+    def refresh_registry(cls, images: Optional[List["Image"]] = None, force: bool = False) -> int:
+        """
+        Re-checks every image whose registry answer has expired (or all of
+        `images` with `force`), asking the registry concurrently. Returns the
+        number of images checked.
+        """
+        registry_settings = getattr(settings, 'REGISTRY_SETTINGS', {})
+        if images is None:
+            images = list(cls.objects.all())
+        images = [image for image in images if image._registry_checked() and (force or not image._registry_answer_fresh())]
+        if not images:
+            return 0
+
+        client = get_registry_client()
+
+        def _check(image: "Image"):
+            try:
+                return client.check(image.custom_registry_image_name, known=image._known_manifest())
+            except RegistryException as e:
+                return e
+
+        # Only the HTTP requests run on the pool, rows are written from this thread.
+        with ThreadPoolExecutor(max_workers=registry_settings.get('refresh_workers', 8)) as pool:
+            answers = list(pool.map(_check, images))
+        checked = 0
+        for image, answer in zip(images, answers):
+            if isinstance(answer, RegistryException):
+                logger.warning(f"Could not check '{image.custom_registry_image_name}' in its registry: {answer}")
+                continue
+            image._record_manifest(answer)
+            checked += 1
+        logger.info(f"Checked {checked} of {len(images)} images against their registries")
+        return checked
+
+    def estimated_pull_seconds(self, server=None) -> Optional[float]:
+        """
+        Seconds a pull of this image should take, from its registry size and
+        REGISTRY_SETTINGS['pull_bandwidth']. On a `server` that already holds
+        the image (or its base) only the missing part is counted. None when
+        the size is unknown.
+        """
+        from .server_image import ServerImage
+
+        if self.registry_size is None:
+            return None
+        local = ServerImage.locality(self).get(server.id, 0.0) if server is not None else 0.0
+        bandwidth = getattr(settings, 'REGISTRY_SETTINGS', {}).get('pull_bandwidth', 100 * 1024 * 1024)
+        return round(self.registry_size * (1 - local) / bandwidth, 1)
+
+    def _registry_checked(self) -> bool:
+        if not getattr(settings, 'REGISTRY_SETTINGS', {}).get('enabled', True):
+            return False
+        # 'localhost/...' names are local-only images that no registry serves.
+        return not self.custom_registry_image_name.startswith("localhost/")
+
+    def _registry_answer_fresh(self) -> bool:
+        if self.registry_checked_at is None:
+            return False
+        registry_settings = getattr(settings, 'REGISTRY_SETTINGS', {})
+        ttl = registry_settings.get('ttl', 300) if self.is_available else registry_settings.get('negative_ttl', 30)
+        return timezone.now() - self.registry_checked_at < timedelta(seconds=ttl)
+
+    def _known_manifest(self) -> Optional[ManifestInfo]:
+        if not self.registry_digest or self.registry_size is None:
+            return None
+        return ManifestInfo(self.registry_digest, self.registry_size, 0)
+
+    def _record_manifest(self, info: Optional[ManifestInfo]) -> None:
+        if info is None and self.is_available:
+            logger.warning(f"Image '{self.custom_registry_image_name}' is no longer in its registry")
+        self.is_available = info is not None
+        if info is not None:
+            self.registry_digest = info.digest
+            self.registry_size = info.size
+        self.registry_checked_at = timezone.now()
+        self.save(update_fields=["is_available", "registry_digest", "registry_size", "registry_checked_at", "updated_at"])
\ No newline at end of file
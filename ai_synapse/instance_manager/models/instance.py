@@ -2,23 +2,50 @@ import paramiko
 import logging
 import subprocess
 import re
+import json
+import shlex
 import uuid
+import hashlib
 
 from django.db import models, transaction, IntegrityError
 from django.utils.translation import gettext_lazy as _
 from paramiko import SSHClient
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, ContextManager
 
 from user_manager.models import Account
 
 from .server import Server
 from .image import Image
+from .server_image import ServerImage
+from .warm_container import WarmContainer
+
+from ..utils import timed_phase, record_phase
+from ..image_cache import sweep_server
+from ..distribution import fetch_from_peer
+from ..warm_pool import (
+    adopt_warm_container,
+    claim_setup_command,
+    discard_claimed_warm_container,
+    drop_warm_container,
+    release_staging,
+    warm_pool_enabled,
+)
+from ..remote import get_connection_pool, get_orchestrator, get_podman_api_client, Operation, OperationResult, PodmanAPIExecutor
+from ..remote.streaming import run_command, parse_pull_progress, PullProgressEvent
+from ..remote.launch_script import (
+    build_launch_script,
+    parse_launch_result,
+    OUTCOME_STARTED,
+    OUTCOME_ALREADY_RUNNING,
+)
 
 from ..exceptions import (
     InstanceAlreadyRunningException, 
-    InstanceAlreadyStoppedException
+    InstanceAlreadyStoppedException,
+    NoAvailableServerException,
+    ImageNotFoundException,
 )
 
 
@@ -27,10 +54,44 @@ logger = logging.getLogger(__name__)
 def generate_instance_id():
     return f"i-{uuid.uuid4().hex[:17]}" 
 
+LAUNCH_MODE_SEQUENTIAL = 'sequential'
+LAUNCH_MODE_SCRIPT = 'script'
+
+PODMAN_EXECUTOR_CLI = 'cli'
+PODMAN_EXECUTOR_API = 'api'
+
+# Label holding the hash of the spec a container was created from, see _reusable_container().
+SPEC_LABEL = 'synapse.spec'
+# States of a container that `podman start` brings back up.
+STARTABLE_CONTAINER_STATES = ('created', 'configured', 'exited', 'stopped')
+# Files generated on the host for each container (see _container_config_files())
+# and the paths they are mounted at, read-only.
+CONTAINER_CONFIG_MOUNTS = {
+    'authorized_keys': '/etc/synapse/authorized_keys',
+    'sshd.conf': '/etc/ssh/sshd_config.d/synapse.conf',
+    'profile.sh': '/etc/profile.d/synapse.sh',
+    'locale': '/etc/default/locale',
+}
+# Home directory of the image's login user, prepared by _home_setup_steps().
+CONTAINER_HOME = "/home/ubuntu"
+
+
+def get_podman_executor(server_name: str | None = None) -> str:
+    """The Podman backend configured for a server: 'cli' or 'api'."""
+    podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
+    executor = podman_settings.get('executor', PODMAN_EXECUTOR_CLI)
+    if server_name:
+        executor = podman_settings.get('server_executors', {}).get(server_name, executor)
+    if executor not in (PODMAN_EXECUTOR_CLI, PODMAN_EXECUTOR_API):
+        raise ImproperlyConfigured(f"Unknown Podman executor '{executor}'")
+    return executor
+
+
 class InstanceStatus(models.TextChoices):
     PENDING = 'pending', _('Pending')
     RUNNING = 'running', _('Running')
     STOPPED = 'stopped', _('Stopped')
+    SUSPENDED = 'suspended', _('Suspended')
 
 class Instance(models.Model):
     instance_id = models.CharField(max_length=100, unique=True, default=generate_instance_id, editable=False)
@@ -44,13 +105,28 @@ class Instance(models.Model):
         help_text="The container image used for this instance."
     )
     status = models.CharField(max_length=20, choices=InstanceStatus.choices, default=InstanceStatus.PENDING)
-    instance_ip = models.GenericIPAddressField(unique=True, null=True, blank=True) # currently instance ip is same as server ip
+    instance_ip = models.GenericIPAddressField(null=True, blank=True) # currently instance ip is same as server ip
     n_gpus = models.IntegerField()
+    reserved_gpus = models.IntegerField(default=0, help_text="GPUs this instance currently holds on its server.")
+    gpu_indices = models.JSONField(default=list, blank=True, help_text="Device indices of the GPUs it holds.")
+    host_ports = models.JSONField(default=dict, blank=True, help_text="Host port published for each service, e.g. {'ssh': 20000}.")
+    checkpoint = models.JSONField(
+        default=dict, blank=True,
+        help_text="GPU indices and host ports a suspended instance's container was checkpointed with.",
+    )
+    container_name = models.CharField(
+        max_length=100, blank=True, default="",
+        help_text="Name of a container created before they were named per instance, see _get_container_name().",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.account.username}-{self.instance_id}"
+
+    def save(self, *args, **kwargs):
+        with timed_phase("db_save"):
+            super().save(*args, **kwargs)
     
     @classmethod
     def create(
@@ -59,6 +135,9 @@ class Instance(models.Model):
         server: Server,
         image: str,
         n_gpus: int = 1,
+        reserved_gpus: int = 0,
+        gpu_indices: List[int] | None = None,
+        host_ports: Dict[str, int] | None = None,
     ) -> "Instance":
         try:
             instance: Instance = cls.objects.create(
@@ -66,6 +145,9 @@ class Instance(models.Model):
                 server=server,
                 image=image,
                 n_gpus=n_gpus,
+                reserved_gpus=reserved_gpus,
+                gpu_indices=gpu_indices or [],
+                host_ports=host_ports or {},
             )
             return instance
         except IntegrityError as e:
@@ -82,35 +164,131 @@ class Instance(models.Model):
         server: Server,
         image_id: int,
         n_gpus: int = 1,
+        devices: tuple[List[int], Dict[str, int]] | None = None,
     ) -> str:
-        with transaction.atomic():
-            try:
-                image = Image.objects.get(id=image_id)
-                instance: Instance = cls.create(
-                    account=account,
-                    server=server,
-                    image=image,
-                    n_gpus=n_gpus,
-                )
-                instance.start()
-                instance_id = instance.instance_id
-                return instance_id
-            except IntegrityError as e:
-                logger.error(f"Instance creation failed due to integrity issue: {e}")
-                raise ValueError("Failed to create instance due to a constraint violation.")
-            except Exception as e:
-                logger.error(f"Error creating instance: {e}")
-                raise e
-        
+        """
+        Creates and starts an instance on `server`, where the caller already
+        reserved `n_gpus` (see Server.reserve()) and possibly claimed its GPU
+        indices and host ports (`devices`, see _claim_devices()). The
+        reservation and devices are handed to the instance, or given back if
+        the launch fails.
+        """
+        gpu_indices, host_ports = devices or ([], {})
+        instance = None
+        try:
+            image = Image.objects.get(id=image_id)
+            # Fail before any SSH work when the registry says the image is gone.
+            if image.check_registry() is False:
+                raise ImageNotFoundException(f"Image '{image.custom_registry_image_name}' is not in the registry")
+            if devices is None:
+                gpu_indices, host_ports = cls._claim_devices(server, n_gpus)
+            with transaction.atomic():
+                try:
+                    instance: Instance = cls.create(
+                        account=account,
+                        server=server,
+                        image=image,
+                        n_gpus=n_gpus,
+                        reserved_gpus=n_gpus,
+                        gpu_indices=gpu_indices,
+                        host_ports=host_ports,
+                    )
+                    instance.start()
+                    instance_id = instance.instance_id
+                    return instance_id
+                except IntegrityError as e:
+                    logger.error(f"Instance creation failed due to integrity issue: {e}")
+                    raise ValueError("Failed to create instance due to a constraint violation.")
+                except Exception as e:
+                    logger.error(f"Error creating instance: {e}")
+                    raise e
+        except Exception:
+            # Released outside the rolled back transaction so it sticks.
+            server.release_gpus(n_gpus, gpu_indices, list(host_ports.values()))
+            if instance is not None:
+                instance._drop_discarded_warm_container()
+            raise
+
 
     def start(self) -> None:
         """
         Connects to the instance's server and starts its associated Podman container.
         Ensures idempotency and updates instance status.
         """
-        with transaction.atomic():
-            ssh: paramiko.SSHClient | None = None # Ensure ssh client is defined for finally block
+        # Refreshes the registry digest (within its TTL) so a tag pushed again is pulled.
+        self.image.check_registry()
+        reserved = self._reserve_gpus()
+        try:
+            if self.status == InstanceStatus.SUSPENDED and self._restore():
+                return
+            self._start()
+        except InstanceAlreadyRunningException:
+            raise
+        except Exception:
+            if reserved:
+                self._release_gpus()
+            self._drop_discarded_warm_container()
+            raise
+
+    def _reserve_gpus(self) -> bool:
+        """
+        Takes this instance's GPUs back on its server when it holds none, e.g.
+        when restarting a stopped instance. Done outside the start transaction
+        so the server row is not locked while the container starts.
+        """
+        if self.reserved_gpus:
+            return False
+        if not self.server.reserve_gpus(self.n_gpus):
+            raise NoAvailableServerException(f"Server {self.server.name} has no {self.n_gpus} free GPUs")
+        try:
+            # A suspended container can only be restored onto the devices it was checkpointed with.
+            gpu_indices, host_ports = self._claim_devices(
+                self.server, self.n_gpus, prefer=self.checkpoint if self.status == InstanceStatus.SUSPENDED else None,
+            )
+        except Exception:
+            self.server.release_gpus(self.n_gpus)
+            raise
+        Instance.objects.filter(pk=self.pk).update(reserved_gpus=self.n_gpus, gpu_indices=gpu_indices, host_ports=host_ports)
+        self.reserved_gpus = self.n_gpus
+        self.gpu_indices = gpu_indices
+        self.host_ports = host_ports
+        return True
+
+    def _release_gpus(self) -> None:
+        """Gives this instance's GPUs and host ports back to its server, at most once."""
+        if not Instance.objects.filter(pk=self.pk, reserved_gpus__gt=0).update(reserved_gpus=0, gpu_indices=[], host_ports={}):
+            return
+        self.server.release_gpus(self.reserved_gpus, self.gpu_indices, list(self.host_ports.values()))
+        self.reserved_gpus = 0
+        self.gpu_indices = []
+        self.host_ports = {}
 
+    @classmethod
+    def _claim_devices(
+        cls, server: Server, n_gpus: int, prefer: Dict[str, Any] | None = None,
+    ) -> tuple[List[int], Dict[str, int]]:
+        """
+        GPU indices and one host port per published service (see
+        PODMAN_SETTINGS['service_ports']). `prefer` holds the 'gpu_indices'
+        and 'host_ports' to take if they are still free.
+        """
+        services = list(cls._get_service_ports())
+        prefer = prefer or {}
+        prefer_ports = [prefer.get("host_ports", {}).get(service) for service in services]
+        gpu_indices, ports = server.claim_devices(
+            n_gpus, len(services),
+            prefer_gpus=prefer.get("gpu_indices"),
+            prefer_ports=prefer_ports if all(prefer_ports) else None,
+        )
+        return gpu_indices, dict(zip(services, ports))
+
+    @staticmethod
+    def _get_service_ports() -> Dict[str, int]:
+        """Container port of each published service, by service name."""
+        return getattr(settings, 'PODMAN_SETTINGS', {}).get('service_ports', {"ssh": 22})
+
+    def _start(self) -> None:
+        with transaction.atomic():
             try:
                 server = self.server
                 image_obj = self.image
@@ -132,77 +310,447 @@ class Instance(models.Model):
                 if not registry_image_name:
                     raise ValueError(f"Image '{image_obj.name}' missing custom registry name.")
 
-                ssh = self._connect_ssh(server.ip_address)
+                warm = WarmContainer.claim(server, image_obj, self.n_gpus) if warm_pool_enabled() else None
+                with self._connect_ssh(server.ip_address) as ssh:
+                    if warm is not None:
+                        container_id = self._start_from_warm_container(ssh, container_name, warm, server)
+                    elif self._get_launch_mode() == LAUNCH_MODE_SCRIPT:
+                        container_id = self._start_with_launch_script(ssh, container_name, image_obj, server)
+                    else:
+                        container_id = self._start_sequential(ssh, container_name, image_obj, server)
+
+                self.instance_ip = server.ip_address
+                self.status = InstanceStatus.RUNNING
+                # A fresh container replaced a checkpointed one, if there was any.
+                self.checkpoint = {}
+                self.save()
+                logger.info(f"Instance {self.instance_id} (Container {container_id}) successfully started and marked as running on {server.name}")
+
+            except Exception as e:
+                logger.error(f"Failed to start instance {self.instance_id}: {e}")
+                raise
 
-                logger.debug(f"Checking current state of container '{container_name}' on {server.name}...")
-                is_currently_running = self._check_user_container_running(ssh, container_name, server.name)
+    def _restore(self) -> bool:
+        """
+        Restores a suspended instance's container from its checkpoint, with
+        its processes and memory as they were. Returns False, for a cold start
+        instead, when another instance took the GPU devices or host ports it
+        was checkpointed with or the restore fails.
+        """
+        server = self.server
+        if sorted(self.gpu_indices) != sorted(self.checkpoint.get("gpu_indices", [])) or self.host_ports != self.checkpoint.get("host_ports"):
+            logger.info(f"Devices of suspended instance {self.instance_id} were taken on {server.name}, starting it cold")
+            return False
+        container_name = self._get_container_name(self.account.username)
+        try:
+            with self._connect_ssh(server.ip_address) as ssh:
+                with timed_phase("restore"):
+                    self._restore_container(ssh, container_name, server.name)
+        except Exception as e:
+            logger.warning(f"Could not restore {container_name} on {server.name}, starting it cold: {e}")
+            return False
+        self.instance_ip = server.ip_address
+        self.status = InstanceStatus.RUNNING
+        self.checkpoint = {}
+        self.save()
+        logger.info(f"Instance {self.instance_id} restored from its checkpoint on {server.name}")
+        return True
 
-                if is_currently_running:
-                    logger.info(f"Container '{container_name}' for instance {self.instance_id} is already running on {server.name}.")
-                    if self.status != InstanceStatus.RUNNING:
-                        logger.warning(f"Instance {self.instance_id} DB status was '{self.status}', updating to RUNNING.")
-                        self.status = InstanceStatus.RUNNING
-                        self.save()
-                    raise InstanceAlreadyRunningException
+    def suspend(self) -> None:
+        """
+        Checkpoints the instance's running container to its server's local disk
+        and gives its GPUs back. The next start() restores it from there.
+        """
+        with transaction.atomic():
+            try:
+                server = self.server
+                container_name = self._get_container_name(self.account.username)
+                logger.info(f"Processing suspend request for instance {self.instance_id} on {server.name}")
 
-                # If not running, attempt cleanup before starting
-                # logger.info(f"Container '{container_name}' not running. Attempting cleanup before start...")
-                # self._stop_and_remove_container(ssh, container_name, server.name)
-                
-                self.status = InstanceStatus.PENDING
+                with self._connect_ssh(server.ip_address) as ssh:
+                    if not self._check_user_container_running(ssh, container_name, server.name):
+                        raise InstanceAlreadyStoppedException
+                    with timed_phase("checkpoint"):
+                        self._checkpoint_container(ssh, container_name, server.name)
+                self.checkpoint = {"gpu_indices": list(self.gpu_indices), "host_ports": dict(self.host_ports)}
+                self.status = InstanceStatus.SUSPENDED
                 self.save()
+                self._release_gpus()
+                logger.info(f"Instance {self.instance_id} (Container {container_name}) checkpointed and suspended on {server.name}")
+            except Exception as e:
+                logger.error(f"Failed to suspend instance {self.instance_id}: {e}")
+                raise
 
-                logger.debug(f"Preparing volumes for user '{username}'")
-                volume_args = self._get_volume_mounts(username)
+    def _checkpoint_container(self, ssh, container_name: str, server_name: str) -> None:
+        podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
+        timeout = podman_settings.get('checkpoint_timeout', 600)
+        tcp_established = podman_settings.get('checkpoint_tcp_established', True)
+        if self._uses_podman_api():
+            self._podman_api(ssh).checkpoint_container(container_name, server_name, tcp_established=tcp_established, timeout=timeout)
+            return
+        flags = " --tcp-established" if tcp_established else ""
+        result = run_command(ssh, f"sudo podman container checkpoint{flags} {container_name}", timeout=timeout)
+        if result.exit_status != 0:
+            raise Exception(f"Failed to checkpoint container {container_name} on {server_name}: {result.stderr.strip()}")
 
-                logger.debug(f"Ensuring image '{registry_image_name}' is pulled on {server.name}")
-                self._ensure_image_pulled(ssh, registry_image_name, server.name)
+    def _restore_container(self, ssh, container_name: str, server_name: str) -> None:
+        podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
+        timeout = podman_settings.get('checkpoint_timeout', 600)
+        tcp_established = podman_settings.get('checkpoint_tcp_established', True)
+        if self._uses_podman_api():
+            self._podman_api(ssh).restore_container(container_name, server_name, tcp_established=tcp_established, timeout=timeout)
+            return
+        flags = " --tcp-established" if tcp_established else ""
+        result = run_command(ssh, f"sudo podman container restore{flags} {container_name}", timeout=timeout)
+        if result.exit_status != 0:
+            raise Exception(f"Failed to restore container {container_name} on {server_name}: {result.stderr.strip()}")
 
-                logger.info(f"Attempting to run container '{container_name}'...")
-                container_id = self._run_podman_container(
-                    ssh,
-                    container_name,
-                    image_obj,
-                    volume_args,
-                    self.instance_id,
-                    server
+    async def astart(self) -> None:
+        """Async counterpart of start(), run on the orchestrator's thread pool."""
+        await get_orchestrator().run_blocking(self._get_server_key(), self.start)
+
+    async def astop(self) -> None:
+        """Async counterpart of stop(), run on the orchestrator's thread pool."""
+        await get_orchestrator().run_blocking(self._get_server_key(), self.stop)
+
+    @classmethod
+    async def arun_many(
+        cls,
+        instances: List["Instance"],
+        action: str,
+        timeout: float | None = None,
+        on_result=None,
+        max_concurrency: int | None = None,
+    ) -> List[OperationResult]:
+        """
+        Runs `action` ('start' or 'stop') on every instance concurrently,
+        bounded per server by the orchestrator and overall by `max_concurrency`.
+        """
+        if action not in ("start", "stop"):
+            raise ValueError(f"Unsupported instance action '{action}'")
+        operations = [
+            Operation(instance.instance_id, action, instance._get_server_key(), getattr(instance, action))
+            for instance in instances
+        ]
+        return await get_orchestrator().run_many(operations, timeout=timeout, on_result=on_result, max_concurrency=max_concurrency)
+
+    @classmethod
+    def run_many(
+        cls,
+        instances: List["Instance"],
+        action: str,
+        timeout: float | None = None,
+        on_result=None,
+        max_concurrency: int | None = None,
+    ) -> List[OperationResult]:
+        """Synchronous wrapper around arun_many() for WSGI views and management commands."""
+        orchestrator = get_orchestrator()
+        return orchestrator.run_sync(
+            cls.arun_many(instances, action, timeout=timeout, on_result=on_result, max_concurrency=max_concurrency)
+        )
+
+    @classmethod
+    def bulk_launch(cls, specs: List[Dict[str, Any]], timeout: float | None = None, on_result=None) -> List[Dict[str, Any]]:
+        """
+        Launches many instances at once. Every spec ({'account', 'image_id', 'n_gpus'})
+        is placed in a single scheduling pass and the launches then run concurrently,
+        bounded per server by the orchestrator. Returns one result per spec, in order;
+        a failed item does not affect the others.
+        """
+        image_ids = [spec["image_id"] for spec in specs if str(spec["image_id"]).isdigit()]
+        images = {str(image.id): image for image in Image.objects.filter(id__in=image_ids)}
+        placements = Server.place_many(
+            [spec.get("n_gpus", 1) for spec in specs],
+            images=[images.get(str(spec["image_id"])) for spec in specs],
+        )
+        results: List[Dict[str, Any]] = []
+        operations = []
+        for index, (spec, server) in enumerate(zip(specs, placements)):
+            results.append({
+                "index": index,
+                "account": spec["account"].username,
+                "image_id": spec["image_id"],
+                "n_gpus": spec.get("n_gpus", 1),
+                "server": server.name if server else None,
+                "ok": False,
+                "instance_id": None,
+                "error": None if server else "No available server",
+            })
+            if server is None:
+                continue
+            operations.append(
+                Operation(str(index), "launch", str(server.id), cls.launch, spec["account"], server, spec["image_id"], spec.get("n_gpus", 1))
+            )
+
+        logger.info(f"Bulk launch of {len(specs)} instances: {len(operations)} placed, {len(specs) - len(operations)} unplaced")
+        orchestrator = get_orchestrator()
+        for result in orchestrator.run_sync(orchestrator.run_many(operations, timeout=timeout, on_result=on_result)):
+            item = results[int(result.key)]
+            item["ok"] = result.ok
+            item["instance_id"] = result.value if result.ok else None
+            item["error"] = str(result.error) if result.error else None
+            item["elapsed_seconds"] = round(result.elapsed, 3)
+        return results
+
+    def _get_server_key(self) -> str:
+        return str(self.server_id)
+
+    def _start_sequential(self, ssh: SSHClient, container_name: str, image_obj: Image, server: Server) -> str:
+        """
+        Starts the container with one SSH exec per step: inspect, pull and run.
+        The user's configuration files are written on the host in the run exec.
+        """
+        username = self.account.username
+
+        logger.debug(f"Checking current state of container '{container_name}' on {server.name}...")
+        with timed_phase("inspect"):
+            container = self._inspect_user_container(ssh, container_name, server.name)
+
+        if container is not None and container["State"]["Status"].lower() == "running":
+            logger.info(f"Container '{container_name}' for instance {self.instance_id} is already running on {server.name}.")
+            self._mark_already_running()
+
+        self.status = InstanceStatus.PENDING
+        self.save()
+
+        logger.debug(f"Preparing volumes for user '{username}'")
+        volume_args = self._get_volume_mounts(username)
+
+        write_config = self._build_write_config_command(container_name)
+        spec = self._build_container_spec(container_name, image_obj, volume_args, self.instance_id)
+        if self._reusable_container(container, spec, server, image_obj):
+            # Same image and spec: the stopped container comes back with its writable layer.
+            logger.info(f"Starting existing container '{container_name}' on {server.name}")
+            with timed_phase("start"):
+                self._start_existing_container(ssh, container_name, server.name, prepare_command=write_config)
+            return container["Id"]
+        if container is not None:
+            # Its spec changed, so it is recreated rather than left behind.
+            with timed_phase("remove"):
+                self._remove_container(ssh, container_name, server.name)
+
+        self._acquire_image(ssh, server, image_obj)
+
+        logger.info(f"Attempting to run container '{container_name}'...")
+        with timed_phase("run"):
+            container_id = self._run_podman_container(
+                ssh,
+                container_name,
+                image_obj,
+                volume_args,
+                self.instance_id,
+                server,
+                prepare_command=write_config,
+            )
+
+        if image_obj.pulls_lazily and image_obj.prefetch_files:
+            with timed_phase("prefetch"):
+                self._prefetch_image_files(ssh, container_name, image_obj)
+        return container_id
+
+    def _acquire_image(self, ssh: SSHClient, server: Server, image_obj: Image, pull: bool = True) -> bool:
+        """
+        Gets `image_obj` onto `server` unless the ServerImage cache says it is
+        there: lazily for eStargz / zstd:chunked images, from a peer in 'peer'
+        distribution mode, else by a registry pull. With `pull=False` the
+        registry pull is left to the caller (the launch script). Returns
+        whether the image still has to be pulled.
+        """
+        registry_image_name = image_obj.custom_registry_image_name
+        if ServerImage.is_present(server, image_obj):
+            # `podman run` still pulls a missing image itself if the cache turns out wrong.
+            logger.debug(f"Image '{registry_image_name}' is cached on {server.name}, skipping pull")
+        elif image_obj.pulls_lazily:
+            # Only the manifests are fetched here, layers are mounted from the registry as files are read.
+            logger.debug(f"Lazily pulling {image_obj.image_format} image '{registry_image_name}' on {server.name}")
+            with timed_phase("lazy_pull"):
+                self._ensure_image_pulled(
+                    ssh, registry_image_name, server.name,
+                    timeout=getattr(settings, 'LAZY_PULL_SETTINGS', {}).get('pull_timeout', 60),
                 )
+            self._record_pulled_image(ssh, server, image_obj)
+        elif fetch_from_peer(ssh, server, image_obj):
+            logger.debug(f"Image '{registry_image_name}' copied onto {server.name} from a peer")
+        elif not pull:
+            return True
+        else:
+            logger.debug(f"Ensuring image '{registry_image_name}' is pulled on {server.name}")
+            with timed_phase("pull"):
+                self._ensure_image_pulled(ssh, registry_image_name, server.name)
+            self._record_pulled_image(ssh, server, image_obj)
+        return False
 
-                logger.info(f"Container '{container_id}' started. Fetching IP address...")
-                self._configure_podman_container(ssh, container_name)
-                self.instance_ip = server.ip_address
-                self.status = InstanceStatus.RUNNING
-                self.save()
-                logger.info(f"Instance {self.instance_id} (Container {container_id}) successfully started and marked as running on {server.name}")
+    def _start_from_warm_container(self, ssh: SSHClient, container_name: str, warm: WarmContainer, server: Server) -> str:
+        """
+        Takes over a booted container from the warm pool: renames it to the
+        user's container, attaches the user's volumes and configures it. The
+        instance moves to the warm container's GPUs and host ports; the ones
+        it claimed are given back once the start commits.
+        """
+        with timed_phase("inspect"):
+            if self._check_user_container_running(ssh, container_name, server.name):
+                logger.info(f"Container '{container_name}' for instance {self.instance_id} is already running on {server.name}.")
+                self._mark_already_running()
 
-            except Exception as e:
-                logger.error(f"Failed to start instance {self.instance_id}: {e}")
-                raise
-            finally:
-                if ssh:
-                    try:
-                        ssh.close()
-                        logger.debug(f"SSH connection closed for {server.name if 'server' in locals() else 'unknown server'}")
-                    except Exception as e_close:
-                        logger.error(f"Error closing SSH connection: {e_close}")
+        self.status = InstanceStatus.PENDING
+        self.save()
+
+        reserved, claimed_gpus, claimed_ports = self.reserved_gpus, self.gpu_indices, self.host_ports
+        try:
+            with timed_phase("adopt"):
+                adopt_warm_container(ssh, warm, container_name, self.account.username)
+            self.gpu_indices, self.host_ports = warm.gpu_indices, warm.host_ports
+            Instance.objects.filter(pk=self.pk).update(gpu_indices=self.gpu_indices, host_ports=self.host_ports)
+            with timed_phase("configure"):
+                self._configure_podman_container(ssh, container_name, setup=claim_setup_command(self.instance_id))
+        except Exception:
+            self.gpu_indices, self.host_ports = claimed_gpus, claimed_ports
+            discard_claimed_warm_container(ssh, warm, container_name)
+            self._discarded_warm_container = warm
+            raise
+        finally:
+            release_staging(ssh, warm)
+        # The warm container's reservation carries over to the instance, so its own is given back.
+        transaction.on_commit(lambda: server.release_gpus(reserved, claimed_gpus, list(claimed_ports.values())))
+        logger.info(f"Instance {self.instance_id} took over warm container {warm.container_name} on {server.name}")
+        return warm.container_id
+
+    def _drop_discarded_warm_container(self) -> None:
+        """
+        Drops the pool entry of a warm container this instance failed to take
+        over (see _start_from_warm_container()), once the start's transaction
+        has rolled back and restored it.
+        """
+        warm = getattr(self, "_discarded_warm_container", None)
+        if warm is not None and drop_warm_container(warm):
+            logger.info(f"Dropped warm container {warm.container_name} from the pool after a failed takeover on {warm.server.name}")
+
+    def _record_pulled_image(self, ssh: SSHClient, server: Server, image_obj: Image) -> None:
+        try:
+            sweep_server(server, ssh, pulled=image_obj)
+        except Exception as e:
+            logger.warning(f"Could not record images on {server.name} after pulling '{image_obj.custom_registry_image_name}': {e}")
+
+    def _start_with_launch_script(self, ssh: SSHClient, container_name: str, image_obj: Image, server: Server) -> str:
+        """
+        Starts the container by shipping a single idempotent script (inspect -> configure
+        -> pull -> run) over one SSH channel and parsing its structured JSON result.
+        Images that are cached, pulled lazily or copied from a peer are taken care
+        of first as in _start_sequential(), so the script only pulls the others.
+        """
+        podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
+        ssh_timeout = podman_settings.get('ssh_exec_timeout_pull', 300)
+
+        self.status = InstanceStatus.PENDING
+        self.save()
+
+        image_digest = ServerImage.local_digest(server, image_obj)
+        needs_pull = self._acquire_image(ssh, server, image_obj, pull=False)
+        volume_args = self._get_volume_mounts(self.account.username)
+        prefetch_command = ""
+        if image_obj.pulls_lazily and image_obj.prefetch_files:
+            prefetch_command = shlex.join(["sudo", "podman", "exec", "-d", container_name] + self._build_prefetch_exec_args(image_obj))
+        spec = self._build_container_spec(container_name, image_obj, volume_args, self.instance_id)
+        script = build_launch_script(
+            container_name,
+            image_obj.custom_registry_image_name,
+            self._build_run_command(container_name, image_obj, volume_args, self.instance_id),
+            self._build_write_config_command(container_name),
+            prefetch_command=prefetch_command,
+            spec_label=SPEC_LABEL,
+            spec_hash=spec["labels"][SPEC_LABEL],
+            image_digest=image_digest,
+            pull=needs_pull,
+        )
+
+        logger.info(f"Running launch script for container '{container_name}' on {server.name}")
+        try:
+            with timed_phase("launch_script"):
+                result = run_command(ssh, "bash -s", timeout=ssh_timeout, input=script)
+            output = result.stdout
+            exit_status = result.exit_status
+            error_output = result.stderr.strip()
+        except Exception as e:
+            logger.exception(f"Error executing launch script for {container_name} on {server.name}: {e}")
+            raise Exception(f"Failed to execute launch script on server {server.name}: {e}") from e
+
+        if exit_status != 0:
+            raise Exception(f"Launch script exited with status {exit_status} on server {server.name}. Error: {error_output}")
+
+        result = parse_launch_result(output)
+        outcome = result.get("outcome")
+        if result.get("pulled_digest"):
+            ServerImage.record_pull(server, image_obj, result["pulled_digest"])
+        steps = result.get("steps", {})
+        for name, step in steps.items():
+            record_phase(name, step.get("ms", 0) / 1000.0)
+        timings = ", ".join(f"{name}={step.get('ms')}ms (exit {step.get('exit')})" for name, step in steps.items())
+        logger.info(f"Launch script for '{container_name}' on {server.name} finished with '{outcome}': {timings}")
+
+        if outcome == OUTCOME_ALREADY_RUNNING:
+            logger.info(f"Container '{container_name}' for instance {self.instance_id} is already running on {server.name}.")
+            self._mark_already_running()
+        if outcome != OUTCOME_STARTED:
+            failed_step = list(steps)[-1] if steps else "unknown"
+            error_detail = steps.get(failed_step, {}).get("output", "")
+            logger.error(f"Launch script step '{failed_step}' failed for {container_name} on {server.name}: {error_detail}")
+            raise Exception(f"Failed to start container {container_name} on server {server.name} ({outcome}): {error_detail}")
+
+        return result["container_id"]
+
+    def _mark_already_running(self) -> None:
+        if self.status != InstanceStatus.RUNNING:
+            logger.warning(f"Instance {self.instance_id} DB status was '{self.status}', updating to RUNNING.")
+            self.status = InstanceStatus.RUNNING
+            self.save()
+        raise InstanceAlreadyRunningException
+
+    def _get_launch_mode(self) -> str:
+        podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
+        launch_mode = podman_settings.get('launch_mode', LAUNCH_MODE_SEQUENTIAL)
+        if launch_mode not in (LAUNCH_MODE_SEQUENTIAL, LAUNCH_MODE_SCRIPT):
+            raise ImproperlyConfigured(f"Unknown Podman launch mode '{launch_mode}'")
+        if launch_mode == LAUNCH_MODE_SCRIPT and self._uses_podman_api():
+            # The launch script drives the podman CLI, API servers run the steps as requests instead.
+            return LAUNCH_MODE_SEQUENTIAL
+        return launch_mode
+
+    def _get_podman_executor(self) -> str:
+        """The Podman backend configured for this instance's server: 'cli' or 'api'."""
+        return get_podman_executor(self.server.name if self.server_id else None)
+
+    def _uses_podman_api(self) -> bool:
+        return self._get_podman_executor() == PODMAN_EXECUTOR_API
+
+    def _podman_api(self, ssh: SSHClient) -> PodmanAPIExecutor:
+        """Podman REST API executor over the given pooled SSH connection."""
+        return PodmanAPIExecutor(get_podman_api_client(), ssh)
 
     def stop(self) -> None:
         """
         Connects to the instance's server and stops & removes its associated Podman container.
         Updates instance status appropriately.
         """
+        already_stopped = False
         with transaction.atomic():
-            ssh: paramiko.SSHClient | None = None # Ensure ssh client is defined for finally block
-
             try:
+                if self.status == InstanceStatus.SUSPENDED:
+                    # Its GPUs are already free; the container goes with its checkpoint and the next start runs a fresh one.
+                    container_name = self._get_container_name(self.account.username)
+                    with self._connect_ssh(self.server.ip_address) as ssh:
+                        self._remove_container(ssh, container_name, self.server.name)
+                    self.status = InstanceStatus.STOPPED
+                    self.checkpoint = {}
+                    self.save()
+                    logger.info(f"Suspended instance {self.instance_id} stopped, its container and checkpoint are removed")
+                    return
                 server = self.server
-                ssh = self._connect_ssh(server.name)
                 if not server:
                     if self.status == InstanceStatus.STOPPED:
                         logger.info(f"Instance {self.instance_id} already stopped and has no server assigned.")
                         return True
                     raise ValueError(f"Instance {self.instance_id} has no Server association, cannot determine where to stop.")
-                
+
                 account = self.account
                 username = account.username
                 if not username: raise ValueError(f"Account {account.id} has no username.")
@@ -210,49 +758,42 @@ class Instance(models.Model):
 
                 logger.info(f"Processing stop request for instance {self.instance_id} on {server.name}")
 
-                is_running = self._check_user_container_running(ssh, container_name, server.name)
-                if not is_running:
-                    logger.info(f"Container '{container_name}' for instance {self.instance_id} is already stopped on {server.name}.")
-                    if self.status != InstanceStatus.STOPPED:
-                        logger.warning(f"Instance {self.instance_id} DB status was '{self.status}', updating to STOPPED.")
-                        self.status = InstanceStatus.STOPPED
-                        self.save()
-                    raise InstanceAlreadyStoppedException
-                       
-                self._stop_container(
-                    ssh,
-                    container_name,
-                    server.name
-                )
+                with self._connect_ssh(server.ip_address) as ssh:
+                    is_running = self._check_user_container_running(ssh, container_name, server.name)
+                    if not is_running:
+                        logger.info(f"Container '{container_name}' for instance {self.instance_id} is already stopped on {server.name}.")
+                        if self.status != InstanceStatus.STOPPED:
+                            logger.warning(f"Instance {self.instance_id} DB status was '{self.status}', updating to STOPPED.")
+                        already_stopped = True
+                    else:
+                        self._stop_container(
+                            ssh,
+                            container_name,
+                            server.name
+                        )
+                # A crashed container's GPUs and ports are released too.
                 self.status = InstanceStatus.STOPPED
                 self.save()
-                logger.info(f"Instance {self.instance_id} (Container {container_name}) successfully stopped and marked as stopped on {server.name}")
+                self._release_gpus()
+                if not already_stopped:
+                    logger.info(f"Instance {self.instance_id} (Container {container_name}) successfully stopped and marked as stopped on {server.name}")
             except Exception as e:
                 logger.error(f"Failed to complete stop process for instance {self.instance_id}: {e}")
-                raise 
-            finally:
-                if ssh:
-                    try:
-                        ssh.close()
-                        logger.debug(f"SSH connection closed for {server.name}")
-                    except Exception as e_close:
-                        logger.error(f"Error closing SSH connection: {e_close}")
-
-
-    def _connect_ssh(self, ip_address: str) -> SSHClient:
-        """Establish an SSH connection to the instance."""
-
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            hostname=ip_address,
-            username=settings.SSH_USERNAME,
-            timeout=60,
-        )
-        return ssh
+                raise
+        if already_stopped:
+            # Raised once the status change and the released devices are committed.
+            raise InstanceAlreadyStoppedException
+
+
+    def _connect_ssh(self, ip_address: str) -> ContextManager[SSHClient]:
+        """Borrow a pooled SSH connection to the instance's server."""
+        return get_connection_pool().connection(ip_address)
     
     def _get_container_name(self, username: str) -> str:
-        container_name = f"{username}-container"
+        # Named per instance, so one user's instances can share a server.
+        if self.container_name:
+            return self.container_name
+        container_name = f"{username}-{self.instance_id}"
         refined_container_name = re.sub(r"[._]", "-", container_name)
         return refined_container_name
     
@@ -283,62 +824,184 @@ class Instance(models.Model):
                                 f"for user '{username}': {e}")
                 raise ValueError(f"Error formatting mount path '{mount_template}': {e}") from e
 
+        config_dir = self._container_config_dir(self._get_container_name(username))
+        for name, target in CONTAINER_CONFIG_MOUNTS.items():
+            formatted_mounts.append(f"--volume {config_dir}/{name}:{target}:ro")
         return formatted_mounts
+
+    def _container_config_dir(self, container_name: str) -> str:
+        """Host directory holding the generated configuration files of a container."""
+        config_dir = getattr(settings, 'PODMAN_SETTINGS', {}).get('config_dir', '/var/lib/synapse/containers')
+        return f"{config_dir.rstrip('/')}/{container_name}"
     
-    def _run_podman_container(
-        self, 
-        ssh: SSHClient, 
-        container_name: str, 
-        image: Image, 
-        volume_args: List[str], 
+    def _build_container_spec(
+        self,
+        container_name: str,
+        image: Image,
+        volume_args: List[str],
         instance_id: str,
-        server: Server,
-    ) -> str:
+        labels: Dict[str, str] | None = None,
+    ) -> Dict[str, Any]:
         """
-        Run the Podman container using settings from Django settings.py.
+        Describe the container to create using settings from Django settings.py.
+        Rendered as `podman run` flags by the CLI path and as a libpod
+        SpecGenerator by the REST API path.
         """
-        
-        registry_image_name = image.custom_registry_image_name
-
         try:
             podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
             default_shm_size = podman_settings.get('default_shm_size', '1G')
             default_pid_limit = podman_settings.get('default_pid_limit', -1)
+            gpu_device_template = podman_settings.get('gpu_device_template', 'nvidia.com/gpu={index}')
+            service_ports = podman_settings.get('service_ports', {"ssh": 22})
 
         except Exception as e:
             logger.exception(f"Error accessing Podman settings (shm_size, pid_limit): {e}")
             raise ImproperlyConfigured(f"Error accessing Podman settings: {e}") from e
 
+        spec = {
+            "name": container_name,
+            "hostname": instance_id,
+            "image": image.custom_registry_image_name,
+            # CDI devices of the GPUs this instance holds; instances from before
+            # device tracking still get the whole server.
+            "gpu_devices": [gpu_device_template.format(index=index) for index in self.gpu_indices] or ["nvidia.com/gpu=all"],
+            "env": self._gpu_environment(),
+            "devices": ["/dev/net/tun:/dev/net/tun"],
+            "shm_size": default_shm_size,
+            "pids_limit": default_pid_limit,
+            "cap_add": ["net_admin", "AUDIT_CONTROL"],
+            # host ports allocated to this instance -> ssh -p <host_ports['ssh']> ubuntu@server.ip_address
+            "ports": [
+                (host_port, service_ports[service])
+                for service, host_port in self.host_ports.items() if service in service_ports
+            ],
+            "volumes": [arg.split(" ", 1)[-1] for arg in volume_args],
+        }
+        spec["labels"] = {SPEC_LABEL: self._container_spec_hash(spec), **(labels or {})}
+        return spec
+
+    @staticmethod
+    def _container_spec_hash(spec: Dict[str, Any]) -> str:
+        """Hash of everything in `spec` a container is created with, apart from its name and labels."""
+        created_with = {key: value for key, value in spec.items() if key not in ("name", "labels")}
+        return hashlib.sha256(json.dumps(created_with, sort_keys=True).encode()).hexdigest()[:32]
+
+    def _reusable_container(self, container: Dict[str, Any] | None, spec: Dict[str, Any], server: Server, image: Image) -> bool:
+        """
+        Whether the stopped `container` (as `podman container inspect` reports
+        it) was created from `spec` and from the digest `image` has on the
+        server now, so it can be started again instead of being recreated.
+        """
+        if container is None or container["State"]["Status"].lower() not in STARTABLE_CONTAINER_STATES:
+            return False
+        labels = (container.get("Config") or {}).get("Labels") or {}
+        if labels.get(SPEC_LABEL) != spec["labels"][SPEC_LABEL]:
+            logger.info(f"Container '{spec['name']}' on {server.name} was created from another spec, recreating it")
+            return False
+        digest = ServerImage.local_digest(server, image)
+        if not digest or container.get("ImageDigest") != digest:
+            logger.info(f"Container '{spec['name']}' on {server.name} has an outdated image, recreating it")
+            return False
+        return True
+
+    def _gpu_environment(self) -> Dict[str, str]:
+        """
+        The container runs --privileged, which exposes every GPU device node,
+        so CUDA is pointed at the allocated ones by their host index as well.
+        """
+        if not self.gpu_indices:
+            return {}
+        return {
+            "CUDA_DEVICE_ORDER": "PCI_BUS_ID",
+            "CUDA_VISIBLE_DEVICES": ",".join(str(index) for index in self.gpu_indices),
+        }
+
+    def _build_run_command(
+        self,
+        container_name: str,
+        image: Image,
+        volume_args: List[str],
+        instance_id: str,
+        labels: Dict[str, str] | None = None,
+    ) -> str:
+        """
+        Build the `podman run` command line for the container spec.
+        """
+        spec = self._build_container_spec(container_name, image, volume_args, instance_id, labels)
+
         podman_command_list = [
             "sudo",
             "podman",
             "run",
-            "--name", container_name,
-            "--hostname", instance_id,
+            "--name", spec["name"],
+            "--hostname", spec["hostname"],
             "--privileged",
             "--systemd", "always",
-            "--device", "nvidia.com/gpu=all",
+        ]
+        for device in spec["gpu_devices"]:
+            podman_command_list += ["--device", device]
+        podman_command_list += [
             "--umask=0000",
             "--ulimit", "memlock=-1:-1",
-            f"--shm-size={default_shm_size}",
-            f"--pids-limit {default_pid_limit}",
-            "--cap-add", "net_admin",
-            "--cap-add", "AUDIT_CONTROL",
-            "--device", "/dev/net/tun:/dev/net/tun",
-            "-p", "2222:22", # required to ssh into the container -> ssh -p 2222 ubuntu@server.ip_address
+            f"--shm-size={spec['shm_size']}",
+            f"--pids-limit {spec['pids_limit']}",
+        ]
+        for capability in spec["cap_add"]:
+            podman_command_list += ["--cap-add", capability]
+        for device in spec["devices"]:
+            podman_command_list += ["--device", device]
+        for host_port, container_port in spec["ports"]:
+            podman_command_list += ["-p", f"{host_port}:{container_port}"]
+        for name, value in spec["env"].items():
+            podman_command_list += ["-e", f"{name}={value}"]
+        for name, value in spec["labels"].items():
+            podman_command_list += ["--label", f"{name}={value}"]
+        podman_command_list += [
             "--replace",
             "-d",
-        ] + volume_args + [registry_image_name]
+        ]
+        for volume in spec["volumes"]:
+            podman_command_list.append(f"--volume {volume}")
+        podman_command_list.append(spec["image"])
         
-        podman_command_str = " ".join(map(str, podman_command_list))
+        return " ".join(map(str, podman_command_list))
+
+    def _run_podman_container(
+        self, 
+        ssh: SSHClient, 
+        container_name: str, 
+        image: Image, 
+        volume_args: List[str], 
+        instance_id: str,
+        server: Server,
+        labels: Dict[str, str] | None = None,
+        prepare_command: str = "",
+    ) -> str:
+        """
+        Run the Podman container using settings from Django settings.py.
+        `prepare_command` is run on the host first, in the same exec on the CLI path.
+        """
+        if self._uses_podman_api():
+            self._prepare_host(ssh, prepare_command, server.name)
+            spec = self._build_container_spec(container_name, image, volume_args, instance_id, labels)
+            logger.debug(f"Creating container '{container_name}' through the Podman API on {server.name}")
+            container_id = self._podman_api(ssh).run_container(spec, server.name)
+            logger.info(f"Successfully started container {container_id} ({container_name}) on {server.name}")
+            return container_id
+
+        podman_command_str = self._build_run_command(container_name, image, volume_args, instance_id, labels)
+        if prepare_command:
+            podman_command_str = f"{prepare_command} && {podman_command_str}"
         logger.debug(f"Executing Podman command on {instance_id}: {podman_command_str}")
+        podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
+        ssh_timeout = podman_settings.get('ssh_exec_timeout', 60)
 
         try:
-            stdin, stdout, stderr = ssh.exec_command(podman_command_str)
-            exit_status = stdout.channel.recv_exit_status()
+            result = run_command(ssh, podman_command_str, timeout=ssh_timeout)
+            exit_status = result.exit_status
 
-            container_id = stdout.read().decode().strip()
-            error_output = stderr.read().decode().strip()
+            container_id = result.stdout.strip()
+            error_output = result.stderr.strip()
 
             if exit_status != 0:
                 logger.error(f"Podman command failed on {server.name} with exit status {exit_status}. Error: {error_output}. Command: {podman_command_str}")
@@ -346,7 +1009,7 @@ class Instance(models.Model):
 
             if not container_id:
                 logger.error(
-                    f"Podman command succeeded (Exit Status 0) but no container ID returned on {server.name}. Stderr: {error_output}. Stdout: {stdout.read().decode().strip()}. Command: {podman_command_str}"
+                    f"Podman command succeeded (Exit Status 0) but no container ID returned on {server.name}. Stderr: {error_output}. Stdout: {result.stdout.strip()}. Command: {podman_command_str}"
                 )
                 raise Exception(f"Instance {instance_id} started but failed to retrieve Container ID.")
 
@@ -360,48 +1023,154 @@ class Instance(models.Model):
             else:
                 raise Exception(f"SSH execution failed on {instance_id}: {e}") from e
             
+    def _build_configure_command(self, container_name: str, setup: str = "") -> str:
+        """Build the `podman exec` command that configures the user's environment in the container."""
+        container_configure_command = [
+            "sudo",
+            "podman",
+            "exec",
+            container_name,
+        ] + self._build_configure_exec_args(setup)
+        return subprocess.list2cmdline(container_configure_command)
+
+    def _build_configure_exec_args(self, setup: str = "") -> List[str]:
+        """
+        The command run inside a container that was created without the user's
+        configuration mounts (a warm container) to install the same files,
+        after the shell commands in `setup`, if any.
+        """
+        steps = [setup] if setup else []
+        steps += self._home_setup_steps(CONTAINER_HOME)
+        for name, content in self._container_config_files().items():
+            target = CONTAINER_CONFIG_MOUNTS[name]
+            steps.append(f"mkdir -p {shlex.quote(target.rpartition('/')[0])} && printf %s {shlex.quote(content)} > {shlex.quote(target)}")
+        # sshd of the booted container only picks up the AuthorizedKeysFile drop-in on reload.
+        steps.append("{ systemctl reload ssh || systemctl reload sshd; } > /dev/null 2>&1 || true")
+        return ["bash", "-c", " && ".join(steps)]
+
+    def _container_config_files(self) -> Dict[str, str]:
+        """
+        Contents of the files that set up the user's environment in the
+        container, by name in CONTAINER_CONFIG_MOUNTS: the SSH key (which sshd
+        reads next to ~/.ssh/authorized_keys), the locale, and the login banner
+        and GPU environment of SSH sessions, which don't inherit the container's.
+        """
+        username = self.account.username
+        exports = "".join(f"export {name}={value}\n" for name, value in self._gpu_environment().items())
+        return {
+            "authorized_keys": f"{self.account.ssh_public_key.strip()}\n",
+            "sshd.conf": f"AuthorizedKeysFile .ssh/authorized_keys {CONTAINER_CONFIG_MOUNTS['authorized_keys']}\n",
+            "profile.sh": exports + (
+                f'if [ -n "${{SSH_TTY:-}}" ] && [ -z "${{TMUX:-}}" ]; then\n'
+                f'    printf "\\n🚀 Welcome {username}, You are connected to %s 🚀\\n\\n" "$(hostname)"\n'
+                'fi\n'
+            ),
+            "locale": 'LANG="en_US.UTF-8"\n',
+        }
+
+    def _build_write_config_command(self, container_name: str) -> str:
+        """
+        Shell command that writes the container's configuration files into its
+        host directory. Files are rewritten in place, so the bind mounts of a
+        running or stopped container see the new contents.
+        """
+        config_dir = self._container_config_dir(container_name)
+        steps = [f"mkdir -p {shlex.quote(config_dir)}"]
+        for name, content in self._container_config_files().items():
+            steps.append(f"printf %s {shlex.quote(content)} > {shlex.quote(f'{config_dir}/{name}')}")
+        home = self._host_home_dir()
+        if home:
+            steps += self._home_setup_steps(home)
+        return f"sudo sh -c {shlex.quote(' && '.join(steps))}"
+
+    def _host_home_dir(self) -> str | None:
+        """Host path of the user's volume mounted at CONTAINER_HOME, if PODMAN_SETTINGS['mount_paths'] has one."""
+        for template in getattr(settings, 'PODMAN_SETTINGS', {}).get('mount_paths', []):
+            host_path, _, rest = template.partition(":")
+            if rest.partition(":")[0].rstrip("/") == CONTAINER_HOME:
+                return host_path.format(username=self.account.username).rstrip("/")
+        return None
+
+    def _home_setup_steps(self, home: str) -> List[str]:
+        """
+        Shell steps preparing the home directory at `home`, as the host or the
+        container sees it: ~/.ssh, a .bash_profile that sources .bashrc, and
+        ownership by the image's login user (PODMAN_SETTINGS['home_owner']),
+        which the image's init doesn't set up.
+        """
+        owner = getattr(settings, 'PODMAN_SETTINGS', {}).get('home_owner', '1000:1000')
+        ssh_dir, bashrc, bash_profile = (shlex.quote(f"{home}/{name}") for name in (".ssh", ".bashrc", ".bash_profile"))
+        source_bashrc = shlex.quote(f"source {CONTAINER_HOME}/.bashrc")
+        return [
+            f"mkdir -p {ssh_dir}",
+            f"touch {bashrc} {bash_profile}",
+            f"{{ grep -qxF {source_bashrc} {bash_profile} || echo {source_bashrc} >> {bash_profile}; }}",
+            f"chown -R {shlex.quote(owner)} {shlex.quote(home)}",
+            f"chmod 775 {shlex.quote(home)}",
+            f"chmod 700 {ssh_dir}",
+            f"chmod 644 {bashrc} {bash_profile}",
+        ]
+
+    def _prepare_host(self, ssh: SSHClient, command: str, server_name: str) -> None:
+        """Runs a `prepare_command` on its own, for the API path where container operations aren't shell commands."""
+        if not command:
+            return
+        ssh_timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+        result = run_command(ssh, command, timeout=ssh_timeout)
+        if result.exit_status != 0:
+            raise Exception(f"Failed to write container configuration on {server_name}: {result.stderr.strip()}")
+
+    def _build_prefetch_exec_args(self, image: Image) -> List[str]:
+        """The command run inside the container to read the image's hot files, so their chunks are fetched now."""
+        paths = " ".join(shlex.quote(path) for path in image.prefetch_files)
+        return ["sh", "-c", f"find {paths} -type f -exec cat {{}} + > /dev/null 2>&1"]
+
+    def _prefetch_image_files(self, ssh, container_name: str, image: Image) -> None:
+        """
+        Starts reading `image.prefetch_files` in the background inside the
+        container. The instance is usable meanwhile; files read first are
+        fetched on demand, so a failure here is only logged.
+        """
+        ssh_timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+        try:
+            if self._uses_podman_api():
+                exit_status, _, error_output = self._podman_api(ssh).exec_in_container(
+                    container_name, self._build_prefetch_exec_args(image), timeout=ssh_timeout, detach=True,
+                )
+            else:
+                command = shlex.join(["sudo", "podman", "exec", "-d", container_name] + self._build_prefetch_exec_args(image))
+                result = run_command(ssh, command, timeout=ssh_timeout)
+                exit_status, error_output = result.exit_status, result.stderr
+            if exit_status != 0:
+                logger.warning(f"Could not start prefetch of {len(image.prefetch_files)} paths in {container_name}: {error_output.strip()}")
+            else:
+                logger.debug(f"Prefetching {len(image.prefetch_files)} paths of '{image.custom_registry_image_name}' in {container_name}")
+        except Exception as e:
+            logger.warning(f"Could not start prefetch in {container_name}: {e}")
+
     def _configure_podman_container(
-        self, ssh, container_name: str,
+        self, ssh, container_name: str, setup: str = "",
     ) -> str:
         try: 
-            username = self.account.username
-            ssh_public_key = self.account.ssh_public_key
             server_name = self.server.name
             """Configure podman container"""
-            container_configure_command = [
-                "sudo",
-                "podman",
-                "exec",
-                container_name,
-                "bash",
-                "-c",
-                f"chmod 775 /home/ubuntu && "
-                f"chown -R ubuntu:ubuntu /home/ubuntu && "
-                f"mkdir -p /home/ubuntu/.ssh && "
-                f"chmod 700 /home/ubuntu/.ssh && "
-                f"grep -qxF '{ssh_public_key}' /home/ubuntu/.ssh/authorized_keys || echo '{ssh_public_key}' >> /home/ubuntu/.ssh/authorized_keys && "
-                f"chmod 600 /home/ubuntu/.ssh/authorized_keys && "
-                f"touch /home/ubuntu/.bashrc && "
-                f"chmod 644 /home/ubuntu/.bashrc && "
-                f"touch /home/ubuntu/.bash_profile && "
-                f"chmod 644 /home/ubuntu/.bash_profile && "
-                f"echo 'LANG=\"en_US.UTF-8\"' | tee /etc/default/locale && "
-                f"sed -i '\\|source /home/ubuntu/.bashrc|d' /home/ubuntu/.bash_profile && echo 'source /home/ubuntu/.bashrc' >> /home/ubuntu/.bash_profile && "
-                f"grep -qxF '[[ -n \\$SSH_TTY && -z \\$TMUX ]] && echo -e \"\\n🚀 Welcome {username}, You are connected to \\$(hostname) 🚀\\n\"' /home/ubuntu/.bashrc || "
-                f"echo '[[ -n \\$SSH_TTY && -z \\$TMUX ]] && echo -e \"\\n🚀 Welcome {username}, You are connected to \\$(hostname) 🚀\\n\"' >> /home/ubuntu/.bashrc && "
-                f"chmod 644 /etc/default/locale",
-            ]
-            container_configure_command = subprocess.list2cmdline(container_configure_command)
-
-            stdin, stdout, stderr = ssh.exec_command(container_configure_command)
-            exit_status = stdout.channel.recv_exit_status()
+            ssh_timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+            if self._uses_podman_api():
+                exit_status, _, error_output = self._podman_api(ssh).exec_in_container(
+                    container_name, self._build_configure_exec_args(setup), timeout=ssh_timeout,
+                )
+            else:
+                container_configure_command = self._build_configure_command(container_name, setup)
+                result = run_command(ssh, container_configure_command, timeout=ssh_timeout)
+                exit_status = result.exit_status
+                error_output = result.stderr
 
             if exit_status == 0:
                 logger.info(f"Successfully configured Podman container {container_name} on {server_name}")
             else:
-                error_msg = stderr.read().decode().strip()
-                logger.error(f"Couldn't configure container {container_name}, Stopping instance... {error_msg}")
-                self.stop()
+                error_msg = error_output.strip()
+                logger.error(f"Couldn't configure container {container_name}, stopping it... {error_msg}")
+                self._stop_container(ssh, container_name, server_name)
                 raise Exception(
                     f"Couldn't configure Podman container {container_name} on {server_name}. "
                 )
@@ -422,12 +1191,20 @@ class Instance(models.Model):
             logger.exception(f"Error accessing Podman stop/remove settings: {e}")
             raise ImproperlyConfigured(f"Error accessing Podman stop/remove settings: {e}") from e
 
+        if self._uses_podman_api():
+            try:
+                self._podman_api(ssh).stop_container(container_name, server_name, stop_timeout=stop_timeout, timeout=ssh_timeout)
+                return
+            except Exception as e:
+                logger.exception(f"Error stopping {container_name} through the Podman API on {server_name}: {e}")
+                raise Exception(f"Failed during stop operation for {container_name} on {server_name}: {e}") from e
+
         stop_command = f"sudo podman stop -t {stop_timeout} {container_name}"
         logger.debug(f"Executing stop command on {server_name}: {stop_command}")
         try:
-            stdin, stdout, stderr = ssh.exec_command(stop_command, timeout=ssh_timeout)
-            exit_status = stdout.channel.recv_exit_status()
-            stderr_output = stderr.read().decode().strip()
+            result = run_command(ssh, stop_command, timeout=ssh_timeout)
+            exit_status = result.exit_status
+            stderr_output = result.stderr.strip()
 
             if exit_status == 0:
                 logger.info(f"Container {container_name} stopped successfully on {server_name}")
@@ -455,6 +1232,16 @@ class Instance(models.Model):
             logger.exception(f"Error accessing Podman stop/remove settings: {e}")
             raise ImproperlyConfigured(f"Error accessing Podman stop/remove settings: {e}") from e
 
+        if self._uses_podman_api():
+            try:
+                self._podman_api(ssh).remove_container(
+                    container_name, server_name, force=force_remove, ignore_not_found=ignore_not_found, timeout=ssh_timeout,
+                )
+                return
+            except Exception as e:
+                logger.exception(f"Error removing {container_name} through the Podman API on {server_name}: {e}")
+                raise Exception(f"Failed during remove operation for {container_name} on {server_name}: {e}") from e
+
         remove_command_parts = [f"sudo podman", "rm"]
         if force_remove:
             remove_command_parts.append("-f")
@@ -463,9 +1250,9 @@ class Instance(models.Model):
 
         logger.debug(f"Executing remove command on {server_name}: {remove_command}")
         try:
-            stdin, stdout, stderr = ssh.exec_command(remove_command, timeout=ssh_timeout)
-            exit_status = stdout.channel.recv_exit_status()
-            stderr_output = stderr.read().decode().strip()
+            result = run_command(ssh, remove_command, timeout=ssh_timeout)
+            exit_status = result.exit_status
+            stderr_output = result.stderr.strip()
 
             if exit_status == 0:
                 logger.info(f"Container {container_name} removed successfully on {server_name}.")
@@ -486,21 +1273,50 @@ class Instance(models.Model):
             else:
                 raise e
             
-    def _ensure_image_pulled(self, ssh, image_name_in_registry: str, instance_id: str) -> bool:
+    def _ensure_image_pulled(
+        self,
+        ssh,
+        image_name_in_registry: str,
+        instance_id: str,
+        progress_callback: Callable[[PullProgressEvent], None] | None = None,
+        timeout: int | None = None,
+    ) -> bool:
         """
         Attempts to pull the specified image from the custom registry on the remote host.
         This serves as validation that the user manually pushed the image.
+        Layer progress is reported to `progress_callback` as it arrives.
+        `timeout` overrides PODMAN_SETTINGS['ssh_exec_timeout_pull'].
         """
         podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
-        ssh_timeout = podman_settings.get('ssh_exec_timeout_pull', 300) # e.g., 5 minutes
+        ssh_timeout = timeout or podman_settings.get('ssh_exec_timeout_pull', 300) # e.g., 5 minutes
+
+        if self._uses_podman_api():
+            logger.info(f"Verifying image '{image_name_in_registry}' exists on {instance_id} by pulling through the Podman API...")
+            try:
+                return self._podman_api(ssh).ensure_image_pulled(
+                    image_name_in_registry, instance_id, progress_callback=progress_callback, timeout=ssh_timeout,
+                )
+            except Exception as e:
+                logger.exception(f"Error during image pull verification for '{image_name_in_registry}' on {instance_id}: {e}")
+                if "Image" in str(e) and ("not found" in str(e) or "pull failed" in str(e)):
+                    raise
+                raise Exception(f"System error during image pull verification on {instance_id}: {e}") from e
 
         # Ensure the target server's podman is logged into the registry
         pull_command = f"sudo podman pull {image_name_in_registry}"
         logger.info(f"Verifying image '{image_name_in_registry}' exists on {instance_id} by pulling...")
         try:
-            stdin, stdout, stderr = ssh.exec_command(pull_command, timeout=ssh_timeout)
-            exit_status = stdout.channel.recv_exit_status()
-            stderr_output = stderr.read().decode().strip()
+            def _on_line(stream: str, line: str) -> None:
+                event = parse_pull_progress(line)
+                if event is None:
+                    return
+                logger.debug(f"Pull progress for '{image_name_in_registry}' on {instance_id}: {event.kind} {event.digest or ''} {event.state or ''}")
+                if progress_callback:
+                    progress_callback(event)
+
+            result = run_command(ssh, pull_command, timeout=ssh_timeout, on_line=_on_line)
+            exit_status = result.exit_status
+            stderr_output = result.stderr.strip()
 
             if exit_status == 0:
                 logger.info(f"Image '{image_name_in_registry}' is available locally on {instance_id}.")
@@ -517,6 +1333,34 @@ class Instance(models.Model):
             else:
                 raise Exception(f"System error during image pull verification on {instance_id}: {e}") from e
 
+    def _inspect_user_container(self, ssh: SSHClient, container_name: str, hostname: str) -> Dict[str, Any] | None:
+        """The `podman container inspect` report of the container, or None if there is no such container."""
+        ssh_timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout_short', 20)
+        if self._uses_podman_api():
+            return self._podman_api(ssh).inspect_container(container_name, hostname, timeout=ssh_timeout)
+
+        result = run_command(ssh, f"sudo podman container inspect {container_name}", timeout=ssh_timeout)
+        if result.exit_status != 0:
+            if result.exit_status == 125 or "no such container" in result.stderr.lower():
+                logger.info(f"Container '{container_name}' not found on {hostname}.")
+                return None
+            raise Exception(f"Failed to inspect container {container_name} on {hostname}: {result.stderr.strip()}")
+        reports = json.loads(result.stdout)
+        return reports[0] if reports else None
+
+    def _start_existing_container(self, ssh: SSHClient, container_name: str, server_name: str, prepare_command: str = "") -> None:
+        """`podman start` of a stopped container, after `prepare_command` on the host as in _run_podman_container()."""
+        ssh_timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+        if self._uses_podman_api():
+            self._prepare_host(ssh, prepare_command, server_name)
+            self._podman_api(ssh).start_container(container_name, server_name, timeout=ssh_timeout)
+            return
+
+        command = f"sudo podman start {container_name}"
+        result = run_command(ssh, f"{prepare_command} && {command}" if prepare_command else command, timeout=ssh_timeout)
+        if result.exit_status != 0:
+            raise Exception(f"Failed to start container {container_name} on {server_name}: {result.stderr.strip()}")
+
     def _check_user_container_running(self, ssh: paramiko.SSHClient, container_name: str, hostname: str) -> bool:
         """
         Checks if a container with the given name is currently in 'running' state
@@ -526,14 +1370,21 @@ class Instance(models.Model):
         podman_settings = getattr(settings, 'PODMAN_SETTINGS', {})
         ssh_timeout = podman_settings.get('ssh_exec_timeout_short', 20)
 
+        if self._uses_podman_api():
+            try:
+                return self._podman_api(ssh).check_container_running(container_name, hostname, timeout=ssh_timeout)
+            except Exception as e:
+                logger.exception(f"Error checking status of container '{container_name}' through the Podman API on {hostname}: {e}")
+                raise Exception(f"Failed to execute status check command on {hostname}: {e}") from e
+
         command = f"sudo podman inspect {container_name} --format '{{{{.State.Status}}}}'"
         logger.debug(f"Executing status check command: {command}")
 
         try:
-            stdin, stdout, stderr = ssh.exec_command(command, timeout=ssh_timeout)
-            stderr_output = stderr.read().decode().strip()
-            status_output = stdout.read().decode().strip()
-            exit_status = stdout.channel.recv_exit_status()
+            result = run_command(ssh, command, timeout=ssh_timeout)
+            stderr_output = result.stderr.strip()
+            status_output = result.stdout.strip()
+            exit_status = result.exit_status
 
             if exit_status == 0:
                 actual_status = status_output.lower()
@@ -569,6 +1420,11 @@ class Instance(models.Model):
             "status": self.status,
             "instance_ip": self.instance_ip,
             "n_gpus": self.n_gpus,
+            "gpu_indices": self.gpu_indices,
+            # Where users connect: the server's address and the instance's published ports.
+            "server_hostname": self.server.ip_address,
+            "ssh_host_port": self.host_ports.get("ssh"),
+            "host_ports": self.host_ports,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
         }
@@ -0,0 +1,437 @@
+import uuid
+import logging
+
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import Q
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from typing import Any, Dict, List, Optional
+
+from user_manager.models import Account
+
+from .instance import Instance, InstanceStatus
+from .server import Server, LIVE_INSTANCE_STATUSES
+from .image import Image
+
+from ..exceptions import (
+    InstanceAlreadyRunningException,
+    InstanceAlreadyStoppedException,
+    NoAvailableServerException,
+    ImageNotFoundException,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def generate_job_id():
+    return f"j-{uuid.uuid4().hex[:17]}"
+
+
+class JobKind(models.TextChoices):
+    LAUNCH = 'launch', _('Launch')
+    START = 'start', _('Start')
+    STOP = 'stop', _('Stop')
+    SUSPEND = 'suspend', _('Suspend')
+    BULK_LAUNCH = 'bulk_launch', _('Bulk launch')
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'queued', _('Queued')
+    WAITING = 'waiting', _('Waiting for capacity')
+    RUNNING = 'running', _('Running')
+    SUCCEEDED = 'succeeded', _('Succeeded')
+    FAILED = 'failed', _('Failed')
+
+
+class Job(models.Model):
+    """
+    A durable launch/start/stop operation executed by the `run_job_workers`
+    pool instead of inside the HTTP request. Workers claim queued rows with
+    SELECT ... FOR UPDATE SKIP LOCKED so any number of them can run side by side.
+    """
+    job_id = models.CharField(max_length=100, unique=True, default=generate_job_id, editable=False)
+    kind = models.CharField(max_length=20, choices=JobKind.choices)
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    account = models.ForeignKey(Account, related_name="jobs", on_delete=models.CASCADE)
+    instance = models.ForeignKey(Instance, related_name="jobs", null=True, blank=True, on_delete=models.SET_NULL)
+    payload = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    error_code = models.CharField(max_length=50, blank=True, default="")
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    locked_by = models.CharField(max_length=255, blank=True, default="")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    reservation = models.JSONField(default=dict, blank=True, help_text="GPUs and host ports a running launch holds until its instance exists.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.kind}-{self.job_id}"
+
+    @classmethod
+    def enqueue(
+        cls,
+        kind: str,
+        account: Account,
+        instance: Optional[Instance] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+        status: str = JobStatus.QUEUED,
+    ) -> "Job":
+        if max_attempts is None:
+            max_attempts = getattr(settings, 'JOB_QUEUE_SETTINGS', {}).get('max_attempts', 3)
+        job = cls.objects.create(
+            kind=kind,
+            status=status,
+            account=account,
+            instance=instance,
+            payload=payload or {},
+            max_attempts=max_attempts,
+        )
+        logger.info(f"Created {status} {kind} job {job.job_id} for user {account.username}")
+        return job
+
+    @classmethod
+    def waitlist(cls) -> List["Job"]:
+        """
+        Launches waiting for capacity, in dispatch order. Accounts are served
+        by fair share: a job's rank is its account's recent GPU usage plus the
+        GPUs of that account's own jobs up to and including this one, so a
+        light user's request goes ahead of a heavy user's backlog. Ties go to
+        the oldest request. Jobs that waited longer than WAITLIST_SETTINGS
+        ['starvation_after'] go first, oldest first, whatever their rank.
+        """
+        jobs = list(cls.objects.filter(kind=JobKind.LAUNCH, status=JobStatus.WAITING).select_related("account").order_by("created_at"))
+        usage = cls._recent_gpu_usage({job.account_id for job in jobs})
+        starved_before = cls._starved_before()
+        requested: Dict[int, int] = {}
+        ranked = []
+        for job in jobs:
+            requested[job.account_id] = requested.get(job.account_id, 0) + job._requested_gpus()
+            rank = usage.get(job.account_id, 0.0) + requested[job.account_id]
+            ranked.append((job.created_at >= starved_before, 0 if job.created_at < starved_before else rank, job.created_at, job))
+        return [job for *_, job in sorted(ranked, key=lambda item: item[:3])]
+
+    @classmethod
+    def _starved_before(cls):
+        """Waiting launches created before this are starved, see waitlist()."""
+        return timezone.now() - timedelta(seconds=getattr(settings, 'WAITLIST_SETTINGS', {}).get('starvation_after', 3600))
+
+    @classmethod
+    def waitlist_report(cls) -> List[Dict[str, Any]]:
+        """
+        Every waiting launch with its position and estimated wait. The estimate
+        divides the GPUs needed by everyone up to that position, minus what is
+        free now, by the rate at which GPUs were released recently.
+        """
+        release_rate = cls._gpu_release_rate()
+        free_gpus = sum(Server.objects.filter(is_active=True).values_list("available_gpus", flat=True))
+        report, needed = [], 0
+        for position, job in enumerate(cls.waitlist(), start=1):
+            needed += job._requested_gpus()
+            shortfall = max(0, needed - free_gpus)
+            if not shortfall:
+                estimate = 0
+            else:
+                estimate = round(shortfall / release_rate) if release_rate else None
+            report.append({
+                "job_id": job.job_id,
+                "account": job.account.username,
+                "n_gpus": job._requested_gpus(),
+                "position": position,
+                "waiting_since": job.created_at,
+                "estimated_wait_seconds": estimate,
+            })
+        return report
+
+    @classmethod
+    def dispatch_waiting(cls) -> int:
+        """
+        Queues the waiting launches that fit the currently free GPUs, in
+        waitlist() order, and fails those that waited longer than `max_wait`.
+        Each job is placed in memory the way Server.reserve() will place it
+        when it runs (scheduling policy, image locality and warm containers),
+        so only jobs that will find a server are queued.
+        Smaller jobs are not backfilled past a starved job that doesn't fit,
+        so freed GPUs accumulate for it instead of being taken one by one.
+        A dispatched job that loses its GPUs to a race goes back to waiting.
+        """
+        waitlist_settings = getattr(settings, 'WAITLIST_SETTINGS', {})
+        cutoff = timezone.now() - timedelta(seconds=waitlist_settings.get('max_wait', 86400))
+        expired = cls.objects.filter(kind=JobKind.LAUNCH, status=JobStatus.WAITING, created_at__lt=cutoff).update(
+            status=JobStatus.FAILED,
+            error="Timed out waiting for free GPUs",
+            error_code="no_available_server",
+            finished_at=timezone.now(),
+        )
+        if expired:
+            logger.warning(f"Expired {expired} launches that waited too long for capacity")
+
+        waiting = cls.waitlist()
+        if not waiting:
+            return 0
+        policy = Server._get_policy()
+        servers = list(Server._candidates(1).order_by("id"))
+        images = Image.objects.in_bulk({job.payload.get("image_id") for job in waiting})
+        starved_before = cls._starved_before()
+        dispatched = []
+        for job in waiting:
+            n_gpus = job._requested_gpus()
+            fits = [server for server in servers if server.available_gpus >= n_gpus]
+            server = Server._pick(fits, policy, Server._placement_bonus(images.get(job.payload.get("image_id")), n_gpus))
+            if server is None:
+                if not fits and job.created_at < starved_before:
+                    logger.info(f"Holding free GPUs for starved job {job.job_id} ({n_gpus} GPUs)")
+                    break
+                continue
+            server.available_gpus -= n_gpus
+            dispatched.append(job.id)
+        if not dispatched:
+            return 0
+        count = cls.objects.filter(id__in=dispatched, status=JobStatus.WAITING).update(status=JobStatus.QUEUED)
+        logger.info(f"Dispatched {count} of {len(waiting)} waiting launches")
+        return count
+
+    @classmethod
+    def _recent_gpu_usage(cls, account_ids) -> Dict[int, float]:
+        """Average GPUs each account held over the usage window, plus what it holds now."""
+        if not account_ids:
+            return {}
+        window = getattr(settings, 'WAITLIST_SETTINGS', {}).get('usage_window', 86400)
+        now = timezone.now()
+        since = now - timedelta(seconds=window)
+        usage = {account_id: 0.0 for account_id in account_ids}
+        instances = Instance.objects.filter(account_id__in=account_ids).filter(
+            Q(status__in=LIVE_INSTANCE_STATUSES) | Q(updated_at__gte=since)
+        ).values("account_id", "n_gpus", "reserved_gpus", "status", "created_at", "updated_at")
+        for row in instances:
+            live = row["status"] in LIVE_INSTANCE_STATUSES
+            started = max(row["created_at"], since)
+            ended = now if live else row["updated_at"]
+            if ended > started:
+                usage[row["account_id"]] += row["n_gpus"] * (ended - started).total_seconds() / window
+            usage[row["account_id"]] += row["reserved_gpus"]
+        return usage
+
+    @classmethod
+    def _gpu_release_rate(cls) -> float:
+        """GPUs per second given back by stopped instances over the usage window."""
+        window = getattr(settings, 'WAITLIST_SETTINGS', {}).get('usage_window', 86400)
+        since = timezone.now() - timedelta(seconds=window)
+        released = Instance.objects.filter(status__in=[InstanceStatus.STOPPED, InstanceStatus.SUSPENDED], updated_at__gte=since).values_list("n_gpus", flat=True)
+        return sum(released) / window
+
+    def _requested_gpus(self) -> int:
+        return int(self.payload.get("n_gpus", 1))
+
+    @classmethod
+    def claim(cls, worker_id: str) -> Optional["Job"]:
+        """
+        Atomically takes the oldest queued job for ``worker_id``. Rows locked by
+        another worker's claim are skipped instead of waited on.
+        """
+        with transaction.atomic():
+            job = (
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(status=JobStatus.QUEUED)
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            job.status = JobStatus.RUNNING
+            job.locked_by = worker_id
+            job.attempts += 1
+            job.started_at = now
+            job.heartbeat_at = now
+            job.save(update_fields=['status', 'locked_by', 'attempts', 'started_at', 'heartbeat_at'])
+        return job
+
+    @classmethod
+    def heartbeat(cls, job_ids: List[str], worker_id: str) -> int:
+        """Marks the given running jobs as still alive."""
+        return cls.objects.filter(
+            job_id__in=job_ids, locked_by=worker_id, status=JobStatus.RUNNING,
+        ).update(heartbeat_at=timezone.now())
+
+    @classmethod
+    def requeue_stale(cls, stale_after: float) -> int:
+        """
+        Puts running jobs whose worker stopped heartbeating back in the queue,
+        or fails them once they have used up their attempts.
+        """
+        cutoff = timezone.now() - timedelta(seconds=stale_after)
+        requeued = 0
+        with transaction.atomic():
+            stale = cls.objects.select_for_update(skip_locked=True).filter(
+                status=JobStatus.RUNNING, heartbeat_at__lt=cutoff,
+            )
+            for job in stale:
+                logger.warning(f"Job {job.job_id} lost its worker {job.locked_by} (attempt {job.attempts}/{job.max_attempts})")
+                instance = job._recover_reservation() if job.reservation else None
+                if instance is not None:
+                    # The launch got as far as committing its instance, running it again would launch a second one.
+                    job.status = JobStatus.SUCCEEDED
+                    job.instance = instance
+                    job.result = {"instance_id": instance.instance_id, "server": instance.server.name}
+                    job.finished_at = timezone.now()
+                elif job.attempts < job.max_attempts:
+                    job.status = JobStatus.QUEUED
+                    job.locked_by = ""
+                    requeued += 1
+                else:
+                    job.status = JobStatus.FAILED
+                    job.error = f"Worker {job.locked_by} stopped responding"
+                    job.error_code = "worker_lost"
+                    job.finished_at = timezone.now()
+                job.save()
+        return requeued
+
+    def _recover_reservation(self) -> Optional[Instance]:
+        """
+        Settles the GPUs and host ports a launch held when its worker was lost:
+        returns the instance this attempt created, which owns them now, or
+        else gives them back to the server.
+        """
+        reservation, self.reservation = self.reservation, {}
+        instance = Instance.objects.filter(
+            account=self.account, server_id=reservation["server_id"], created_at__gte=self.started_at,
+        ).select_related("server").first()
+        if instance is not None:
+            return instance
+        server = Server.objects.filter(pk=reservation["server_id"]).first()
+        if server is not None:
+            server.release_gpus(reservation["n_gpus"], reservation["gpu_indices"], list(reservation["host_ports"].values()))
+        return None
+
+    def _hold_reservation(self, reservation: Dict[str, Any]) -> None:
+        """Records what a launch reserved before it starts, so requeue_stale() can settle it if the worker dies."""
+        self.reservation = reservation
+        Job.objects.filter(pk=self.pk).update(reservation=reservation)
+
+    def run(self) -> None:
+        """Executes the job and records its outcome. Never raises."""
+        logger.info(f"Running {self.kind} job {self.job_id} (attempt {self.attempts})")
+        try:
+            self.status = JobStatus.SUCCEEDED
+            self.result = self._execute() or {}
+        except InstanceAlreadyRunningException:
+            self._fail("already_running", "Instance is already running")
+        except InstanceAlreadyStoppedException:
+            self._fail("already_stopped", "Instance is already stopped")
+        except ImageNotFoundException as e:
+            self._fail("image_not_found", str(e))
+        except NoAvailableServerException as e:
+            if self.kind == JobKind.LAUNCH:
+                # Someone else took the GPUs, back to the waitlist until they free up.
+                logger.info(f"Job {self.job_id} found no free GPUs, waiting for capacity")
+                self.status = JobStatus.WAITING
+                self.locked_by = ""
+            else:
+                self._fail("no_available_server", str(e) or "No available servers")
+        except Exception as e:
+            logger.exception(f"Job {self.job_id} failed: {e}")
+            self._fail("error", str(e))
+        if self.status != JobStatus.WAITING:
+            self.finished_at = timezone.now()
+        # Handed to the instance, or given back by Instance.launch() when it failed.
+        self.reservation = {}
+        self.save(update_fields=['status', 'result', 'error', 'error_code', 'instance', 'locked_by', 'finished_at', 'reservation'])
+        logger.info(f"Job {self.job_id} finished with status '{self.status}'")
+
+    def _fail(self, error_code: str, error: str) -> None:
+        self.status = JobStatus.FAILED
+        self.error_code = error_code
+        self.error = error
+
+    def _execute(self) -> Dict[str, Any]:
+        if self.kind == JobKind.LAUNCH:
+            # Placement happens when the job runs so it sees the current fleet.
+            n_gpus = self.payload.get("n_gpus", 1)
+            image = Image.objects.filter(id=self.payload["image_id"]).first()
+            if image is not None and image.check_registry() is False:
+                raise ImageNotFoundException(f"Image '{image.custom_registry_image_name}' is not in the registry")
+            server = Server.reserve(n_gpus, image=image)
+            if not server:
+                raise NoAvailableServerException
+            self._hold_reservation({"server_id": server.id, "n_gpus": n_gpus, "gpu_indices": [], "host_ports": {}})
+            try:
+                gpu_indices, host_ports = Instance._claim_devices(server, n_gpus)
+            except Exception:
+                server.release_gpus(n_gpus)
+                raise
+            self._hold_reservation({"server_id": server.id, "n_gpus": n_gpus, "gpu_indices": gpu_indices, "host_ports": host_ports})
+            instance_id = Instance.launch(self.account, server, self.payload["image_id"], n_gpus, devices=(gpu_indices, host_ports))
+            self.instance = Instance.objects.get(instance_id=instance_id)
+            return {"instance_id": instance_id, "server": server.name}
+
+        if self.kind == JobKind.BULK_LAUNCH:
+            return self._execute_bulk_launch()
+
+        if self.instance is None:
+            raise ValueError(f"Job {self.job_id} has no instance to {self.kind}")
+        if self.kind == JobKind.START:
+            self.instance.start()
+        elif self.kind == JobKind.STOP:
+            self.instance.stop()
+        elif self.kind == JobKind.SUSPEND:
+            self.instance.suspend()
+        else:
+            raise ValueError(f"Unknown job kind '{self.kind}'")
+        return {"instance_id": self.instance.instance_id}
+
+    def _execute_bulk_launch(self) -> Dict[str, Any]:
+        items = self.payload.get("items", [])
+        accounts = Account.objects.in_bulk({item["account_id"] for item in items if item.get("account_id")})
+        specs, rejected = [], []
+        for index, item in enumerate(items):
+            account = accounts.get(item.get("account_id"))
+            if item.get("error") or account is None:
+                rejected.append({"index": index, "account": item.get("account"), "ok": False, "error": item.get("error") or "Unknown account"})
+                continue
+            specs.append((index, {"account": account, "image_id": item["image_id"], "n_gpus": item.get("n_gpus", 1)}))
+
+        launched = Instance.bulk_launch([spec for _, spec in specs])
+        for (index, _), result in zip(specs, launched):
+            result["index"] = index
+        results = sorted(launched + rejected, key=lambda result: result["index"])
+
+        succeeded = sum(1 for result in results if result["ok"])
+        if succeeded < len(results):
+            self.error_code = "partial_failure" if succeeded else "error"
+            self.error = f"{len(results) - succeeded} of {len(results)} launches failed"
+        if len(results) and not succeeded:
+            self.status = JobStatus.FAILED
+        return {"items": results, "requested": len(results), "launched": succeeded, "failed": len(results) - succeeded}
+
+    def waitlist_entry(self) -> Optional[Dict[str, Any]]:
+        """This job's position and estimated wait, while it is waiting for capacity."""
+        if self.status != JobStatus.WAITING:
+            return None
+        return next((entry for entry in Job.waitlist_report() if entry["job_id"] == self.job_id), None)
+
+    def serialize(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "instance_id": self.instance.instance_id if self.instance else None,
+            "result": self.result,
+            "error": self.error,
+            "error_code": self.error_code,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "waitlist": self.waitlist_entry(),
+        }
@@ -1,16 +1,32 @@
 import logging
 
-from django.db import models
-from typing import List
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from typing import Dict, List, Optional, Tuple
+
+from ..fleet import FleetIndex, get_fleet_index
+from ..exceptions import NoAvailableServerException
 
 logger = logging.getLogger(__name__)
 
+SCHEDULING_POLICY_BEST_FIT = 'best_fit'
+SCHEDULING_POLICY_WORST_FIT = 'worst_fit'
+
+# Instance statuses that hold GPUs and a running container on a server.
+LIVE_INSTANCE_STATUSES = ['pending', 'running']
+
+# Reservations tried on the fleet index's picks before falling back to the database.
+FLEET_INDEX_PICK_ATTEMPTS = 3
+
 class Server(models.Model):
     name = models.CharField(max_length=100, unique=True)
     ip_address = models.GenericIPAddressField()
     is_active = models.BooleanField(default=True)
     total_gpus = models.IntegerField()
     available_gpus = models.IntegerField()
+    allocated_gpu_indices = models.JSONField(default=list, blank=True, help_text="GPU device indices held by instances.")
+    allocated_host_ports = models.JSONField(default=list, blank=True, help_text="Host ports published by instances.")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateField(auto_now=True)
     
@@ -39,10 +55,242 @@ class Server(models.Model):
         logger.info(f"Server {name} created with ip {ip_address}")
 
     @classmethod
-    def get_available_server(cls):
-        """Returns an available server that is not running an instance."""
-        return cls.objects.filter(is_active=True).exclude(instances__status="running").first()
-    
+    def get_available_server(
+        cls, n_gpus: int = 1, policy: Optional[str] = None, pool: Optional[models.QuerySet] = None, image=None,
+    ) -> Optional["Server"]:
+        """
+        Returns the server the scheduling policy would pick for `n_gpus` right now,
+        without reserving anything. Use reserve() to actually claim the GPUs.
+        """
+        policy = cls._get_policy(policy)
+        bonus = cls._placement_bonus(image, n_gpus)
+        index = cls._fresh_fleet_index() if pool is None else None
+        if index is not None:
+            server_id = index.pick(n_gpus, spread=policy == SCHEDULING_POLICY_WORST_FIT, bonus=bonus)
+            return cls.objects.filter(pk=server_id).first() if server_id is not None else None
+        return cls._pick(list(cls._candidates(n_gpus, pool).order_by("id")), policy, bonus)
+
+    @classmethod
+    def reserve(
+        cls, n_gpus: int = 1, policy: Optional[str] = None, pool: Optional[models.QuerySet] = None, image=None,
+    ) -> Optional["Server"]:
+        """
+        Picks a server for `n_gpus` with the scheduling policy and takes the GPUs
+        off its `available_gpus` in one transaction. The chosen row is locked
+        with SELECT ... FOR UPDATE, so concurrent launches never claim the same
+        GPUs. Returns None when nothing fits. `pool` limits the candidates to
+        a subset of servers. With an `image`, servers that already hold it (or
+        its base layers) or a warm container of it are preferred, see
+        _placement_bonus().
+
+        With a fresh fleet index the pick is made in memory and only that row is
+        locked; if the index was wrong about it, the next pick is tried.
+        """
+        policy = cls._get_policy(policy)
+        bonus = cls._placement_bonus(image, n_gpus)
+        index = cls._fresh_fleet_index() if pool is None else None
+        if index is not None:
+            exclude = set()
+            for _ in range(FLEET_INDEX_PICK_ATTEMPTS):
+                server_id = index.pick(n_gpus, spread=policy == SCHEDULING_POLICY_WORST_FIT, exclude=exclude, bonus=bonus)
+                if server_id is None:
+                    return None
+                server = cls._reserve_on(server_id, n_gpus)
+                if server is not None:
+                    return server
+                exclude.add(server_id)
+            index.note_fallback()
+
+        with transaction.atomic():
+            # Locking in id order keeps concurrent reservations from deadlocking.
+            candidates = list(cls._candidates(n_gpus, pool).select_for_update().order_by("id"))
+            server = cls._pick(candidates, policy, bonus)
+            if server is None:
+                return None
+            server.available_gpus -= n_gpus
+            server.save(update_fields=["available_gpus"])
+        logger.info(f"Reserved {n_gpus} GPUs on {server.name} ({server.available_gpus}/{server.total_gpus} left)")
+        return server
+
+    @classmethod
+    def place_many(
+        cls, gpu_requests: List[int], policy: Optional[str] = None, images: Optional[list] = None,
+    ) -> List[Optional["Server"]]:
+        """
+        Reserves GPUs for a batch of launches in order, one reservation per request.
+        Requests that don't fit get None.
+        """
+        images = images or [None] * len(gpu_requests)
+        return [cls.reserve(n_gpus, policy=policy, image=image) for n_gpus, image in zip(gpu_requests, images)]
+
+    @classmethod
+    def _fresh_fleet_index(cls) -> Optional[FleetIndex]:
+        """The fleet index if it is enabled and in sync, otherwise None (use the database)."""
+        index = get_fleet_index()
+        if index is None:
+            return None
+        if not index.is_fresh():
+            logger.warning(f"Fleet index is stale (lag {index.refresh_lag()}s), placing from the database")
+            index.note_fallback()
+            return None
+        return index
+
+    @classmethod
+    def _candidates(cls, n_gpus: int, pool: Optional[models.QuerySet] = None) -> models.QuerySet:
+        return (cls.objects.all() if pool is None else pool).filter(is_active=True, available_gpus__gte=n_gpus)
+
+    @classmethod
+    def _get_policy(cls, policy: Optional[str] = None) -> str:
+        policy = policy or getattr(settings, 'SCHEDULER_SETTINGS', {}).get('policy', SCHEDULING_POLICY_BEST_FIT)
+        if policy not in (SCHEDULING_POLICY_BEST_FIT, SCHEDULING_POLICY_WORST_FIT):
+            raise ImproperlyConfigured(f"Unknown scheduling policy '{policy}'")
+        return policy
+
+    @classmethod
+    def _pick(cls, candidates: List["Server"], policy: str, bonus: Optional[Dict[int, float]] = None) -> Optional["Server"]:
+        """
+        best_fit packs instances onto the server with the fewest free GPUs that
+        still fit, keeping whole servers free for large requests. worst_fit
+        spreads them onto the server with the most free GPUs. A server's `bonus`
+        counts as that many GPUs in its favour either way.
+        """
+        bonus = bonus or {}
+        if policy == SCHEDULING_POLICY_WORST_FIT:
+            return max(candidates, key=lambda server: server.available_gpus + bonus.get(server.id, 0), default=None)
+        return min(candidates, key=lambda server: server.available_gpus - bonus.get(server.id, 0), default=None)
+
+    @classmethod
+    def _locality_bonus(cls, image=None) -> Dict[int, float]:
+        """
+        Placement credit, in GPUs, for servers that already hold `image`
+        (see ServerImage.locality()). SCHEDULER_SETTINGS['locality_weight'] sets
+        how much packing a warm image is worth: with the default of 8, a server
+        with the image cached wins over any tighter fit on an 8-GPU fleet.
+        """
+        from .server_image import ServerImage
+
+        weight = getattr(settings, 'SCHEDULER_SETTINGS', {}).get('locality_weight', 8.0)
+        if image is None or not weight:
+            return {}
+        return {server_id: weight * score for server_id, score in ServerImage.locality(image).items()}
+
+    @classmethod
+    def _warm_bonus(cls, image=None, n_gpus: int = 1) -> Dict[int, float]:
+        """
+        Placement credit, in GPUs, for servers with a warm container a launch
+        of `n_gpus` GPUs of `image` can take over (see WarmContainer.claim()).
+        SCHEDULER_SETTINGS['warm_weight'] defaults to twice the locality weight,
+        so such a server wins over one that only has the image cached.
+        """
+        from .warm_container import WarmContainer
+        from ..warm_pool import warm_pool_enabled
+
+        scheduler_settings = getattr(settings, 'SCHEDULER_SETTINGS', {})
+        weight = scheduler_settings.get('warm_weight', 2 * scheduler_settings.get('locality_weight', 8.0))
+        if image is None or not weight or not warm_pool_enabled():
+            return {}
+        server_ids = WarmContainer.objects.filter(image=image, n_gpus=n_gpus).values_list("server_id", flat=True).distinct()
+        return dict.fromkeys(server_ids, weight)
+
+    @classmethod
+    def _placement_bonus(cls, image=None, n_gpus: int = 1) -> Dict[int, float]:
+        """The credit of each server for a launch, see _locality_bonus() and _warm_bonus()."""
+        bonus = cls._locality_bonus(image)
+        for server_id, credit in cls._warm_bonus(image, n_gpus).items():
+            bonus[server_id] = bonus.get(server_id, 0) + credit
+        return bonus
+
+    @classmethod
+    def _reserve_on(cls, server_id: int, n_gpus: int) -> Optional["Server"]:
+        """Takes `n_gpus` on one server if it is active and has them free."""
+        with transaction.atomic():
+            server = cls.objects.select_for_update().filter(pk=server_id).first()
+            if server is None or not server.is_active or server.available_gpus < n_gpus:
+                return None
+            server.available_gpus -= n_gpus
+            server.save(update_fields=["available_gpus"])
+        logger.info(f"Reserved {n_gpus} GPUs on {server.name} ({server.available_gpus}/{server.total_gpus} left)")
+        return server
+
+    def reserve_gpus(self, n_gpus: int) -> bool:
+        """Takes `n_gpus` on this server if it is active and has them free."""
+        server = Server._reserve_on(self.pk, n_gpus)
+        if server is None:
+            return False
+        self.available_gpus = server.available_gpus
+        return True
+
+    def claim_devices(
+        self,
+        n_gpus: int,
+        n_ports: int = 0,
+        prefer_gpus: Optional[List[int]] = None,
+        prefer_ports: Optional[List[int]] = None,
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Picks `n_gpus` GPU device indices and `n_ports` host ports on this
+        server that no instance holds. GPUs come as a contiguous block when
+        possible (neighbouring GPUs usually share a faster interconnect), else
+        the lowest free ones; ports are the lowest free ones of the configured
+        host port range. `prefer_gpus` and `prefer_ports` are taken instead
+        when all of them are free, e.g. the devices a suspended container was
+        checkpointed with. The GPUs must have been reserved already, which
+        guarantees enough free indices.
+        """
+        with transaction.atomic():
+            server = Server.objects.select_for_update().get(pk=self.pk)
+            taken = set(server.allocated_gpu_indices)
+            free = [index for index in range(server.total_gpus) if index not in taken]
+            if len(free) < n_gpus:
+                raise NoAvailableServerException(f"Server {server.name} has no {n_gpus} free GPU devices")
+            if prefer_gpus and len(prefer_gpus) == n_gpus and set(prefer_gpus).issubset(free):
+                indices = sorted(prefer_gpus)
+            else:
+                indices = next(
+                    (free[i:i + n_gpus] for i in range(len(free) - n_gpus + 1) if free[i + n_gpus - 1] - free[i] == n_gpus - 1),
+                    free[:n_gpus],
+                )
+
+            taken_ports = set(server.allocated_host_ports)
+            first_port, last_port = self._host_port_range()
+            ports = []
+            if prefer_ports and len(prefer_ports) == n_ports and not taken_ports.intersection(prefer_ports):
+                ports = list(prefer_ports)
+            for port in range(first_port, last_port + 1):
+                if len(ports) == n_ports:
+                    break
+                if port not in taken_ports:
+                    ports.append(port)
+            if len(ports) < n_ports:
+                raise NoAvailableServerException(f"Server {server.name} has no {n_ports} free host ports")
+
+            server.allocated_gpu_indices = sorted(taken.union(indices))
+            server.allocated_host_ports = sorted(taken_ports.union(ports))
+            server.save(update_fields=["allocated_gpu_indices", "allocated_host_ports"])
+        self.allocated_gpu_indices = server.allocated_gpu_indices
+        self.allocated_host_ports = server.allocated_host_ports
+        logger.info(f"Allocated GPUs {indices} and host ports {ports} on {self.name}")
+        return indices, ports
+
+    def release_gpus(self, n_gpus: int, gpu_indices: Optional[List[int]] = None, host_ports: Optional[List[int]] = None) -> None:
+        """Gives `n_gpus`, the device indices behind them and the instance's host ports back to this server."""
+        released_indices, released_ports = set(gpu_indices or []), set(host_ports or [])
+        with transaction.atomic():
+            server = Server.objects.select_for_update().get(pk=self.pk)
+            server.available_gpus = min(server.available_gpus + n_gpus, server.total_gpus)
+            server.allocated_gpu_indices = [index for index in server.allocated_gpu_indices if index not in released_indices]
+            server.allocated_host_ports = [port for port in server.allocated_host_ports if port not in released_ports]
+            server.save(update_fields=["available_gpus", "allocated_gpu_indices", "allocated_host_ports"])
+        self.available_gpus = server.available_gpus
+        self.allocated_gpu_indices = server.allocated_gpu_indices
+        self.allocated_host_ports = server.allocated_host_ports
+        logger.info(f"Released {n_gpus} GPUs {gpu_indices or ''} on {self.name} ({self.available_gpus}/{self.total_gpus} free)")
+
+    @staticmethod
+    def _host_port_range() -> Tuple[int, int]:
+        first_port, last_port = getattr(settings, 'PODMAN_SETTINGS', {}).get('host_port_range', (20000, 29999))
+        return int(first_port), int(last_port)
+
     def mark_inactive(self):
         self.is_active = False
         self.save()
@@ -0,0 +1,132 @@
+import logging
+
+from datetime import timedelta
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from typing import Any, Dict, List, Optional
+
+from .server import Server
+from .image import Image
+
+
+logger = logging.getLogger(__name__)
+
+# Locality credited to a server holding a different image with the same OS and CUDA base.
+LOCALITY_SHARED_BASE = 0.5
+
+
+class ServerImage(models.Model):
+    """
+    An Image known to be in a Server's local Podman storage, with the digest
+    it has there. Rows are written after pulls and by `podman images` sweeps
+    (see image_cache.py), which also drop images that were removed.
+    """
+    server = models.ForeignKey(Server, related_name="images", on_delete=models.CASCADE)
+    image = models.ForeignKey(Image, related_name="server_copies", on_delete=models.CASCADE)
+    digest = models.CharField(max_length=100, blank=True, default="")
+    pulled_at = models.DateTimeField(null=True, blank=True, help_text="When we last pulled it onto the server.")
+    verified_at = models.DateTimeField(help_text="When the server last reported having it.")
+
+    class Meta:
+        unique_together = ("server", "image")
+
+    def __str__(self):
+        return f"{self.image} on {self.server}"
+
+    @classmethod
+    def is_present(cls, server: Server, image: Image) -> bool:
+        """
+        True when `server` was seen holding `image` within the presence TTL,
+        with the digest the registry last reported for it (see
+        Image.check_registry()) or, when that isn't known, the digest of the
+        most recent pull of it anywhere. Either way a tag pushed again makes
+        older copies stale.
+        """
+        cache_settings = getattr(settings, 'IMAGE_CACHE_SETTINGS', {})
+        if not cache_settings.get('enabled', True):
+            return False
+        verified_after = timezone.now() - timedelta(seconds=cache_settings.get('presence_ttl', 3600))
+        copy = cls.objects.filter(server=server, image=image, verified_at__gte=verified_after).first()
+        if copy is None:
+            return False
+        if image.registry_digest:
+            return copy.digest == image.registry_digest
+        latest_digest = (
+            cls.objects.filter(image=image, pulled_at__isnull=False)
+            .order_by("-pulled_at").values_list("digest", flat=True).first()
+        )
+        return latest_digest is None or copy.digest == latest_digest
+
+    @classmethod
+    def local_digest(cls, server: Server, image: Image) -> str:
+        """The digest `image` has on `server` when it is present there (see is_present()), else ''."""
+        if not cls.is_present(server, image):
+            return ""
+        return cls.objects.filter(server=server, image=image).values_list("digest", flat=True).first() or ""
+
+    @classmethod
+    def locality(cls, image: Image) -> Dict[int, float]:
+        """
+        How much of `image` each server already holds, by server id: 1.0 when
+        it has the image itself (as is_present() would say), LOCALITY_SHARED_BASE
+        when it only has other images on the same OS and CUDA release, whose
+        base layers the pull can reuse. Servers with neither are left out.
+        """
+        cache_settings = getattr(settings, 'IMAGE_CACHE_SETTINGS', {})
+        if not cache_settings.get('enabled', True):
+            return {}
+        verified_after = timezone.now() - timedelta(seconds=cache_settings.get('presence_ttl', 3600))
+        fresh = cls.objects.filter(verified_at__gte=verified_after)
+
+        scores: Dict[int, float] = {}
+        if image.cuda_version:
+            same_base = fresh.filter(
+                image__os_name=image.os_name, image__os_version=image.os_version, image__cuda_version=image.cuda_version,
+            ).exclude(image=image)
+            scores.update(dict.fromkeys(same_base.values_list("server_id", flat=True), LOCALITY_SHARED_BASE))
+
+        latest_digest = image.registry_digest or (
+            cls.objects.filter(image=image, pulled_at__isnull=False)
+            .order_by("-pulled_at").values_list("digest", flat=True).first()
+        )
+        copies = fresh.filter(image=image)
+        if latest_digest is not None:
+            copies = copies.filter(digest=latest_digest)
+        scores.update(dict.fromkeys(copies.values_list("server_id", flat=True), 1.0))
+        return scores
+
+    @classmethod
+    def record_images(cls, server: Server, entries: List[Dict[str, Any]], pulled: Optional[Image] = None) -> int:
+        """
+        Replaces what we know about `server` with a `podman images --format json`
+        listing. `pulled` is the image that was just pulled there, if any.
+        Returns the number of known Images found on the server.
+        """
+        now = timezone.now()
+        digests = {}
+        for entry in entries:
+            for name in entry.get("Names") or entry.get("RepoTags") or []:
+                digests[name] = entry.get("Digest") or ""
+
+        images = list(Image.objects.filter(custom_registry_image_name__in=list(digests)))
+        for image in images:
+            defaults = {"digest": digests[image.custom_registry_image_name], "verified_at": now}
+            if pulled is not None and image.pk == pulled.pk:
+                defaults["pulled_at"] = now
+            cls.objects.update_or_create(server=server, image=image, defaults=defaults)
+        removed, _ = cls.objects.filter(server=server).exclude(image__in=images).delete()
+        if removed:
+            logger.info(f"{removed} cached images are no longer present on {server.name}")
+        return len(images)
+
+    @classmethod
+    def record_pull(cls, server: Server, image: Image, digest: str) -> None:
+        """Records `image` as just pulled onto `server` with `digest`, when no `podman images` listing was taken."""
+        now = timezone.now()
+        cls.objects.update_or_create(server=server, image=image, defaults={"digest": digest, "pulled_at": now, "verified_at": now})
+
+    @classmethod
+    def record_copy(cls, server: Server, image: Image, digest: str) -> None:
+        """Records `image` as copied onto `server` from another server that had `digest`."""
+        cls.objects.update_or_create(server=server, image=image, defaults={"digest": digest, "verified_at": timezone.now()})
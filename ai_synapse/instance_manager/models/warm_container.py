@@ -0,0 +1,54 @@
+import logging
+
+from django.db import models, transaction
+from typing import Dict, Optional
+
+from .server import Server
+from .image import Image
+
+
+logger = logging.getLogger(__name__)
+
+
+class WarmContainer(models.Model):
+    """
+    A booted container of an Image that no instance owns yet, kept on a
+    server so a launch can take it over instead of running and booting a new
+    one (see warm_pool.py). It holds its own GPUs and host ports, which move
+    to the instance that claims it: Podman can't add devices to a running
+    container, so only launches of as many GPUs as it has can take it over.
+    """
+    server = models.ForeignKey(Server, related_name="warm_containers", on_delete=models.CASCADE)
+    image = models.ForeignKey(Image, related_name="warm_containers", on_delete=models.CASCADE)
+    container_name = models.CharField(max_length=100, unique=True)
+    container_id = models.CharField(max_length=100, blank=True, default="")
+    n_gpus = models.IntegerField(default=0)
+    gpu_indices = models.JSONField(default=list, blank=True, help_text="Device indices of the GPUs it holds.")
+    host_ports = models.JSONField(default=dict, blank=True, help_text="Host port published for each service, e.g. {'ssh': 20000}.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"{self.container_name} ({self.image}) on {self.server}"
+
+    @classmethod
+    def claim(cls, server: Server, image: Image, n_gpus: int) -> Optional["WarmContainer"]:
+        """
+        Takes the oldest warm container of `image` with `n_gpus` GPUs on
+        `server` out of the pool, or returns None. The row is deleted in the caller's transaction, so it
+        comes back if the launch that claimed it rolls back.
+        """
+        with transaction.atomic():
+            warm = cls.objects.select_for_update(skip_locked=True).filter(server=server, image=image, n_gpus=n_gpus).first()
+            if warm is None:
+                return None
+            warm.delete()
+        logger.info(f"Claimed warm container {warm.container_name} of '{image.custom_registry_image_name}' on {server.name}")
+        return warm
+
+    @classmethod
+    def counts(cls) -> Dict[int, int]:
+        """Warm containers per image id."""
+        return dict(cls.objects.order_by().values("image_id").annotate(n=models.Count("id")).values_list("image_id", "n"))
@@ -0,0 +1,5 @@
+from .pool import SSHConnectionPool, get_connection_pool, set_connection_pool
+from .orchestrator import Orchestrator, Operation, OperationResult, get_orchestrator
+from .streaming import RemoteCommand, CommandResult, run_command, parse_pull_progress, PullProgressEvent
+from .podman_api import PodmanAPIClient, PodmanAPIExecutor, get_podman_api_client, set_podman_api_client
+from .registry import RegistryClient, ManifestInfo, get_registry_client, set_registry_client
@@ -0,0 +1,85 @@
+import logging
+import threading
+
+import paramiko
+
+from typing import Optional, Set
+
+from ..exceptions import RemoteCommandCancelledException
+
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class CancellationScope:
+    """
+    The SSH channels a blocking operation has open, so another thread can
+    cancel the operation's remote work by closing them. The remote command
+    then sees EOF on stdin and a broken pipe on its next write, as with any
+    dropped SSH session, and the channel reader in the operation's thread
+    raises RemoteCommandCancelledException. Channels opened after the scope
+    was cancelled are closed straight away.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._channels: Set[paramiko.Channel] = set()
+        self._lock = threading.Lock()
+
+    def register(self, channel: paramiko.Channel) -> None:
+        with self._lock:
+            if not self.cancelled:
+                self._channels.add(channel)
+                return
+        channel.close()
+        raise RemoteCommandCancelledException("Operation was cancelled")
+
+    def unregister(self, channel: paramiko.Channel) -> None:
+        with self._lock:
+            self._channels.discard(channel)
+
+    def cancel(self) -> int:
+        """Closes the open channels and returns how many there were."""
+        with self._lock:
+            self.cancelled = True
+            channels, self._channels = self._channels, set()
+        for channel in channels:
+            try:
+                channel.close()
+            except Exception as e:
+                logger.debug(f"Closing a cancelled channel failed: {e}")
+        return len(channels)
+
+    def __enter__(self) -> "CancellationScope":
+        self._previous = getattr(_local, "scope", None)
+        _local.scope = self
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _local.scope = self._previous
+
+
+def current_scope() -> Optional[CancellationScope]:
+    """The scope of the operation running on this thread, if any."""
+    return getattr(_local, "scope", None)
+
+
+def register_channel(channel: paramiko.Channel) -> None:
+    """Lets the current operation's scope close ``channel`` on cancellation."""
+    scope = current_scope()
+    if scope is not None:
+        scope.register(channel)
+
+
+def unregister_channel(channel: paramiko.Channel) -> None:
+    scope = current_scope()
+    if scope is not None:
+        scope.unregister(channel)
+
+
+def raise_if_cancelled(command: str = "") -> None:
+    scope = current_scope()
+    if scope is not None and scope.cancelled:
+        raise RemoteCommandCancelledException(f"Operation was cancelled: {command[:200]}" if command else "Operation was cancelled")
@@ -0,0 +1,149 @@
+import json
+import shlex
+import logging
+
+from typing import Dict, Any
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_MARKER = "__SYNAPSE_LAUNCH_RESULT__"
+
+OUTCOME_STARTED = "started"
+OUTCOME_ALREADY_RUNNING = "already_running"
+OUTCOME_PULL_FAILED = "pull_failed"
+OUTCOME_RUN_FAILED = "run_failed"
+OUTCOME_CONFIGURE_FAILED = "configure_failed"
+
+_SCRIPT_TEMPLATE = r"""set -u
+MARKER={marker}
+CONTAINER={container}
+IMAGE={image}
+SPEC={spec_hash}
+IMAGE_DIGEST={image_digest}
+PULLED=""
+ERR=$(mktemp)
+trap 'rm -f "$ERR"' EXIT
+
+now_ms() {{ date +%s%3N; }}
+json_str() {{ printf '%s' "$1" | tail -c 2000 | tr '\n\r\t' '   ' | tr -d '\000-\037' | sed -e 's/\\/\\\\/g' -e 's/"/\\"/g'; }}
+
+STEPS=""
+step() {{
+    local ms=$(( $(now_ms) - $3 ))
+    STEPS="${{STEPS:+$STEPS,}}\"$1\":{{\"exit\":$2,\"ms\":$ms,\"output\":\"$(json_str "$4")\"}}"
+}}
+finish() {{
+    printf '%s{{"outcome":"%s","container_id":"%s","pulled_digest":"%s","steps":{{%s}}}}\n' "$MARKER" "$1" "$(json_str "$2")" "$PULLED" "$STEPS"
+    exit 0
+}}
+
+t=$(now_ms)
+state=$(sudo podman inspect "$CONTAINER" --format '{{{{.State.Status}}}} {{{{.Id}}}} {{{{.ImageDigest}}}} {{{{index .Config.Labels "{spec_label}"}}}}' 2>"$ERR")
+rc=$?
+step inspect $rc $t "${{state:-$(cat "$ERR")}}"
+[ $rc -eq 0 ] || state=""
+set -- $state
+if [ "${{1:-}}" = "running" ]; then
+    finish {already_running} ""
+fi
+
+t=$(now_ms)
+out=$({configure_command} 2>&1)
+rc=$?
+step configure $rc $t "$out"
+[ $rc -eq 0 ] || finish {configure_failed} ""
+
+# A stopped container of the same spec and image digest is started as it is.
+t=$(now_ms)
+if [ -n "$state" ] && [ "${{1:-}}" != "paused" ] && [ "${{4:-}}" = "$SPEC" ] \
+        && [ -n "$IMAGE_DIGEST" ] && [ "${{3:-}}" = "$IMAGE_DIGEST" ]; then
+    cid=${{2:-}}
+    out=$(sudo podman start "$CONTAINER" 2>&1)
+    rc=$?
+    step start $rc $t "$out"
+    [ $rc -eq 0 ] || finish {run_failed} "$cid"
+else
+{pull}
+    t=$(now_ms)
+    cid=$({run_command} 2>"$ERR")
+    rc=$?
+    step run $rc $t "$(cat "$ERR")"
+    if [ $rc -ne 0 ] || [ -z "$cid" ]; then
+        finish {run_failed} "$cid"
+    fi
+fi
+{prefetch}
+finish {started} "$cid"
+"""
+
+_PULL_TEMPLATE = r"""
+    t=$(now_ms)
+    out=$(sudo podman pull --quiet "$IMAGE" 2>&1)
+    rc=$?
+    step pull $rc $t "$out"
+    [ $rc -eq 0 ] || finish {pull_failed} ""
+    PULLED=$(sudo podman image inspect "$IMAGE" --format '{{{{.Digest}}}}' 2>/dev/null)
+"""
+
+_PREFETCH_TEMPLATE = r"""
+t=$(now_ms)
+out=$({prefetch_command} 2>&1)
+step prefetch $? $t "$out"
+"""
+
+
+def build_launch_script(
+    container_name: str,
+    registry_image_name: str,
+    run_command: str,
+    configure_command: str,
+    prefetch_command: str = "",
+    spec_label: str = "",
+    spec_hash: str = "",
+    image_digest: str = "",
+    pull: bool = True,
+) -> str:
+    """
+    Builds an idempotent bash script that performs inspect -> configure ->
+    pull -> run on the remote host in a single SSH channel and prints one
+    JSON result line with per-step exit codes and timings, and the digest of
+    the image if it pulled it. `configure_command` prepares the container's
+    files on the host before it is created or started. `prefetch_command`, if
+    given, is started once the container runs; its failure doesn't fail the
+    launch. A stopped container whose `spec_label` label is `spec_hash` and
+    whose image digest is `image_digest` (the one the server holds now) is
+    started instead of being run again. `pull=False` skips the pull, for an
+    image the caller knows is on the server.
+    """
+    return _SCRIPT_TEMPLATE.format(
+        marker=shlex.quote(RESULT_MARKER),
+        container=shlex.quote(container_name),
+        image=shlex.quote(registry_image_name),
+        spec_label=spec_label,
+        spec_hash=shlex.quote(spec_hash),
+        image_digest=shlex.quote(image_digest),
+        pull=_PULL_TEMPLATE.format(pull_failed=OUTCOME_PULL_FAILED) if pull else "",
+        run_command=run_command,
+        configure_command=configure_command,
+        prefetch=_PREFETCH_TEMPLATE.format(prefetch_command=prefetch_command) if prefetch_command else "",
+        started=OUTCOME_STARTED,
+        already_running=OUTCOME_ALREADY_RUNNING,
+        pull_failed=OUTCOME_PULL_FAILED,
+        run_failed=OUTCOME_RUN_FAILED,
+        configure_failed=OUTCOME_CONFIGURE_FAILED,
+    )
+
+
+def parse_launch_result(output: str) -> Dict[str, Any]:
+    """
+    Extracts the structured result emitted by the launch script.
+    Raises ValueError if the script did not produce a result line.
+    """
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            try:
+                return json.loads(line[len(RESULT_MARKER):])
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Malformed launch script result: {line!r}") from e
+    raise ValueError(f"Launch script produced no result. Output: {output[-2000:]!r}")
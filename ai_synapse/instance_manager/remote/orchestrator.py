@@ -0,0 +1,193 @@
+import os
+import time
+import asyncio
+import logging
+import weakref
+import threading
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .cancellation import CancellationScope
+
+
+logger = logging.getLogger(__name__)
+
+
+class OperationResult:
+    """Outcome of a single lifecycle operation driven by the orchestrator."""
+
+    def __init__(self, key: str, action: str, ok: bool, value: Any = None, error: Optional[BaseException] = None, elapsed: float = 0.0):
+        self.key = key
+        self.action = action
+        self.ok = ok
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    def serialize(self) -> dict:
+        return {
+            "key": self.key,
+            "action": self.action,
+            "ok": self.ok,
+            "error": f"{type(self.error).__name__}: {self.error}" if self.error else None,
+            "elapsed_seconds": round(self.elapsed, 3),
+        }
+
+
+class Operation:
+    """A blocking callable to run against one server, identified by ``key`` in results."""
+
+    def __init__(self, key: str, action: str, server_key: str, func: Callable[..., Any], *args, **kwargs):
+        self.key = key
+        self.action = action
+        self.server_key = server_key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class Orchestrator:
+    """
+    Asyncio facade over a bounded thread pool that runs the blocking paramiko
+    instance operations. Many operations across many servers can be driven
+    concurrently from one process while per-server concurrency stays capped
+    so a single host is never flooded with SSH channels. An operation that
+    times out has its SSH channels closed, so its remote commands stop
+    instead of running on in the background.
+    """
+
+    def __init__(self, max_workers: int = 64, max_concurrency_per_server: int = 8):
+        self.max_workers = max_workers
+        self.max_concurrency_per_server = max_concurrency_per_server
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="synapse-orchestrator")
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _server_semaphore(self, server_key: str) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop they are first used on,
+        # so semaphores are kept per (loop, server).
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            semaphore = semaphores.get(server_key)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency_per_server)
+                semaphores[server_key] = semaphore
+            return semaphore
+
+    @staticmethod
+    def _call_with_db_cleanup(func: Callable[..., Any], *args, **kwargs) -> Any:
+        # Worker threads hold their own DB connections, release them the
+        # same way Django does around each request.
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def _call_in_scope(cls, scope: CancellationScope, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with scope:
+            return cls._call_with_db_cleanup(func, *args, **kwargs)
+
+    async def run_blocking(self, server_key: str, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Runs a blocking callable on the pool, bounded by the server's concurrency cap."""
+        loop = asyncio.get_running_loop()
+        async with self._server_semaphore(server_key):
+            scope = CancellationScope()
+            call = functools.partial(self._call_in_scope, scope, func, *args, **kwargs)
+            future = loop.run_in_executor(self._executor, call)
+            if timeout is None:
+                return await future
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                # The executor thread can't be interrupted, closing its
+                # channels ends the remote commands it is waiting on.
+                closed = scope.cancel()
+                logger.warning(f"Operation on {server_key} timed out after {timeout}s, closed {closed} SSH channels")
+                raise
+
+    async def run_operation(self, operation: Operation, timeout: Optional[float] = None) -> OperationResult:
+        started = time.monotonic()
+        try:
+            value = await self.run_blocking(operation.server_key, operation.func, *operation.args, timeout=timeout, **operation.kwargs)
+            return OperationResult(operation.key, operation.action, True, value=value, elapsed=time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"Operation '{operation.action}' failed for {operation.key}: {e}")
+            return OperationResult(operation.key, operation.action, False, error=e, elapsed=time.monotonic() - started)
+
+    async def run_many(
+        self,
+        operations: Iterable[Operation],
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[OperationResult], Any]] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> List[OperationResult]:
+        """
+        Runs all operations concurrently and returns their results in input order.
+        ``on_result`` is called as each operation completes and ``max_concurrency``
+        caps how many run at once across all servers.
+        """
+        limiter = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def _run(operation: Operation) -> OperationResult:
+            if limiter:
+                async with limiter:
+                    result = await self.run_operation(operation, timeout=timeout)
+            else:
+                result = await self.run_operation(operation, timeout=timeout)
+            if on_result:
+                on_result(result)
+            return result
+
+        return list(await asyncio.gather(*(_run(operation) for operation in operations)))
+
+    def run_sync(self, awaitable: Awaitable[Any]) -> Any:
+        """
+        Synchronous wrapper for callers outside an event loop (e.g. WSGI views).
+        If the calling thread already runs a loop, the coroutine is driven on a
+        helper thread instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(awaitable)
+
+        result: Dict[str, Any] = {}
+
+        def _runner():
+            try:
+                result["value"] = asyncio.run(awaitable)
+            except BaseException as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=_runner, name="synapse-orchestrator-sync")
+        thread.start()
+        thread.join()
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_orchestrator: Optional[Orchestrator] = None
+_orchestrator_pid: Optional[int] = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> Orchestrator:
+    """Returns the process-wide orchestrator built from ``settings.ORCHESTRATOR_SETTINGS``."""
+    global _orchestrator, _orchestrator_pid
+    with _orchestrator_lock:
+        if _orchestrator is None or _orchestrator_pid != os.getpid():
+            orchestrator_settings = getattr(settings, 'ORCHESTRATOR_SETTINGS', {})
+            _orchestrator = Orchestrator(**orchestrator_settings)
+            _orchestrator_pid = os.getpid()
+        return _orchestrator
@@ -0,0 +1,287 @@
+import os
+import time
+import socket
+import logging
+import threading
+import contextlib
+
+import paramiko
+
+from django.conf import settings
+from paramiko import SSHClient
+from typing import Dict, List, Optional, Iterator, Any
+
+from ..utils import timed_phase
+
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """
+    A single authenticated SSH transport kept alive by the pool.
+    Several borrowers may hold it at once; every ``exec_command`` opens
+    its own channel on the shared transport.
+    """
+
+    def __init__(self, host: str, client: SSHClient, handshake_seconds: float):
+        self.host = host
+        self.client = client
+        self.handshake_seconds = handshake_seconds
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.borrowers = 0
+        self.broken = False
+
+    @property
+    def transport(self) -> Optional[paramiko.Transport]:
+        return self.client.get_transport()
+
+    def is_alive(self) -> bool:
+        transport = self.transport
+        return bool(transport and transport.is_active() and not self.broken)
+
+    def ping(self) -> bool:
+        """Sends an SSH_MSG_IGNORE to verify the transport is still usable."""
+        try:
+            transport = self.transport
+            if not transport or not transport.is_active():
+                return False
+            transport.send_ignore()
+            return True
+        except Exception as e:
+            logger.warning(f"Health check failed for SSH connection to {self.host}: {e}")
+            return False
+
+    def close(self) -> None:
+        try:
+            self.client.close()
+        except Exception as e:
+            logger.error(f"Error closing pooled SSH connection to {self.host}: {e}")
+
+
+class SSHConnectionPool:
+    """
+    Process-wide pool of authenticated SSH connections keyed by server address.
+
+    Connections are reused across requests so the TCP + key exchange + auth
+    handshake is paid once per server instead of once per operation. Idle
+    connections are health-checked before reuse and evicted after ``idle_ttl``.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        port: int = 22,
+        connect_timeout: int = 60,
+        idle_ttl: int = 300,
+        health_check_interval: int = 30,
+        keepalive_interval: int = 30,
+        max_sessions_per_connection: int = 8,
+        max_connections_per_host: int = 4,
+        key_filename: Optional[str] = None,
+        pkey: Optional[paramiko.PKey] = None,
+    ):
+        self.username = username
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.idle_ttl = idle_ttl
+        self.health_check_interval = health_check_interval
+        self.keepalive_interval = keepalive_interval
+        self.max_sessions_per_connection = max_sessions_per_connection
+        self.max_connections_per_host = max_connections_per_host
+        self.key_filename = key_filename
+        self.pkey = pkey
+
+        self._connections: Dict[str, List[PooledConnection]] = {}
+        self._connecting: Dict[str, int] = {}
+        self._lock = threading.Condition()
+
+        self.hits = 0
+        self.misses = 0
+        self.handshakes = 0
+        self.handshake_failures = 0
+        self.handshake_seconds_total = 0.0
+        self.handshake_seconds_max = 0.0
+        self.evictions = 0
+
+    @contextlib.contextmanager
+    def connection(self, host: str) -> Iterator[SSHClient]:
+        """Borrows a connection to ``host`` for the duration of the block."""
+        with timed_phase("connect"):
+            conn = self._acquire(host)
+        try:
+            yield conn.client
+        except (paramiko.SSHException, EOFError, OSError):
+            if not conn.is_alive():
+                conn.broken = True
+            raise
+        finally:
+            self._release(conn)
+
+    def _acquire(self, host: str) -> PooledConnection:
+        with self._lock:
+            while True:
+                self._evict_expired_locked()
+                conn = self._find_reusable_locked(host)
+                if conn:
+                    conn.borrowers += 1
+                    self.hits += 1
+                    return conn
+
+                open_count = len(self._connections.get(host, [])) + self._connecting.get(host, 0)
+                if open_count < self.max_connections_per_host:
+                    self._connecting[host] = self._connecting.get(host, 0) + 1
+                    self.misses += 1
+                    break
+                # Every connection to this host is saturated, wait for a release.
+                self._lock.wait(timeout=self.connect_timeout)
+
+        try:
+            conn = self._open(host)
+        finally:
+            with self._lock:
+                self._connecting[host] -= 1
+                self._lock.notify_all()
+
+        with self._lock:
+            conn.borrowers += 1
+            self._connections.setdefault(host, []).append(conn)
+        return conn
+
+    def _find_reusable_locked(self, host: str) -> Optional[PooledConnection]:
+        now = time.monotonic()
+        for conn in list(self._connections.get(host, [])):
+            if not conn.is_alive():
+                self._discard_locked(conn)
+                continue
+            if conn.borrowers >= self.max_sessions_per_connection:
+                continue
+            if conn.borrowers == 0 and now - conn.last_checked >= self.health_check_interval:
+                if not conn.ping():
+                    self._discard_locked(conn)
+                    continue
+                conn.last_checked = now
+            return conn
+        return None
+
+    def _open(self, host: str) -> PooledConnection:
+        started = time.monotonic()
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            # Commands are small request/response exchanges, so disable Nagle
+            # to avoid delayed-ACK stalls on every exec round trip.
+            sock = socket.create_connection((host, self.port), timeout=self.connect_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.connect(
+                hostname=host,
+                port=self.port,
+                username=self.username,
+                timeout=self.connect_timeout,
+                key_filename=self.key_filename,
+                pkey=self.pkey,
+                sock=sock,
+            )
+        except Exception:
+            with self._lock:
+                self.handshake_failures += 1
+            client.close()
+            raise
+
+        transport = client.get_transport()
+        if transport and self.keepalive_interval:
+            transport.set_keepalive(self.keepalive_interval)
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.handshakes += 1
+            self.handshake_seconds_total += elapsed
+            self.handshake_seconds_max = max(self.handshake_seconds_max, elapsed)
+        logger.debug(f"Opened pooled SSH connection to {host} in {elapsed * 1000:.1f}ms")
+        return PooledConnection(host, client, elapsed)
+
+    def _release(self, conn: PooledConnection) -> None:
+        with self._lock:
+            conn.borrowers -= 1
+            conn.last_used = time.monotonic()
+            if conn.borrowers == 0 and not conn.is_alive():
+                self._discard_locked(conn)
+            self._lock.notify_all()
+
+    def _discard_locked(self, conn: PooledConnection) -> None:
+        connections = self._connections.get(conn.host, [])
+        if conn in connections:
+            connections.remove(conn)
+            self.evictions += 1
+        if not connections:
+            self._connections.pop(conn.host, None)
+        conn.close()
+
+    def _evict_expired_locked(self) -> None:
+        now = time.monotonic()
+        for connections in list(self._connections.values()):
+            for conn in list(connections):
+                if conn.borrowers == 0 and now - conn.last_used >= self.idle_ttl:
+                    logger.debug(f"Evicting idle SSH connection to {conn.host}")
+                    self._discard_locked(conn)
+
+    def prune(self) -> None:
+        """Closes connections that have been idle for longer than ``idle_ttl``."""
+        with self._lock:
+            self._evict_expired_locked()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for connections in list(self._connections.values()):
+                for conn in list(connections):
+                    self._discard_locked(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "handshakes": self.handshakes,
+                "handshake_failures": self.handshake_failures,
+                "handshake_seconds_total": round(self.handshake_seconds_total, 6),
+                "handshake_seconds_avg": round(self.handshake_seconds_total / self.handshakes, 6) if self.handshakes else 0.0,
+                "handshake_seconds_max": round(self.handshake_seconds_max, 6),
+                "evictions": self.evictions,
+                "open_connections": sum(len(c) for c in self._connections.values()),
+                "hosts": {
+                    host: [{"borrowers": c.borrowers, "age_seconds": round(time.monotonic() - c.created_at, 3)} for c in connections]
+                    for host, connections in self._connections.items()
+                },
+            }
+
+
+_pool: Optional[SSHConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> SSHConnectionPool:
+    """
+    Returns the process-wide connection pool, creating it from
+    ``settings.SSH_POOL_SETTINGS`` on first use. The pool is rebuilt after
+    a fork so worker processes never share a transport with their parent.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            pool_settings = getattr(settings, 'SSH_POOL_SETTINGS', {})
+            _pool = SSHConnectionPool(username=settings.SSH_USERNAME, **pool_settings)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def set_connection_pool(pool: Optional[SSHConnectionPool]) -> None:
+    """Replaces the process-wide pool, closing the previous one."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool is not pool and _pool_pid == os.getpid():
+            _pool.close_all()
+        _pool = pool
+        _pool_pid = os.getpid() if pool is not None else None
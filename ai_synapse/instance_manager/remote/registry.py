@@ -0,0 +1,199 @@
+import json
+import base64
+import logging
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..exceptions import RegistryException
+
+
+logger = logging.getLogger(__name__)
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_ENDPOINT = "registry-1.docker.io"
+
+MEDIA_TYPE_OCI_INDEX = "application/vnd.oci.image.index.v1+json"
+MEDIA_TYPE_DOCKER_LIST = "application/vnd.docker.distribution.manifest.list.v2+json"
+MEDIA_TYPE_OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+MEDIA_TYPE_DOCKER_MANIFEST = "application/vnd.docker.distribution.manifest.v2+json"
+MANIFEST_ACCEPT = ", ".join([MEDIA_TYPE_OCI_INDEX, MEDIA_TYPE_DOCKER_LIST, MEDIA_TYPE_OCI_MANIFEST, MEDIA_TYPE_DOCKER_MANIFEST])
+
+
+def parse_image_reference(name: str) -> Tuple[str, str, str]:
+    """
+    Splits an image name into (registry, repository, tag or digest) the way
+    podman resolves it: 'ubuntu' is docker.io/library/ubuntu:latest.
+    """
+    name, _, digest = name.partition("@")
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, path = first, rest
+    else:
+        registry, path = DOCKER_HUB, name
+    if registry == DOCKER_HUB and "/" not in path:
+        path = f"library/{path}"
+    repository, _, tag = path.rpartition(":") if ":" in path.rsplit("/", 1)[-1] else (path, "", "")
+    return registry, repository, digest or tag or "latest"
+
+
+class ManifestInfo:
+    """What the registry says about an image: its manifest digest and the bytes a pull downloads."""
+
+    def __init__(self, digest: str, size: int, layers: int, media_type: str = ""):
+        self.digest = digest
+        self.size = size
+        self.layers = layers
+        self.media_type = media_type
+
+    def serialize(self) -> dict:
+        return {"digest": self.digest, "size": self.size, "layers": self.layers, "media_type": self.media_type}
+
+
+class RegistryClient:
+    """
+    Talks to OCI distribution registries (/v2/ API) from the control plane.
+    check() answers "does this image exist" with one HEAD request and only
+    fetches the manifest when the digest is new, to learn the layer sizes.
+    Anonymous or basic-auth bearer tokens are fetched on demand and cached
+    per repository.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        insecure_registries: Iterable[str] = (),
+        platform: str = "linux/amd64",
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ):
+        self.timeout = timeout
+        self.insecure_registries = set(insecure_registries)
+        self.platform = platform
+        self.username = username
+        self.password = password
+        self.requests = 0
+        self._tokens: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def check(self, image_name: str, known: Optional[ManifestInfo] = None) -> Optional[ManifestInfo]:
+        """
+        The manifest of `image_name`, or None when the registry does not have
+        it. `known` is the result of an earlier check: when the digest has not
+        changed it is returned without fetching the manifest again. Raises
+        RegistryException when the registry can't be asked.
+        """
+        registry, repository, reference = parse_image_reference(image_name)
+        status, headers, _ = self._request("HEAD", registry, repository, f"manifests/{reference}")
+        if status == 404:
+            return None
+        if status != 200:
+            raise RegistryException(f"Registry {registry} answered {status} for {image_name}")
+        digest = headers.get("Docker-Content-Digest", "")
+        if known is not None and digest and digest == known.digest:
+            return known
+        return self._manifest_info(registry, repository, digest or reference)
+
+    def _manifest_info(self, registry: str, repository: str, reference: str) -> Optional[ManifestInfo]:
+        status, headers, body = self._request("GET", registry, repository, f"manifests/{reference}")
+        if status == 404:
+            return None
+        if status != 200:
+            raise RegistryException(f"Registry {registry} answered {status} for {repository}@{reference}")
+        manifest = json.loads(body or b"{}")
+        digest = headers.get("Docker-Content-Digest", "") or reference
+        media_type = manifest.get("mediaType") or headers.get("Content-Type", "")
+
+        if media_type in (MEDIA_TYPE_OCI_INDEX, MEDIA_TYPE_DOCKER_LIST) or "manifests" in manifest:
+            entry = self._platform_entry(manifest.get("manifests", []))
+            if entry is None:
+                raise RegistryException(f"{repository}@{reference} has no manifest for {self.platform}")
+            child = self._manifest_info(registry, repository, entry["digest"])
+            if child is None:
+                return None
+            # The index digest is what podman records for a pull by tag.
+            return ManifestInfo(digest, child.size, child.layers, media_type)
+
+        layers = manifest.get("layers", [])
+        size = sum(layer.get("size", 0) for layer in layers) + manifest.get("config", {}).get("size", 0)
+        return ManifestInfo(digest, size, len(layers), media_type)
+
+    def _platform_entry(self, manifests: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        os_name, _, architecture = self.platform.partition("/")
+        for entry in manifests:
+            platform = entry.get("platform", {})
+            if platform.get("os") == os_name and platform.get("architecture") == architecture:
+                return entry
+        return None
+
+    def _request(self, method: str, registry: str, repository: str, path: str) -> Tuple[int, Dict[str, str], bytes]:
+        endpoint = DOCKER_HUB_ENDPOINT if registry == DOCKER_HUB else registry
+        scheme = "http" if registry in self.insecure_registries else "https"
+        url = f"{scheme}://{endpoint}/v2/{repository}/{path}"
+        for attempt in range(2):
+            request = urllib.request.Request(url, method=method, headers={"Accept": MANIFEST_ACCEPT})
+            token = self._tokens.get((registry, repository))
+            if token:
+                request.add_header("Authorization", f"Bearer {token}")
+            with self._lock:
+                self.requests += 1
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return response.status, dict(response.headers), response.read()
+            except urllib.error.HTTPError as e:
+                challenge = e.headers.get("WWW-Authenticate", "")
+                if e.code == 401 and attempt == 0 and challenge.lower().startswith("bearer"):
+                    self._tokens[(registry, repository)] = self._fetch_token(challenge, repository)
+                    continue
+                return e.code, dict(e.headers), e.read()
+            except (urllib.error.URLError, OSError) as e:
+                raise RegistryException(f"Registry {registry} is unreachable: {e}") from e
+        raise RegistryException(f"Registry {registry} rejected our credentials for {repository}")
+
+    def _fetch_token(self, challenge: str, repository: str) -> str:
+        params = dict(
+            (key.strip(), value.strip('"'))
+            for key, _, value in (item.partition("=") for item in challenge[len("Bearer "):].split(","))
+        )
+        realm = params.pop("realm", "")
+        params.setdefault("scope", f"repository:{repository}:pull")
+        request = urllib.request.Request(f"{realm}?{urllib.parse.urlencode(params)}")
+        if self.username:
+            credentials = base64.b64encode(f"{self.username}:{self.password or ''}".encode()).decode()
+            request.add_header("Authorization", f"Basic {credentials}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read() or b"{}")
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise RegistryException(f"Could not get a registry token from {realm}: {e}") from e
+        return body.get("token") or body.get("access_token", "")
+
+
+_client: Optional[RegistryClient] = None
+_client_lock = threading.Lock()
+
+
+def get_registry_client() -> RegistryClient:
+    """Returns the process-wide registry client built from ``settings.REGISTRY_SETTINGS``."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            registry_settings = getattr(settings, 'REGISTRY_SETTINGS', {})
+            _client = RegistryClient(
+                timeout=registry_settings.get('timeout', 5.0),
+                insecure_registries=registry_settings.get('insecure_registries', []),
+                platform=registry_settings.get('platform', 'linux/amd64'),
+                username=registry_settings.get('username') or None,
+                password=registry_settings.get('password') or None,
+            )
+        return _client
+
+
+def set_registry_client(client: Optional[RegistryClient]) -> None:
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,218 @@
+import re
+import time
+import codecs
+import select
+import logging
+
+from paramiko import SSHClient
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..exceptions import RemoteCommandTimeoutException
+from .cancellation import raise_if_cancelled, register_channel, unregister_channel
+
+
+logger = logging.getLogger(__name__)
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+_RECV_SIZE = 32768
+_LINE_SPLIT = re.compile(r"\r\n|\r|\n")
+
+
+class CommandResult:
+    """Collected result of a remote command run through RemoteCommand.run()."""
+
+    def __init__(self, command: str, exit_status: int, stdout: str, stderr: str, elapsed: float):
+        self.command = command
+        self.exit_status = exit_status
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_status == 0
+
+
+class RemoteCommand:
+    """
+    Runs a command on its own channel and consumes stdout and stderr
+    concurrently, yielding complete lines as they arrive. Draining both
+    streams together keeps the remote side from stalling on a full channel
+    window, and ``timeout`` is enforced as a wall-clock deadline for the
+    whole command rather than per read. When the command runs inside an
+    orchestrated operation, its channel is closed if that operation is
+    cancelled (see cancellation.py).
+    """
+
+    def __init__(
+        self,
+        ssh: SSHClient,
+        command: str,
+        timeout: Optional[float] = None,
+        input: Optional[str] = None,
+        poll_interval: float = 0.1,
+    ):
+        self.ssh = ssh
+        self.command = command
+        self.timeout = timeout
+        self.input = input
+        self.poll_interval = poll_interval
+        self.exit_status: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def lines(self) -> Iterator[Tuple[str, str]]:
+        """Yields ``(stream, line)`` tuples until the command exits."""
+        transport = self.ssh.get_transport()
+        if transport is None or not transport.is_active():
+            raise ConnectionError("SSH transport is not connected")
+
+        self.started_at = time.monotonic()
+        deadline = self.started_at + self.timeout if self.timeout else None
+        channel = transport.open_session()
+        try:
+            register_channel(channel)
+            channel.exec_command(self.command)
+            if self.input is not None:
+                channel.sendall(self.input.encode())
+            channel.shutdown_write()
+
+            decoders = {
+                STDOUT: codecs.getincrementaldecoder("utf-8")(errors="replace"),
+                STDERR: codecs.getincrementaldecoder("utf-8")(errors="replace"),
+            }
+            buffers: Dict[str, str] = {STDOUT: "", STDERR: ""}
+
+            while True:
+                received = False
+                while channel.recv_ready():
+                    yield from self._feed(STDOUT, channel.recv(_RECV_SIZE), decoders, buffers)
+                    received = True
+                while channel.recv_stderr_ready():
+                    yield from self._feed(STDERR, channel.recv_stderr(_RECV_SIZE), decoders, buffers)
+                    received = True
+
+                if channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready():
+                    break
+                raise_if_cancelled(self.command)
+                if deadline is not None and time.monotonic() > deadline:
+                    raise RemoteCommandTimeoutException(
+                        f"Command exceeded its {self.timeout}s deadline: {self.command[:200]}"
+                    )
+                if not received:
+                    select.select([channel], [], [], self.poll_interval)
+
+            for stream in (STDOUT, STDERR):
+                *complete, tail = _LINE_SPLIT.split(buffers[stream] + decoders[stream].decode(b"", final=True))
+                for line in complete:
+                    yield stream, line
+                if tail:
+                    yield stream, tail
+            self.exit_status = channel.recv_exit_status()
+        finally:
+            self.finished_at = time.monotonic()
+            unregister_channel(channel)
+            channel.close()
+
+    @staticmethod
+    def _feed(stream: str, data: bytes, decoders, buffers) -> Iterator[Tuple[str, str]]:
+        text = buffers[stream] + decoders[stream].decode(data)
+        # A trailing "\r" may be the first half of a "\r\n" split across reads.
+        held = "\r" if text.endswith("\r") else ""
+        parts = _LINE_SPLIT.split(text[:len(text) - len(held)])
+        buffers[stream] = parts.pop() + held
+        for line in parts:
+            yield stream, line
+
+    def run(
+        self,
+        on_line: Optional[Callable[[str, str], None]] = None,
+        max_output_chars: int = 1024 * 1024,
+    ) -> CommandResult:
+        """
+        Drains the command and returns its collected output. Only the last
+        ``max_output_chars`` of each stream are kept in memory.
+        """
+        collected: Dict[str, List[str]] = {STDOUT: [], STDERR: []}
+        sizes = {STDOUT: 0, STDERR: 0}
+        for stream, line in self.lines():
+            if on_line:
+                on_line(stream, line)
+            collected[stream].append(line)
+            sizes[stream] += len(line) + 1
+            while sizes[stream] > max_output_chars and len(collected[stream]) > 1:
+                sizes[stream] -= len(collected[stream].pop(0)) + 1
+        return CommandResult(
+            command=self.command,
+            exit_status=self.exit_status,
+            stdout="\n".join(collected[STDOUT]),
+            stderr="\n".join(collected[STDERR]),
+            elapsed=(self.finished_at or time.monotonic()) - self.started_at,
+        )
+
+
+def run_command(
+    ssh: SSHClient,
+    command: str,
+    timeout: Optional[float] = None,
+    input: Optional[str] = None,
+    on_line: Optional[Callable[[str, str], None]] = None,
+) -> CommandResult:
+    """Runs ``command`` to completion, streaming both outputs concurrently."""
+    return RemoteCommand(ssh, command, timeout=timeout, input=input).run(on_line=on_line)
+
+
+class PullProgressEvent:
+    """A single progress event parsed from `podman pull` output."""
+
+    RESOLVING = "resolving"
+    SIGNATURES = "signatures"
+    BLOB = "blob"
+    CONFIG = "config"
+    MANIFEST = "manifest"
+    STORED = "stored"
+
+    def __init__(self, kind: str, line: str, digest: Optional[str] = None, state: Optional[str] = None):
+        self.kind = kind
+        self.line = line
+        self.digest = digest
+        self.state = state
+
+    def serialize(self) -> dict:
+        return {"kind": self.kind, "digest": self.digest, "state": self.state}
+
+    def __repr__(self) -> str:
+        return f"PullProgressEvent({self.kind!r}, digest={self.digest!r}, state={self.state!r})"
+
+
+_PULL_PATTERNS = [
+    (re.compile(r"^Trying to pull (?P<ref>\S+?)\.*$"), PullProgressEvent.RESOLVING),
+    (re.compile(r"^Getting image source signatures"), PullProgressEvent.SIGNATURES),
+    (re.compile(r"^Copying blob (?:sha256:)?(?P<digest>[0-9a-f]+)\s*(?P<rest>.*)$"), PullProgressEvent.BLOB),
+    (re.compile(r"^Copying config (?:sha256:)?(?P<digest>[0-9a-f]+)\s*(?P<rest>.*)$"), PullProgressEvent.CONFIG),
+    (re.compile(r"^Writing manifest to image destination"), PullProgressEvent.MANIFEST),
+    (re.compile(r"^Storing signatures"), PullProgressEvent.STORED),
+]
+
+
+def parse_pull_progress(line: str) -> Optional[PullProgressEvent]:
+    """Parses one line of `podman pull` output into a progress event, if it is one."""
+    line = line.strip()
+    for pattern, kind in _PULL_PATTERNS:
+        match = pattern.match(line)
+        if not match:
+            continue
+        groups = match.groupdict()
+        state = None
+        if "rest" in groups:
+            rest = groups["rest"].lower()
+            if "skipped" in rest or "already exists" in rest:
+                state = "skipped"
+            elif "done" in rest:
+                state = "done"
+            else:
+                state = "copying"
+        return PullProgressEvent(kind, line, digest=groups.get("digest"), state=state)
+    return None
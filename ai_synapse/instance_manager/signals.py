@@ -0,0 +1,54 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Instance, Job, Server
+from .events import publish_instance_event
+from .fleet import publish_server_state
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_init, sender=Instance)
+def remember_instance_status(sender, instance, **kwargs):
+    instance._saved_status = instance.status if instance.pk else None
+
+
+@receiver(post_save, sender=Instance)
+def announce_instance_status(sender, instance, created, **kwargs):
+    """Publishes an event whenever a save changes the instance's status."""
+    previous_status = getattr(instance, "_saved_status", None)
+    if created or instance.status != previous_status:
+        publish_instance_event(instance, previous_status)
+    instance._saved_status = instance.status
+
+
+@receiver(post_init, sender=Server)
+def remember_server_capacity(sender, instance, **kwargs):
+    instance._saved_capacity = (instance.available_gpus, instance.is_active) if instance.pk else None
+
+
+@receiver(post_save, sender=Server)
+def announce_server_state(sender, instance, created, **kwargs):
+    """Keeps every process's fleet index in step with the server's capacity."""
+    publish_server_state(instance)
+    previous = getattr(instance, "_saved_capacity", None)
+    instance._saved_capacity = (instance.available_gpus, instance.is_active)
+    if created or previous is None or instance.available_gpus > previous[0] or (instance.is_active and not previous[1]):
+        # GPUs were freed or added, let waiting launches have them.
+        transaction.on_commit(dispatch_waiting_launches)
+
+
+def dispatch_waiting_launches():
+    try:
+        Job.dispatch_waiting()
+    except Exception as e:
+        logger.exception(f"Failed to dispatch waiting launches: {e}")
+
+
+@receiver(post_delete, sender=Server)
+def announce_server_removed(sender, instance, **kwargs):
+    publish_server_state(instance, deleted=True)
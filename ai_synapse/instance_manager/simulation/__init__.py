@@ -0,0 +1,2 @@
+from .podman_host import FakePodmanHost, FakeSSHServer
+from .registry import FakeRegistry
@@ -0,0 +1,93 @@
+import os
+import time
+import logging
+
+import paramiko
+
+from django.conf import settings
+from django.test.utils import override_settings
+from typing import Any, Dict, Optional
+
+from ..models import Image, Instance, Server
+from ..remote import SSHConnectionPool, set_connection_pool
+from ..utils import PhaseTimer, collect_phases
+from .podman_host import FakePodmanHost, FakeSSHServer
+
+
+logger = logging.getLogger(__name__)
+
+LAUNCH_PHASES = ["connect", "inspect", "pull", "lazy_pull", "run", "start", "adopt", "restore", "configure", "prefetch", "launch_script", "db_save", "launch"]
+
+
+def run_launch_benchmark(
+    iterations: int = 10,
+    launch_mode: str = "sequential",
+    host: Optional[FakePodmanHost] = None,
+    handshake_latency: float = 0.0,
+    exec_latency: float = 0.0,
+    cold_connections: bool = False,
+) -> Dict[str, Any]:
+    """
+    Times every phase of Instance.launch() against an in-process fake podman
+    host. Creates its own Account, Server and Image rows; callers are
+    expected to run it inside a transaction they roll back.
+    """
+    from user_manager.models import Account
+
+    host = host or FakePodmanHost()
+    client_key = paramiko.RSAKey.generate(2048)
+    timer = PhaseTimer()
+    failures = []
+
+    with FakeSSHServer(host, handshake_latency=handshake_latency, exec_latency=exec_latency) as ssh_server:
+        pool = SSHConnectionPool(username=settings.SSH_USERNAME, port=ssh_server.port, pkey=client_key, connect_timeout=10)
+        podman_settings = dict(
+            getattr(settings, "PODMAN_SETTINGS", {}),
+            launch_mode=launch_mode,
+            config_dir=os.path.join(ssh_server.workdir, "containers"),
+        )
+        set_connection_pool(pool)
+        try:
+            server = Server.objects.create(
+                name=f"bench-{ssh_server.port}",
+                ip_address=ssh_server.bind_address,
+                total_gpus=8,
+                available_gpus=8,
+            )
+            image = Image.objects.create(
+                name="bench-image",
+                tag=f"bench-{ssh_server.port}",
+                custom_registry_image_name=f"localhost/bench/image:{ssh_server.port}",
+                is_available=True,
+            )
+            with override_settings(PODMAN_SETTINGS=podman_settings), collect_phases(timer):
+                for i in range(iterations):
+                    account = Account.objects.create_user(
+                        email=f"bench{i}-{ssh_server.port}@example.com",
+                        username=f"bench{i}-{ssh_server.port}",
+                        ssh_public_key="ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIBenchmarkKey bench@example.com",
+                    )
+                    if cold_connections:
+                        pool.close_all()
+                    started = time.perf_counter()
+                    try:
+                        Instance.launch(account, server, image.id, 1)
+                    except Exception as e:
+                        failures.append(f"{type(e).__name__}: {e}")
+                    timer.record("launch", time.perf_counter() - started)
+                    # Every launch lands on the same fake server, drop the row so
+                    # instances don't pile up on it across iterations.
+                    Instance.objects.filter(account=account).delete()
+        finally:
+            set_connection_pool(None)
+            pool.close_all()
+
+    summary = timer.summary()
+    return {
+        "iterations": iterations,
+        "launch_mode": launch_mode,
+        "failures": failures,
+        "phases": {name: summary[name] for name in LAUNCH_PHASES if name in summary},
+        "ssh_execs": ssh_server.execs,
+        "pool": pool.stats(),
+    }
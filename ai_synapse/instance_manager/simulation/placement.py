@@ -0,0 +1,188 @@
+import heapq
+import random
+import time
+import uuid
+import logging
+
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..models import Instance, Server
+from ..models.instance import InstanceStatus
+from ..utils import percentile
+
+
+logger = logging.getLogger(__name__)
+
+TRACE_LAUNCH = "launch"
+TRACE_STOP = "stop"
+
+
+def export_instance_trace(instances=None) -> List[Dict[str, Any]]:
+    """
+    Builds a replayable trace from instance history: a launch at each
+    instance's created_at and, for stopped instances, a stop at its last
+    update. Times are seconds since the first launch.
+    """
+    instances = list((instances if instances is not None else Instance.objects.all()).select_related("account").order_by("created_at"))
+    if not instances:
+        return []
+    origin = instances[0].created_at
+    trace = []
+    for instance in instances:
+        launched_at = (instance.created_at - origin).total_seconds()
+        trace.append({
+            "t": launched_at,
+            "op": TRACE_LAUNCH,
+            "key": instance.instance_id,
+            "n_gpus": instance.n_gpus,
+            "account": instance.account.username,
+        })
+        if instance.status in (InstanceStatus.STOPPED, InstanceStatus.SUSPENDED) and instance.updated_at:
+            stopped_at = max(launched_at, (instance.updated_at - origin).total_seconds())
+            trace.append({"t": stopped_at, "op": TRACE_STOP, "key": instance.instance_id})
+    return sort_trace(trace)
+
+
+def generate_trace(
+    launches: int = 200,
+    seed: int = 0,
+    mean_interarrival: float = 60.0,
+    mean_duration: float = 3600.0,
+    gpu_choices: Sequence[int] = (1, 1, 1, 2, 2, 4, 8),
+) -> List[Dict[str, Any]]:
+    """A reproducible synthetic trace with Poisson arrivals and exponential run times."""
+    rng = random.Random(seed)
+    trace, now = [], 0.0
+    for i in range(launches):
+        now += rng.expovariate(1.0 / mean_interarrival)
+        key = f"sim-{i}"
+        trace.append({"t": round(now, 3), "op": TRACE_LAUNCH, "key": key, "n_gpus": rng.choice(gpu_choices), "account": f"user{i % 20}"})
+        trace.append({"t": round(now + rng.expovariate(1.0 / mean_duration), 3), "op": TRACE_STOP, "key": key})
+    return sort_trace(trace)
+
+
+def sort_trace(trace: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Stops go first at equal times so their GPUs are free for the launches.
+    return sorted(trace, key=lambda event: (event["t"], event["op"] != TRACE_STOP))
+
+
+def parse_fleet(spec: str) -> List[int]:
+    """'16x8,4x4' -> sixteen 8-GPU servers and four 4-GPU servers."""
+    fleet = []
+    for part in spec.split(","):
+        count, _, gpus = part.strip().partition("x")
+        fleet.extend([int(gpus)] * int(count))
+    return fleet
+
+
+def replay_trace(trace: List[Dict[str, Any]], fleet: Sequence[int], policy: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replays a trace against a virtual fleet with one Server row per entry of
+    `fleet` (its GPU count), placing every launch with Server.reserve() and
+    releasing with Server.release_gpus(). Launches that don't fit wait in a
+    FIFO queue until GPUs free up; each instance then runs for its recorded
+    duration. Creates its own Server rows; callers are expected to run it
+    inside a transaction they roll back.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    servers = [
+        Server.objects.create(name=f"sim-{run_id}-{i}", ip_address="192.0.2.1", total_gpus=gpus, available_gpus=gpus)
+        for i, gpus in enumerate(fleet)
+    ]
+    pool = Server.objects.filter(id__in=[server.id for server in servers])
+    free = {server.id: server.total_gpus for server in servers}
+    by_id = {server.id: server for server in servers}
+    total_gpus = sum(fleet)
+
+    durations: Dict[str, Optional[float]] = {}
+    launches: Dict[str, Dict[str, Any]] = {}
+    for event in trace:
+        if event["op"] == TRACE_LAUNCH:
+            launches[event["key"]] = event
+            durations.setdefault(event["key"], None)
+        elif event["key"] in launches:
+            durations[event["key"]] = event["t"] - launches[event["key"]]["t"]
+
+    # (time, order, op, key). Stops are pushed as instances start, with a negative
+    # order so they run before launches at the same time.
+    timeline = [(event["t"], i, TRACE_LAUNCH, event["key"]) for i, event in enumerate(launches.values())]
+    heapq.heapify(timeline)
+    sequence = len(timeline)
+
+    waiting: deque = deque()
+    running: Dict[str, int] = {}
+    waits: List[float] = []
+    latencies: List[float] = []
+    used, now, start = 0, None, None
+    busy_area = fragmentation_area = 0.0
+
+    def _place(key: str, requested_at: float) -> bool:
+        nonlocal used, sequence
+        n_gpus = launches[key]["n_gpus"]
+        started = time.perf_counter()
+        server = Server.reserve(n_gpus, policy=policy, pool=pool)
+        latencies.append(time.perf_counter() - started)
+        if server is None:
+            return False
+        free[server.id] = server.available_gpus
+        running[key] = server.id
+        used += n_gpus
+        waits.append(now - requested_at)
+        if durations[key] is not None:
+            sequence += 1
+            heapq.heappush(timeline, (now + durations[key], -sequence, TRACE_STOP, key))
+        return True
+
+    while timeline:
+        t, _, op, key = heapq.heappop(timeline)
+        if now is not None:
+            elapsed = t - now
+            busy_area += used * elapsed
+            free_total = sum(free.values())
+            if free_total:
+                fragmentation_area += (1 - max(free.values()) / free_total) * elapsed
+        now = t
+        start = t if start is None else start
+
+        if op == TRACE_LAUNCH:
+            if not _place(key, now):
+                waiting.append((key, now))
+            continue
+
+        server = by_id[running.pop(key)]
+        n_gpus = launches[key]["n_gpus"]
+        server.release_gpus(n_gpus)
+        free[server.id] = server.available_gpus
+        used -= n_gpus
+        # Backfill: the oldest waiting launches that fit now start, in order.
+        for _ in range(len(waiting)):
+            queued_key, requested_at = waiting.popleft()
+            if not _place(queued_key, requested_at):
+                waiting.append((queued_key, requested_at))
+
+    makespan = (now - start) if now is not None and start is not None else 0.0
+    return {
+        "policy": Server._get_policy(policy),
+        "servers": len(servers),
+        "total_gpus": total_gpus,
+        "launches": len(launches),
+        "placed": len(waits),
+        "never_placed": len(waiting),
+        "queued": sum(1 for wait in waits if wait > 0) + len(waiting),
+        "makespan_seconds": round(makespan, 3),
+        "gpu_utilization": round(busy_area / (total_gpus * makespan), 4) if total_gpus and makespan else 0.0,
+        "fragmentation": round(fragmentation_area / makespan, 4) if makespan else 0.0,
+        "queue_wait_seconds": _distribution(waits, scale=1.0),
+        "scheduling_latency_ms": _distribution(latencies, scale=1000.0),
+    }
+
+
+def _distribution(values: List[float], scale: float) -> Dict[str, float]:
+    return {
+        "mean": round(sum(values) / len(values) * scale, 3) if values else 0.0,
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p95": round(percentile(values, 95) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "max": round(max(values) * scale, 3) if values else 0.0,
+    }
@@ -0,0 +1,862 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shlex
+import struct
+import re
+import random
+import socket
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+import socketserver
+import http.server
+import urllib.parse
+
+import paramiko
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+Writer = Callable[[str], None]
+
+_PODMAN_SHIM = """#!{python}
+import sys, json, socket
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+sock.connect({socket_path!r})
+sock.sendall((json.dumps({{"argv": sys.argv[1:]}}) + "\\n").encode())
+exit_code = 1
+for line in sock.makefile("r", encoding="utf-8"):
+    frame = json.loads(line)
+    if "exit" in frame:
+        exit_code = frame["exit"]
+        break
+    stream = sys.stdout if frame["stream"] == "stdout" else sys.stderr
+    stream.write(frame["data"])
+    stream.flush()
+sys.exit(exit_code)
+"""
+
+_SUDO_SHIM = """#!/bin/sh
+exec "$@"
+"""
+
+# mount and umount change the real host's mounts, so the fake host only records them.
+_RECORDING_SHIM = """#!/bin/sh
+echo "$(basename "$0") $*" >> {log_path}
+"""
+
+
+class FakePodmanHost:
+    """
+    In-memory emulation of the podman state on one GPU server.
+
+    ``latency`` maps a podman subcommand ('inspect', 'pull', 'run', 'exec',
+    'stop', ...) to seconds of simulated work, ``failures`` maps a subcommand
+    to a forced ``(exit_status, stderr)`` result and ``failure_rate`` maps a
+    subcommand to the probability of failing with exit status 125.
+    ``pull_layers`` and ``output_size`` shape the progress output of a pull.
+    Pulls of ``lazy_images`` (eStargz images the host's lazy layer store
+    mounts from the registry) only take the 'lazy-pull' latency.
+    ``peers`` maps a host address to the FakePodmanHost that `podman image scp`
+    copies images from.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, float]] = None,
+        failures: Optional[Dict[str, Tuple[int, str]]] = None,
+        failure_rate: Optional[Dict[str, float]] = None,
+        pull_layers: int = 4,
+        output_size: int = 0,
+        local_images: Optional[Set[str]] = None,
+        lazy_images: Optional[Set[str]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = dict(latency or {})
+        self.failures = dict(failures or {})
+        self.failure_rate = dict(failure_rate or {})
+        self.pull_layers = pull_layers
+        self.output_size = output_size
+        self.images: Set[str] = set(local_images or ())
+        self.lazy_images: Set[str] = set(lazy_images or ())
+        self.containers: Dict[str, Dict[str, str]] = {}
+        self.peers: Dict[str, "FakePodmanHost"] = {}
+        self.calls: List[List[str]] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # -- command dispatch -------------------------------------------------
+
+    def execute(self, argv: List[str], out: Writer, err: Writer) -> int:
+        """Runs one `podman ...` argv (without the leading 'podman')."""
+        with self._lock:
+            self.calls.append(list(argv))
+        if not argv:
+            err("Error: missing command\n")
+            return 125
+
+        subcommand = argv[0]
+        if subcommand in ("image", "container") and len(argv) > 1:
+            subcommand = f"{subcommand}-{argv[1]}"
+
+        forced = self.failures.get(subcommand)
+        if forced:
+            self._sleep(subcommand)
+            err(forced[1].rstrip("\n") + "\n")
+            return forced[0]
+        if self._random.random() < self.failure_rate.get(subcommand, 0.0):
+            self._sleep(subcommand)
+            err(f"Error: simulated {subcommand} failure\n")
+            return 125
+
+        handler = getattr(self, f"_cmd_{subcommand.replace('-', '_')}", None)
+        if handler is None:
+            err(f"Error: unrecognized command `podman {argv[0]}`\n")
+            return 125
+        return handler(argv[1:], out, err)
+
+    def _sleep(self, subcommand: str) -> None:
+        delay = self.latency.get(subcommand, 0.0)
+        if delay:
+            time.sleep(delay)
+
+    @staticmethod
+    def _option(args: List[str], *names: str) -> Optional[str]:
+        for i, arg in enumerate(args):
+            for name in names:
+                if arg == name and i + 1 < len(args):
+                    return args[i + 1]
+                if arg.startswith(name + "="):
+                    return arg.split("=", 1)[1]
+        return None
+
+    @staticmethod
+    def _positionals(args: List[str], flags_with_values: Set[str]) -> List[str]:
+        positionals = []
+        skip = False
+        for arg in args:
+            if skip:
+                skip = False
+                continue
+            if arg.startswith("-"):
+                if "=" not in arg and arg in flags_with_values:
+                    skip = True
+                continue
+            positionals.append(arg)
+        return positionals
+
+    @staticmethod
+    def image_digest(image: str) -> str:
+        return "sha256:" + hashlib.sha256(f"{image}-manifest".encode()).hexdigest()
+
+    def container_report(self, name: str) -> Optional[Dict]:
+        """The container in the shape of `podman container inspect`, or None."""
+        container = self.containers.get(name)
+        if container is None:
+            return None
+        return {
+            "Id": container["id"],
+            "Name": name,
+            "State": {"Status": container["status"]},
+            "Image": hashlib.sha256(container["image"].encode()).hexdigest(),
+            "ImageName": container["image"],
+            "ImageDigest": self.image_digest(container["image"]),
+            "Config": {"Labels": dict(container.get("labels", {}))},
+        }
+
+    @staticmethod
+    def _render(template: str, report: Dict) -> str:
+        """Renders the `{{.A.B}}` and `{{index .A "key"}}` fields of a Go template against `report`."""
+        def _field(match) -> str:
+            expression = match.group(1).strip()
+            key = None
+            if expression.startswith("index "):
+                expression, key = expression[len("index "):].rsplit(" ", 1)
+                key = key.strip('"')
+            value = report
+            for part in expression.strip().lstrip(".").split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            if key is not None:
+                value = value.get(key) if isinstance(value, dict) else None
+            return "<no value>" if value is None else str(value)
+        return re.sub(r"\{\{(.*?)\}\}", _field, template)
+
+    def _cmd_inspect(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("inspect")
+        names = self._positionals(args, {"--format", "-f", "--type", "-t"})
+        report = self.container_report(names[0]) if names else None
+        if report is None:
+            err(f"Error: no such container {names[0] if names else ''}\n")
+            return 125
+        template = self._option(args, "--format", "-f")
+        if template and template != "json":
+            out(self._render(template, report) + "\n")
+        else:
+            out(json.dumps([report]) + "\n")
+        return 0
+
+    def _cmd_container_inspect(self, args: List[str], out: Writer, err: Writer) -> int:
+        return self._cmd_inspect(args[1:], out, err)
+
+    def _cmd_image_inspect(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("image-inspect")
+        names = self._positionals(args[1:], {"--format", "-f"})
+        with self._lock:
+            present = bool(names) and names[0] in self.images
+        if not present:
+            err(f"Error: {names[0] if names else ''}: image not known\n")
+            return 125
+        report = {"Id": hashlib.sha256(names[0].encode()).hexdigest(), "Digest": self.image_digest(names[0]), "RepoTags": [names[0]]}
+        template = self._option(args, "--format", "-f")
+        out((self._render(template, report) if template else json.dumps([report])) + "\n")
+        return 0
+
+    def _cmd_image_exists(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("image-exists")
+        names = self._positionals(args[1:], set())
+        return 0 if names and names[0] in self.images else 1
+
+    def _cmd_pull(self, args: List[str], out: Writer, err: Writer) -> int:
+        names = self._positionals(args, {"--authfile", "--creds", "--platform"})
+        if not names:
+            err("Error: requires exactly 1 arg\n")
+            return 125
+        image = names[0]
+        quiet = "--quiet" in args or "-q" in args
+        lazy = image in self.lazy_images
+        delay = self.latency.get("lazy-pull" if lazy else "pull", 0.0)
+        layers = max(self.pull_layers, 1)
+        padding = "." * self.output_size
+
+        if not quiet:
+            err(f"Trying to pull {image}...\n")
+            err("Getting image source signatures\n")
+        for i in range(layers):
+            digest = hashlib.sha256(f"{image}-{i}".encode()).hexdigest()
+            if not quiet:
+                err(f"Copying blob sha256:{digest}\n")
+            if delay:
+                time.sleep(delay / layers)
+            if not quiet:
+                err(f"Copying blob {digest[:12]} done {padding}\n")
+        if not quiet:
+            err(f"Copying config {hashlib.sha256(image.encode()).hexdigest()[:12]} done\n")
+            err("Writing manifest to image destination\n")
+            err("Storing signatures\n")
+        with self._lock:
+            self.images.add(image)
+        out(hashlib.sha256(image.encode()).hexdigest() + "\n")
+        return 0
+
+    def _cmd_image_scp(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("image-scp")
+        names = self._positionals(args[1:], {"--identity"})
+        source, _, image = names[0].partition("::") if names else ("", "", "")
+        peer = self.peers.get(source.rpartition("@")[2])
+        if peer is None:
+            err(f"Error: failed to connect to {source}\n")
+            return 125
+        with peer._lock:
+            found = image in peer.images
+        if not found:
+            err(f"Error: {image}: image not known\n")
+            return 125
+        with self._lock:
+            self.images.add(image)
+        out(f"Loaded image: {image}\n")
+        return 0
+
+    def _cmd_images(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("images")
+        out(json.dumps(self.image_list()) + "\n")
+        return 0
+
+    def image_list(self) -> List[Dict]:
+        """Local images in the shape of `podman images --format json`."""
+        with self._lock:
+            images = sorted(self.images)
+        return [
+            {
+                "Id": hashlib.sha256(image.encode()).hexdigest(),
+                "Names": [image],
+                "Digest": self.image_digest(image),
+            }
+            for image in images
+        ]
+
+    def _cmd_run(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("run")
+        name = self._option(args, "--name")
+        values = {
+            "--name", "--hostname", "--systemd", "--device", "--ulimit", "--pids-limit", "--cap-add",
+            "-p", "--publish", "--volume", "-v", "--shm-size", "--label", "--env", "-e", "--umask",
+        }
+        positionals = self._positionals(args, values)
+        if not positionals:
+            err("Error: requires at least 1 arg\n")
+            return 125
+        image = positionals[0]
+        with self._lock:
+            if name in self.containers and "--replace" not in args:
+                err(f"Error: the container name \"{name}\" is already in use\n")
+                return 125
+            self.images.add(image)
+            container_id = uuid.uuid4().hex * 2
+            self.containers[name or container_id[:12]] = {
+                "id": container_id,
+                "image": image,
+                "status": "running",
+                "devices": [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == "--device"],
+                "ports": [args[i + 1] for i, arg in enumerate(args[:-1]) if arg in ("-p", "--publish")],
+                "labels": dict(args[i + 1].split("=", 1) for i, arg in enumerate(args[:-1]) if arg == "--label"),
+                "volumes": [args[i + 1] for i, arg in enumerate(args[:-1]) if arg in ("--volume", "-v")],
+            }
+        out(container_id + "\n")
+        return 0
+
+    def _cmd_container_checkpoint(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("container-checkpoint")
+        names = self._positionals(args[1:], {"--export", "-e", "--compress", "-c"})
+        with self._lock:
+            container = self.containers.get(names[0]) if names else None
+            if container is None or container["status"] != "running":
+                err(f"Error: {names[0] if names else ''}: container not running\n")
+                return 125
+            container["status"] = "exited"
+            container["checkpointed"] = True
+        out(names[0] + "\n")
+        return 0
+
+    def _cmd_container_restore(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("container-restore")
+        names = self._positionals(args[1:], {"--import", "-i", "--name", "-n"})
+        with self._lock:
+            container = self.containers.get(names[0]) if names else None
+            if container is None or not container.get("checkpointed"):
+                err(f"Error: {names[0] if names else ''}: container does not have a checkpoint\n")
+                return 125
+            container["status"] = "running"
+        out(container["id"] + "\n")
+        return 0
+
+    def _cmd_rename(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("rename")
+        names = self._positionals(args, set())
+        with self._lock:
+            if len(names) < 2 or names[0] not in self.containers:
+                err(f"Error: no container with name or ID \"{names[0] if names else ''}\" found: no such container\n")
+                return 125
+            if names[1] in self.containers:
+                err(f"Error: the container name \"{names[1]}\" is already in use\n")
+                return 125
+            self.containers[names[1]] = self.containers.pop(names[0])
+        return 0
+
+    def _cmd_exec(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("exec")
+        names = self._positionals(args, {"--user", "-u", "--workdir", "-w", "--env", "-e"})
+        container = self.containers.get(names[0]) if names else None
+        if container is None or container["status"] != "running":
+            err(f"Error: can only create exec sessions on running containers: container state improper\n")
+            return 125
+        return 0
+
+    def _cmd_stop(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("stop")
+        names = self._positionals(args, {"-t", "--time"})
+        container = self.containers.get(names[0]) if names else None
+        if container is None:
+            err(f"Error: no container with name or ID \"{names[0] if names else ''}\" found: no such container\n")
+            return 125
+        container["status"] = "exited"
+        out(names[0] + "\n")
+        return 0
+
+    def _cmd_start(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("start")
+        names = self._positionals(args, set())
+        container = self.containers.get(names[0]) if names else None
+        if container is None:
+            err(f"Error: no container with name or ID \"{names[0] if names else ''}\" found: no such container\n")
+            return 125
+        container["status"] = "running"
+        out(names[0] + "\n")
+        return 0
+
+    def _cmd_rm(self, args: List[str], out: Writer, err: Writer) -> int:
+        self._sleep("rm")
+        names = self._positionals(args, {"-t", "--time"})
+        with self._lock:
+            container = self.containers.get(names[0]) if names else None
+            if container is None:
+                err(f"Error: no container with name or ID \"{names[0] if names else ''}\" found: no such container\n")
+                return 1
+            if container["status"] == "running" and "-f" not in args and "--force" not in args:
+                err("Error: cannot remove container as it is running - running or paused containers cannot be removed without force\n")
+                return 2
+            del self.containers[names[0]]
+        out(names[0] + "\n")
+        return 0
+
+
+class _LibpodHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves the subset of the libpod REST API used by PodmanAPIExecutor on
+    top of a FakePodmanHost, so latency and failure injection apply to both
+    backends. Container create/exec bookkeeping lives on the handler class.
+    """
+
+    protocol_version = "HTTP/1.1"
+    podman: FakePodmanHost = None
+    exec_sessions: Dict[str, Dict] = {}
+
+    def log_message(self, format, *args):
+        logger.debug(f"Fake libpod API: {format % args}")
+
+    def _reply(self, status: int, body=None, close: bool = False) -> None:
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, message: str) -> None:
+        self._reply(status, {"cause": message, "message": message, "response": status})
+
+    def _run(self, argv: List[str]) -> Tuple[int, str, str]:
+        out, err = [], []
+        code = self.podman.execute(argv, out.append, err.append)
+        return code, "".join(out), "".join(err)
+
+    def _route(self, method: str) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        parts = url.path.strip("/").split("/")[2:] if url.path.startswith("/v") else url.path.strip("/").split("/")[1:]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        route = (method, parts[0] if parts else "", parts[-1] if len(parts) > 2 else "")
+        name = parts[1] if len(parts) > 1 else ""
+        if route == ("GET", "containers", "json"):
+            code, out, err = self._run(["container", "inspect", name])
+            if code != 0:
+                return self._error(404, err.strip())
+            return self._reply(200, json.loads(out)[0])
+        if route[:2] == ("GET", "images") and name == "json":
+            return self._reply(200, self.podman.image_list())
+        if route[:2] == ("POST", "images") and name == "pull":
+            return self._pull(query.get("reference", ""))
+        if route[:2] == ("POST", "containers") and name == "create":
+            return self._create(body or {})
+        if route == ("POST", "containers", "start"):
+            code, _, err = self._run(["start", self._container_name(name)])
+            return self._reply(204) if code == 0 else self._error(404, err.strip())
+        if route[:2] == ("POST", "containers") and route[2] in ("checkpoint", "restore"):
+            code, _, err = self._run(["container", route[2], name])
+            return self._reply(200, {"Id": name}) if code == 0 else self._error(500, err.strip())
+        if route == ("POST", "containers", "stop"):
+            container = self.podman.containers.get(name)
+            if container is not None and container["status"] != "running":
+                return self._reply(304)
+            code, _, err = self._run(["stop", "-t", query.get("timeout", "10"), name])
+            return self._reply(204) if code == 0 else self._error(404, err.strip())
+        if method == "DELETE" and route[1] == "containers":
+            argv = ["rm", "-f", name] if query.get("force") == "true" else ["rm", name]
+            code, _, err = self._run(argv)
+            if code == 0:
+                return self._reply(200, [{"Id": name}])
+            return self._error(404 if code == 1 else 409, err.strip())
+        if route == ("POST", "containers", "exec"):
+            exec_id = uuid.uuid4().hex
+            self.exec_sessions[exec_id] = {"container": name, "cmd": (body or {}).get("Cmd", []), "exit": None}
+            return self._reply(201, {"Id": exec_id})
+        if route == ("POST", "exec", "start"):
+            session = self.exec_sessions.get(name)
+            if session is None:
+                return self._error(404, "no such exec session")
+            if (body or {}).get("Detach"):
+                session["exit"], _, err = self._run(["exec", "-d", session["container"]] + session["cmd"])
+                return self._reply(200) if session["exit"] == 0 else self._error(409, err.strip())
+            session["exit"], out, err = self._run(["exec", session["container"]] + session["cmd"])
+            frames = b""
+            for stream_type, data in ((1, out), (2, err)):
+                if data:
+                    frames += struct.pack(">BxxxI", stream_type, len(data.encode())) + data.encode()
+            # libpod hijacks the connection for attached exec sessions and closes it afterwards.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+            self.send_header("Content-Length", str(len(frames)))
+            self.send_header("Connection", "close")
+            self.close_connection = True
+            self.end_headers()
+            self.wfile.write(frames)
+            return
+        if route == ("GET", "exec", "json"):
+            session = self.exec_sessions.get(name)
+            if session is None:
+                return self._error(404, "no such exec session")
+            return self._reply(200, {"ID": name, "Running": False, "ExitCode": session["exit"]})
+        return self._error(404, f"unsupported endpoint {method} {url.path}")
+
+    def _container_name(self, name_or_id: str) -> str:
+        for name, container in self.podman.containers.items():
+            if container["id"] == name_or_id:
+                return name
+        return name_or_id
+
+    def _pull(self, reference: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def _chunk(report: Dict) -> None:
+            data = (json.dumps(report) + "\n").encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        out, err = [], []
+
+        def _progress(data: str) -> None:
+            err.append(data)
+            _chunk({"stream": data})
+
+        code = self.podman.execute(["pull", reference], out.append, _progress)
+        if code != 0:
+            _chunk({"error": err[-1].strip() if err else f"pull of {reference} failed"})
+        else:
+            _chunk({"images": [out[-1].strip()], "id": out[-1].strip()})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _create(self, spec: Dict) -> None:
+        self.podman._sleep("create")
+        forced = self.podman.failures.get("run")
+        if forced:
+            return self._error(500, forced[1].strip())
+        name = spec.get("name")
+        with self.podman._lock:
+            self.podman.calls.append(["create", name])
+            if name in self.podman.containers:
+                return self._error(409, f"the container name \"{name}\" is already in use")
+            self.podman.images.add(spec.get("image"))
+            container_id = uuid.uuid4().hex * 2
+            self.podman.containers[name] = {
+                "id": container_id,
+                "image": spec.get("image"),
+                "status": "created",
+                "devices": [device["path"] for device in spec.get("devices", [])],
+                "ports": [f"{port['host_port']}:{port['container_port']}" for port in spec.get("portmappings", [])],
+                "labels": dict(spec.get("labels") or {}),
+                "volumes": [
+                    ":".join([mount["source"], mount["destination"]] + ([",".join(mount["options"])] if mount.get("options") else []))
+                    for mount in spec.get("mounts", [])
+                ],
+            }
+        self._reply(201, {"Id": container_id, "Warnings": []})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+class _ShimServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class FakeSSHServer:
+    """
+    In-process SSH server backed by a FakePodmanHost.
+
+    Plain `sudo podman ...` commands are dispatched straight to the fake host.
+    Anything else (shell pipelines, `bash -s` scripts) runs under a real local
+    bash with `sudo` and `podman` shims on PATH that call back into the same
+    fake host, so multi-step remote scripts see consistent state.
+    `mount` and `umount` are recorded in `host_commands` instead of being run.
+    A `socat ... UNIX-CONNECT:` bridge command is answered with a fake libpod
+    REST API on the channel itself.
+    ``handshake_latency`` delays authentication and ``exec_latency`` delays
+    every exec channel to emulate a slow (e.g. WAN) link.
+    """
+
+    def __init__(
+        self,
+        host: Optional[FakePodmanHost] = None,
+        bind_address: str = "127.0.0.1",
+        port: int = 0,
+        handshake_latency: float = 0.0,
+        exec_latency: float = 0.0,
+    ):
+        self.podman = host or FakePodmanHost()
+        self.bind_address = bind_address
+        self.port = port
+        self.handshake_latency = handshake_latency
+        self.exec_latency = exec_latency
+        self.execs = 0
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.connections = 0
+        self._socket: Optional[socket.socket] = None
+        self._threads: List[threading.Thread] = []
+        self._transports: List[paramiko.Transport] = []
+        self._stopping = threading.Event()
+        self._workdir: Optional[tempfile.TemporaryDirectory] = None
+        self._shim_server: Optional[_ShimServer] = None
+        self._exec_sessions: Dict[str, Dict] = {}
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def start(self) -> "FakeSSHServer":
+        self._workdir = tempfile.TemporaryDirectory(prefix="synapse-fake-host-")
+        self._start_shims(self._workdir.name)
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.bind_address, self.port))
+        self._socket.listen(64)
+        self._socket.settimeout(0.2)
+        self.port = self._socket.getsockname()[1]
+        self._spawn(self._accept_loop)
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        for transport in list(self._transports):
+            transport.close()
+        if self._socket:
+            self._socket.close()
+        if self._shim_server:
+            self._shim_server.shutdown()
+            self._shim_server.server_close()
+        if self._workdir:
+            self._workdir.cleanup()
+
+    @property
+    def workdir(self) -> str:
+        """Scratch directory of the server, for files that shell commands write on the 'host'."""
+        return self._workdir.name
+
+    @property
+    def host_commands(self) -> List[str]:
+        """The recorded `mount` and `umount` command lines, oldest first."""
+        try:
+            with open(os.path.join(self.workdir, "host-commands.log")) as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def __enter__(self) -> "FakeSSHServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _spawn(self, target, *args) -> None:
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _start_shims(self, workdir: str) -> None:
+        socket_path = os.path.join(workdir, "podman.sock")
+        bin_dir = os.path.join(workdir, "bin")
+        os.makedirs(bin_dir)
+        with open(os.path.join(bin_dir, "podman"), "w") as f:
+            f.write(_PODMAN_SHIM.format(python=sys.executable, socket_path=socket_path))
+        with open(os.path.join(bin_dir, "sudo"), "w") as f:
+            f.write(_SUDO_SHIM)
+        for name in ("mount", "umount"):
+            with open(os.path.join(bin_dir, name), "w") as f:
+                f.write(_RECORDING_SHIM.format(log_path=shlex.quote(os.path.join(workdir, "host-commands.log"))))
+        for name in ("podman", "sudo", "mount", "umount"):
+            os.chmod(os.path.join(bin_dir, name), 0o755)
+        self._bin_dir = bin_dir
+
+        podman = self.podman
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                request = json.loads(self.rfile.readline())
+
+                def _writer(stream):
+                    def _write(data):
+                        frame = json.dumps({"stream": stream, "data": data}) + "\n"
+                        self.wfile.write(frame.encode())
+                        self.wfile.flush()
+                    return _write
+
+                code = podman.execute(request["argv"], _writer("stdout"), _writer("stderr"))
+                self.wfile.write((json.dumps({"exit": code}) + "\n").encode())
+
+        self._shim_server = _ShimServer(socket_path, _Handler)
+        self._spawn(self._shim_server.serve_forever)
+
+    # -- SSH plumbing ---------------------------------------------------------
+
+    def _accept_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                client, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.connections += 1
+            self._spawn(self._serve_connection, client)
+
+    def _serve_connection(self, client: socket.socket) -> None:
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        self._transports.append(transport)
+        try:
+            transport.start_server(server=_FakeServerInterface(self))
+        except Exception as e:
+            logger.debug(f"Fake SSH handshake failed: {e}")
+            transport.close()
+
+    def handle_exec(self, channel: paramiko.Channel, command: str) -> None:
+        self._spawn(self._run_exec, channel, command)
+
+    def _run_exec(self, channel: paramiko.Channel, command: str) -> None:
+        code = 255
+        self.execs += 1
+        try:
+            if self.exec_latency:
+                time.sleep(self.exec_latency)
+            argv = self._simple_podman_argv(command)
+            if "UNIX-CONNECT:" in command:
+                code = self._serve_libpod_api(channel)
+            elif argv is not None:
+                code = self.podman.execute(
+                    argv,
+                    lambda data: channel.sendall(data.encode()),
+                    lambda data: channel.sendall_stderr(data.encode()),
+                )
+            else:
+                code = self._run_shell(channel, command)
+        except Exception as e:
+            logger.exception(f"Fake SSH exec failed for {command!r}: {e}")
+        finally:
+            # The exec reply is sent by the transport thread after
+            # check_channel_exec_request() returns; clients only send EOF once
+            # they have seen it, so wait for EOF to never close the channel first.
+            deadline = time.monotonic() + 2
+            while not channel.eof_received and not channel.closed and time.monotonic() < deadline:
+                time.sleep(0.001)
+            try:
+                channel.send_exit_status(code)
+                channel.close()
+            except Exception:
+                pass
+
+    def _serve_libpod_api(self, channel: paramiko.Channel) -> int:
+        handler = type("_Handler", (_LibpodHandler,), {"podman": self.podman, "exec_sessions": self._exec_sessions})
+        handler(channel, (self.bind_address, 0), None)
+        return 0
+
+    @staticmethod
+    def _simple_podman_argv(command: str) -> Optional[List[str]]:
+        """Returns the podman argv for a plain `[sudo] podman ...` command, else None."""
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        try:
+            tokens = list(lexer)
+        except ValueError:
+            return None
+        if any(token and all(c in "();<>|&" for c in token) for token in tokens):
+            return None
+        if tokens[:1] == ["sudo"]:
+            tokens = tokens[1:]
+        if tokens[:1] != ["podman"]:
+            return None
+        return tokens[1:]
+
+    def _run_shell(self, channel: paramiko.Channel, command: str) -> int:
+        env = dict(os.environ, PATH=f"{self._bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+        process = subprocess.Popen(
+            ["bash", "-c", command],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+        )
+
+        def _pump_stdin():
+            try:
+                while True:
+                    data = channel.recv(32768)
+                    if not data:
+                        break
+                    process.stdin.write(data)
+                    process.stdin.flush()
+            except (OSError, ValueError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        def _pump(source, send):
+            try:
+                for chunk in iter(lambda: source.read1(32768), b""):
+                    send(chunk)
+            except OSError:
+                # The client closed the channel: like sshd, drop the pipe so
+                # the command's next write fails with a broken pipe.
+                source.close()
+
+        pumps = [
+            threading.Thread(target=_pump_stdin, daemon=True),
+            threading.Thread(target=_pump, args=(process.stdout, channel.sendall), daemon=True),
+            threading.Thread(target=_pump, args=(process.stderr, channel.sendall_stderr), daemon=True),
+        ]
+        for pump in pumps:
+            pump.start()
+        code = process.wait()
+        for pump in pumps[1:]:
+            pump.join()
+        return code
+
+
+class _FakeServerInterface(paramiko.ServerInterface):
+    def __init__(self, server: FakeSSHServer):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return "publickey,password"
+
+    def _accept(self):
+        if self.server.handshake_latency:
+            time.sleep(self.server.handshake_latency)
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return self._accept()
+
+    def check_auth_password(self, username, password):
+        return self._accept()
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        self.server.handle_exec(channel, command.decode() if isinstance(command, bytes) else command)
+        return True
@@ -0,0 +1,110 @@
+import json
+import hashlib
+import logging
+import threading
+import http.server
+
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE_OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+
+
+class _RegistryHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"fake registry: {format % args}")
+
+    def _reply(self, status: int, body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _manifest(self) -> None:
+        registry: FakeRegistry = self.server.registry
+        with registry.lock:
+            registry.requests.append((self.command, self.path))
+        parts = self.path.split("/manifests/", 1)
+        if not self.path.startswith("/v2/") or len(parts) != 2:
+            return self._reply(200 if self.path == "/v2/" else 404, b"{}", {"Content-Type": "application/json"})
+        repository, reference = parts[0][len("/v2/"):], parts[1]
+        found = registry.lookup(repository, reference)
+        if found is None:
+            body = json.dumps({"errors": [{"code": "MANIFEST_UNKNOWN", "message": "manifest unknown"}]}).encode()
+            return self._reply(404, body, {"Content-Type": "application/json"})
+        digest, manifest = found
+        self._reply(200, manifest, {"Content-Type": MEDIA_TYPE_OCI_MANIFEST, "Docker-Content-Digest": digest})
+
+    do_GET = _manifest
+    do_HEAD = _manifest
+
+
+class _RegistryServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeRegistry:
+    """
+    A minimal OCI distribution registry on 127.0.0.1 serving image manifests
+    (no blobs), for testing control-plane registry checks. Images are added
+    with push() and requests are recorded in `requests`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: List[Tuple[str, str]] = []
+        self._manifests: Dict[str, bytes] = {}
+        self._tags: Dict[Tuple[str, str], str] = {}
+        self._server = _RegistryServer(("127.0.0.1", 0), _RegistryHandler)
+        self._server.registry = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def push(self, repository: str, tag: str, layer_sizes: List[int], config_size: int = 1024) -> str:
+        """Adds (or replaces) `repository:tag` with layers of the given sizes. Returns its digest."""
+        manifest = json.dumps({
+            "schemaVersion": 2,
+            "mediaType": MEDIA_TYPE_OCI_MANIFEST,
+            "config": {"mediaType": "application/vnd.oci.image.config.v1+json", "size": config_size,
+                       "digest": "sha256:" + hashlib.sha256(f"{repository}:{tag}-config".encode()).hexdigest()},
+            "layers": [
+                {"mediaType": "application/vnd.oci.image.layer.v1.tar+gzip", "size": size,
+                 "digest": "sha256:" + hashlib.sha256(f"{repository}:{tag}-{i}-{size}".encode()).hexdigest()}
+                for i, size in enumerate(layer_sizes)
+            ],
+        }).encode()
+        digest = "sha256:" + hashlib.sha256(manifest).hexdigest()
+        with self.lock:
+            self._manifests[digest] = manifest
+            self._tags[(repository, tag)] = digest
+        return digest
+
+    def delete(self, repository: str, tag: str) -> None:
+        with self.lock:
+            self._tags.pop((repository, tag), None)
+
+    def lookup(self, repository: str, reference: str) -> Optional[Tuple[str, bytes]]:
+        with self.lock:
+            digest = reference if reference.startswith("sha256:") else self._tags.get((repository, reference))
+            manifest = self._manifests.get(digest) if digest else None
+        return (digest, manifest) if manifest is not None else None
+
+    def start(self) -> "FakeRegistry":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-registry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
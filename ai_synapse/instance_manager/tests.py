@@ -1,3 +1,1128 @@
-from django.test import TestCase
+import os
+import json
+import time
+import paramiko
 
-# Create your tests here.
+import asyncio
+import warnings
+
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from user_manager.models import Account
+
+from .distribution import distribute_image, peer_copy_command
+from .events import get_event_broker
+from .exceptions import (
+    ImageNotFoundException, InstanceAlreadyRunningException, InstanceAlreadyStoppedException,
+    RemoteCommandCancelledException, RemoteCommandTimeoutException,
+)
+from .fleet import FleetIndex, set_fleet_index
+from .image_cache import ImageWarmer, pull_server_image
+from .models import Image, Instance, Job, Server, ServerImage, WarmContainer
+from .models.image import ImageFormat
+from .models.instance import InstanceStatus
+from .models.job import JobKind, JobStatus
+from .remote import (
+    Operation, Orchestrator, PodmanAPIClient, RegistryClient, SSHConnectionPool,
+    get_connection_pool, run_command, set_connection_pool, set_podman_api_client, set_registry_client,
+)
+from .simulation import FakePodmanHost, FakeRegistry, FakeSSHServer
+from .simulation.benchmark import run_launch_benchmark
+from .simulation.placement import export_instance_trace, replay_trace
+from .utils import PhaseTimer, collect_phases, percentile
+from .warm_pool import WarmPool, claim_setup_command
+from .workers import JobWorkerPool
+
+
+class FakeHostMixin:
+    """Runs Instance operations against an in-process fake Podman host."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.podman = FakePodmanHost()
+        cls.ssh_server = FakeSSHServer(cls.podman).start()
+        cls.pool = SSHConnectionPool(
+            username=settings.SSH_USERNAME,
+            port=cls.ssh_server.port,
+            pkey=paramiko.RSAKey.generate(2048),
+            connect_timeout=10,
+        )
+        set_connection_pool(cls.pool)
+        # Container configuration files and home directories are written by a local shell on the fake host.
+        cls.host_settings = override_settings(
+            PODMAN_SETTINGS=dict(
+                settings.PODMAN_SETTINGS,
+                config_dir=os.path.join(cls.ssh_server.workdir, "containers"),
+                mount_paths=["/mnt/data/:/mnt/data/:ro", os.path.join(cls.ssh_server.workdir, "userdata", "{username}") + ":/home/ubuntu"],
+                home_owner=f"{os.getuid()}:{os.getgid()}",
+            ),
+        )
+        cls.host_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.host_settings.disable()
+        set_connection_pool(None)
+        cls.ssh_server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.podman.containers.clear()
+        self.podman.images.clear()
+        self.podman.failures.clear()
+        self.podman.calls.clear()
+        self.account = Account.objects.create_user(
+            email="alice@example.com",
+            username="alice",
+            ssh_public_key="ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAITestKey alice@example.com",
+        )
+        self.server = Server.objects.create(
+            name="gpu-01", ip_address=self.ssh_server.bind_address, total_gpus=8, available_gpus=8,
+        )
+        self.image = Image.objects.create(
+            name="cuda", tag="cuda-12", custom_registry_image_name="localhost/cuda:12", is_available=True,
+        )
+
+    def container(self, instance_id: str) -> dict:
+        """The fake host's record of the container of instance `instance_id`."""
+        instance = Instance.objects.get(instance_id=instance_id)
+        return self.podman.containers[instance._get_container_name(instance.account.username)]
+
+
+class FakeHostTestCase(FakeHostMixin, TestCase):
+    pass
+
+
+class InstanceLifecycleTests(FakeHostTestCase):
+
+    def test_launch_runs_container_and_marks_running(self):
+        instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+
+        instance = Instance.objects.get(instance_id=instance_id)
+        self.assertEqual(instance.status, InstanceStatus.RUNNING)
+        self.assertEqual(self.container(instance_id)["status"], "running")
+        self.assertIn("localhost/cuda:12", self.podman.images)
+
+    def test_launch_script_mode_issues_single_exec(self):
+        podman_settings = dict(settings.PODMAN_SETTINGS, launch_mode="script")
+        execs_before = self.ssh_server.execs
+        with override_settings(PODMAN_SETTINGS=podman_settings):
+            instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+
+        self.assertEqual(Instance.objects.get(instance_id=instance_id).status, InstanceStatus.RUNNING)
+        self.assertEqual(self.container(instance_id)["status"], "running")
+        self.assertEqual(self.ssh_server.execs - execs_before, 1)
+
+    def test_launch_mounts_generated_config_without_exec(self):
+        self.podman.calls.clear()
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(1), self.image.id, 1))
+
+        config_dir = os.path.join(settings.PODMAN_SETTINGS["config_dir"], f"alice-{instance.instance_id}")
+        with open(os.path.join(config_dir, "authorized_keys")) as f:
+            self.assertEqual(f.read(), self.account.ssh_public_key + "\n")
+        with open(os.path.join(config_dir, "profile.sh")) as f:
+            self.assertIn("export CUDA_VISIBLE_DEVICES=0", f.read())
+        self.assertIn(f"{config_dir}/authorized_keys:/etc/synapse/authorized_keys:ro", self.container(instance.instance_id)["volumes"])
+        self.assertNotIn("exec", [call[0] for call in self.podman.calls])
+
+    def test_launch_prepares_home_directory_on_host(self):
+        Instance.launch(self.account, Server.reserve(1), self.image.id, 1)
+
+        home = os.path.join(self.ssh_server.workdir, "userdata", "alice")
+        self.assertEqual(os.stat(os.path.join(home, ".ssh")).st_mode & 0o777, 0o700)
+        self.assertEqual(os.stat(home).st_mode & 0o777, 0o775)
+        with open(os.path.join(home, ".bash_profile")) as f:
+            self.assertEqual(f.read(), "source /home/ubuntu/.bashrc\n")
+
+    def test_start_running_container_raises_already_running(self):
+        instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+        instance = Instance.objects.get(instance_id=instance_id)
+
+        with self.assertRaises(InstanceAlreadyRunningException):
+            instance.start()
+
+    def test_stop_marks_instance_stopped(self):
+        instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+        instance = Instance.objects.get(instance_id=instance_id)
+
+        instance.stop()
+
+        instance.refresh_from_db()
+        self.assertEqual(instance.status, InstanceStatus.STOPPED)
+        self.assertEqual(self.container(instance_id)["status"], "exited")
+
+    def test_reservation_is_held_while_running_and_released_on_stop(self):
+        server = Server.reserve(2)
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, server, self.image.id, 2))
+        self.server.refresh_from_db()
+        self.assertEqual((instance.reserved_gpus, self.server.available_gpus), (2, 6))
+
+        instance.stop()
+        self.server.refresh_from_db()
+        self.assertEqual(self.server.available_gpus, 8)
+
+        instance.start()
+        self.server.refresh_from_db()
+        self.assertEqual(self.server.available_gpus, 6)
+
+    def test_stop_of_crashed_container_releases_devices(self):
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(2), self.image.id, 2))
+        self.container(instance.instance_id)["status"] = "exited"
+
+        with self.assertRaises(InstanceAlreadyStoppedException):
+            instance.stop()
+
+        instance.refresh_from_db()
+        self.server.refresh_from_db()
+        self.assertEqual((instance.status, instance.reserved_gpus, instance.host_ports), (InstanceStatus.STOPPED, 0, {}))
+        self.assertEqual((self.server.available_gpus, self.server.allocated_gpu_indices, self.server.allocated_host_ports), (8, [], []))
+
+    def test_instances_on_one_server_get_distinct_gpus(self):
+        bob = Account.objects.create_user(email="bob@example.com", username="bob", ssh_public_key="ssh-ed25519 AAAA bob")
+        first = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(2), self.image.id, 2))
+        second = Instance.objects.get(instance_id=Instance.launch(bob, Server.reserve(1), self.image.id, 1))
+
+        self.assertEqual((first.gpu_indices, second.gpu_indices), ([0, 1], [2]))
+        self.assertEqual(self.container(first.instance_id)["devices"][:2], ["nvidia.com/gpu=0", "nvidia.com/gpu=1"])
+        self.assertIn("nvidia.com/gpu=2", self.container(second.instance_id)["devices"])
+
+        first.stop()
+        self.server.refresh_from_db()
+        self.assertEqual(self.server.allocated_gpu_indices, [2])
+
+    def test_instances_on_one_server_get_distinct_ssh_ports(self):
+        bob = Account.objects.create_user(email="bob@example.com", username="bob", ssh_public_key="ssh-ed25519 AAAA bob")
+        first = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(1), self.image.id, 1))
+        second = Instance.objects.get(instance_id=Instance.launch(bob, Server.reserve(1), self.image.id, 1))
+
+        self.assertEqual((first.host_ports, second.host_ports), ({"ssh": 20000}, {"ssh": 20001}))
+        self.assertEqual(self.container(second.instance_id)["ports"], ["20001:22"])
+        endpoint = second.serialize()
+        self.assertEqual((endpoint["server_hostname"], endpoint["ssh_host_port"]), (self.server.ip_address, 20001))
+
+        first.stop()
+        self.server.refresh_from_db()
+        self.assertEqual(self.server.allocated_host_ports, [20001])
+
+    def test_failed_launch_gives_reservation_back(self):
+        self.podman.failures["pull"] = (125, "Error: manifest unknown")
+        server = Server.reserve(4)
+
+        with self.assertRaises(Exception):
+            Instance.launch(self.account, server, self.image.id, 4)
+
+        self.server.refresh_from_db()
+        self.assertEqual(self.server.available_gpus, 8)
+
+    def test_pull_failure_rolls_back_launch(self):
+        self.podman.failures["pull"] = (125, "Error: manifest unknown")
+
+        with self.assertRaises(Exception):
+            Instance.launch(self.account, self.server, self.image.id, 1)
+
+        self.assertFalse(Instance.objects.filter(account=self.account).exists())
+        self.assertFalse(self.podman.containers)
+
+    def test_operations_reuse_pooled_connection(self):
+        handshakes_before = self.pool.handshakes
+        instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+        Instance.objects.get(instance_id=instance_id).stop()
+
+        self.assertLessEqual(self.pool.handshakes - handshakes_before, 1)
+        self.assertGreater(self.pool.hits, 0)
+
+    def test_pull_progress_is_reported(self):
+        events = []
+        instance = Instance(account=self.account, server=self.server, image=self.image, n_gpus=1)
+        with self.pool.connection(self.server.ip_address) as ssh:
+            instance._ensure_image_pulled(ssh, "localhost/cuda:12", self.server.name, progress_callback=events.append)
+
+        done = [event for event in events if event.kind == "blob" and event.state == "done"]
+        self.assertEqual(len(done), self.podman.pull_layers)
+        self.assertEqual(events[-1].kind, "stored")
+
+
+class ImageCacheTests(FakeHostTestCase):
+
+    def test_restart_skips_pull_of_cached_image(self):
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, self.server, self.image.id, 1))
+        instance.stop()
+        instance.start()
+
+        pulls = [call for call in self.podman.calls if call[0] == "pull"]
+        self.assertEqual(len(pulls), 1)
+        self.assertTrue(ServerImage.is_present(self.server, self.image))
+
+    def test_restart_pulls_tag_pushed_again(self):
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, self.server, self.image.id, 1))
+        instance.stop()
+        Image.objects.filter(pk=self.image.pk).update(registry_digest="sha256:" + "f" * 64)
+        self.podman.calls.clear()
+
+        Instance.objects.get(pk=instance.pk).start()
+
+        commands = [call[0] for call in self.podman.calls]
+        self.assertIn("pull", commands)
+        self.assertIn("run", commands)
+        self.assertNotIn("start", commands)
+
+    def test_script_launch_pulls_tag_pushed_again(self):
+        pull_server_image(self.server, self.image)
+        Image.objects.filter(pk=self.image.pk).update(registry_digest="sha256:" + "f" * 64)
+        self.podman.calls.clear()
+
+        with override_settings(PODMAN_SETTINGS=dict(settings.PODMAN_SETTINGS, launch_mode="script")):
+            Instance.launch(self.account, self.server, self.image.id, 1)
+
+        self.assertIn("pull", [call[0] for call in self.podman.calls])
+        self.assertEqual(ServerImage.objects.get(server=self.server, image=self.image).pulled_at.date(), timezone.now().date())
+
+    def test_warmer_pre_pulls_popular_image_to_idle_server(self):
+        Instance.objects.create(account=self.account, server=self.server, image=self.image, n_gpus=1, status=InstanceStatus.STOPPED)
+
+        result = ImageWarmer(max_pulls=1).run_once()
+
+        self.assertEqual(result, {"checked": 0, "swept": 1, "pulled": 1})
+        self.assertIn("localhost/cuda:12", self.podman.images)
+        self.assertTrue(ServerImage.is_present(self.server, self.image))
+
+        self.podman.images.clear()
+        ImageWarmer(max_pulls=0).run_once()
+        self.assertFalse(ServerImage.is_present(self.server, self.image))
+
+
+@override_settings(LAZY_PULL_SETTINGS={"enabled": True, "pull_timeout": 60})
+class LazyPullTests(FakeHostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.podman.lazy_images = {"localhost/cuda:12"}
+        self.podman.latency = {"pull": 2.0}
+        self.image.image_format = ImageFormat.ESTARGZ
+        self.image.prefetch_files = ["/usr/local/cuda/lib64", "/opt/conda/lib"]
+        self.image.save()
+        self.podman.calls.clear()
+
+    def tearDown(self):
+        self.podman.lazy_images = set()
+        self.podman.latency = {}
+        super().tearDown()
+
+    def test_lazy_image_starts_without_full_pull_and_prefetches(self):
+        timer = PhaseTimer()
+        with collect_phases(timer):
+            Instance.launch(self.account, self.server, self.image.id, 1)
+
+        phases = timer.summary()
+        self.assertIn("lazy_pull", phases)
+        self.assertNotIn("pull", phases)
+        self.assertLess(phases["lazy_pull"]["max_ms"], 1000)
+        prefetch = [call for call in self.podman.calls if call[:2] == ["exec", "-d"]]
+        self.assertEqual(len(prefetch), 1)
+        self.assertIn("find /usr/local/cuda/lib64 /opt/conda/lib -type f", prefetch[0][-1])
+
+    def test_oci_image_still_pulls_fully(self):
+        self.image.image_format = ImageFormat.OCI
+        self.image.save()
+        self.podman.latency = {}
+
+        timer = PhaseTimer()
+        with collect_phases(timer):
+            Instance.launch(self.account, self.server, self.image.id, 1)
+
+        self.assertIn("pull", timer.summary())
+        self.assertFalse([call for call in self.podman.calls if call[:2] == ["exec", "-d"]])
+
+
+@override_settings(WARM_POOL_SETTINGS={"enabled": True})
+class WarmPoolTests(FakeHostTestCase):
+
+    def test_launch_takes_over_warm_container_and_pool_refills(self):
+        Instance.objects.create(account=self.account, server=self.server, image=self.image, n_gpus=1, status=InstanceStatus.STOPPED)
+
+        self.assertEqual(WarmPool().run_once(), {"reconciled": 0, "retired": 0, "started": 1})
+        warm = WarmContainer.objects.get()
+        self.assertEqual(self.podman.containers[warm.container_name]["labels"]["synapse.warm"], str(self.image.id))
+        self.assertEqual(self.podman.containers[warm.container_name]["devices"][:1], ["nvidia.com/gpu=0"])
+        self.assertNotIn("nvidia.com/gpu=all", self.podman.containers[warm.container_name]["devices"])
+        staging = os.path.join(settings.PODMAN_SETTINGS["config_dir"], warm.container_name, "volumes")
+        self.assertIn(f"{staging}/1:/run/synapse-volumes/1:rslave", self.podman.containers[warm.container_name]["volumes"])
+        self.assertFalse(any(volume.startswith("/mnt/userdata") for volume in self.podman.containers[warm.container_name]["volumes"]))
+
+        runs_before = len([call for call in self.podman.calls if call[0] == "run"])
+        with self.captureOnCommitCallbacks(execute=True):
+            instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(1), self.image.id, 1))
+
+        self.assertEqual(instance.status, InstanceStatus.RUNNING)
+        self.assertEqual(instance.host_ports, warm.host_ports)
+        self.assertEqual(len([call for call in self.podman.calls if call[0] == "run"]), runs_before)
+        self.assertEqual(self.container(instance.instance_id)["id"], warm.container_id)
+        self.assertEqual(instance.gpu_indices, warm.gpu_indices)
+        server = Server.objects.get(pk=self.server.pk)
+        self.assertEqual((server.available_gpus, server.allocated_gpu_indices), (7, warm.gpu_indices))
+        self.assertEqual(server.allocated_host_ports, list(warm.host_ports.values()))
+        self.assertFalse(WarmContainer.objects.exists())
+        self.assertIn(f"mount --bind {self.ssh_server.workdir}/userdata/alice {staging}/1", self.ssh_server.host_commands)
+        self.assertIn(f"umount -l {staging}/1", self.ssh_server.host_commands)
+        self.assertFalse(os.path.exists(staging))
+
+        self.assertEqual(WarmPool().run_once()["started"], 1)
+
+    def test_launch_of_other_gpu_count_runs_own_container(self):
+        Instance.objects.create(account=self.account, server=self.server, image=self.image, n_gpus=1, status=InstanceStatus.STOPPED)
+        WarmPool().run_once()
+
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(2), self.image.id, 2))
+
+        self.assertEqual(instance.gpu_indices, [1, 2])
+        self.assertNotEqual(self.container(instance.instance_id)["id"], WarmContainer.objects.get().container_id)
+
+    def test_pool_does_not_grow_while_launches_wait(self):
+        Instance.objects.create(account=self.account, server=self.server, image=self.image, n_gpus=1, status=InstanceStatus.STOPPED)
+        Job.enqueue(JobKind.LAUNCH, self.account, payload={"image_id": self.image.id, "n_gpus": 8}, status=JobStatus.WAITING)
+
+        self.assertEqual(WarmPool().run_once()["started"], 0)
+        self.assertFalse(WarmContainer.objects.exists())
+
+    def test_failed_takeover_drops_warm_container(self):
+        Instance.objects.create(account=self.account, server=self.server, image=self.image, n_gpus=1, status=InstanceStatus.STOPPED)
+        WarmPool().run_once()
+        self.podman.failures["exec"] = (1, "Error: configure failed")
+
+        with self.assertRaises(Exception):
+            Instance.launch(self.account, Server.reserve(1), self.image.id, 1)
+
+        self.assertFalse(WarmContainer.objects.exists())
+        self.assertFalse(self.podman.containers)
+        server = Server.objects.get(pk=self.server.pk)
+        self.assertEqual((server.available_gpus, server.allocated_gpu_indices, server.allocated_host_ports), (8, [], []))
+
+    def test_claim_setup_attaches_user_volumes(self):
+        command = claim_setup_command("i-123")
+
+        self.assertIn("mount --bind /run/synapse-volumes/1 /home/ubuntu", command)
+        self.assertIn("umount -l /run/synapse-volumes/1", command)
+        self.assertTrue(command.endswith("hostname i-123"))
+
+
+class ContainerReuseTests(FakeHostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(1), self.image.id, 1))
+        self.instance.stop()
+        self.container_id = self.container(self.instance.instance_id)["id"]
+        self.podman.calls.clear()
+
+    def _restart(self, **podman_settings):
+        with override_settings(PODMAN_SETTINGS=dict(settings.PODMAN_SETTINGS, **podman_settings)):
+            self.instance.start()
+        self.instance.refresh_from_db()
+        self.assertEqual(self.instance.status, InstanceStatus.RUNNING)
+        return [call[0] for call in self.podman.calls]
+
+    def test_restart_starts_stopped_container_of_same_spec(self):
+        commands = self._restart()
+
+        self.assertIn("start", commands)
+        self.assertNotIn("run", commands)
+        self.assertEqual(self.container(self.instance.instance_id)["id"], self.container_id)
+
+    def test_restart_in_script_mode_starts_stopped_container(self):
+        commands = self._restart(launch_mode="script")
+
+        self.assertIn("start", commands)
+        self.assertNotIn("run", commands)
+
+    def test_changed_spec_recreates_container(self):
+        commands = self._restart(default_shm_size="2G")
+
+        self.assertLess(commands.index("rm"), commands.index("run"))
+        self.assertNotEqual(self.container(self.instance.instance_id)["id"], self.container_id)
+
+    def test_user_launches_next_to_own_stopped_container(self):
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(1), self.image.id, 1))
+
+        self.assertEqual(instance.server, self.server)
+        self.assertEqual(self.container(instance.instance_id)["status"], "running")
+        self.assertEqual(self.container(self.instance.instance_id)["id"], self.container_id)
+
+
+class SuspendTests(FakeHostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(2), self.image.id, 2))
+        self.instance.suspend()
+        self.podman.calls.clear()
+
+    def test_suspend_frees_gpus_and_start_restores_checkpoint(self):
+        self.instance.refresh_from_db()
+        self.server.refresh_from_db()
+        self.assertEqual(self.instance.status, InstanceStatus.SUSPENDED)
+        self.assertEqual((self.instance.reserved_gpus, self.server.available_gpus), (0, 8))
+        self.assertTrue(self.container(self.instance.instance_id)["checkpointed"])
+
+        self.instance.start()
+
+        self.instance.refresh_from_db()
+        self.assertEqual(self.instance.status, InstanceStatus.RUNNING)
+        self.assertEqual(self.instance.checkpoint, {})
+        self.assertEqual(self.container(self.instance.instance_id)["status"], "running")
+        self.assertEqual([call[:2] for call in self.podman.calls], [["container", "restore"]])
+
+    def test_stop_of_suspended_instance_removes_container(self):
+        self.instance.stop()
+
+        self.instance.refresh_from_db()
+        self.assertEqual((self.instance.status, self.instance.checkpoint), (InstanceStatus.STOPPED, {}))
+        self.assertFalse(self.podman.containers)
+
+    def test_start_cold_when_checkpointed_gpus_were_taken(self):
+        checkpoint = Instance.objects.get(pk=self.instance.pk).checkpoint
+        self.server.claim_devices(2, prefer_gpus=checkpoint["gpu_indices"])
+        self.server.reserve_gpus(2)
+
+        self.instance.start()
+
+        self.instance.refresh_from_db()
+        self.assertEqual(self.instance.status, InstanceStatus.RUNNING)
+        self.assertFalse(set(self.instance.gpu_indices) & set(checkpoint["gpu_indices"]))
+        self.assertTrue(any(call[0] == "run" for call in self.podman.calls))
+
+
+class RegistryCheckTests(FakeHostTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.registry = FakeRegistry().start()
+        set_registry_client(RegistryClient(insecure_registries=[cls.registry.address]))
+
+    @classmethod
+    def tearDownClass(cls):
+        set_registry_client(None)
+        cls.registry.stop()
+        super().tearDownClass()
+
+    def _image(self, tag: str) -> Image:
+        return Image.objects.create(name=tag, tag=tag, custom_registry_image_name=f"{self.registry.address}/synapse/images:{tag}")
+
+    def test_check_is_cached_and_records_layer_sizes(self):
+        digest = self.registry.push("synapse/images", "torch-2", [300 * 1024 * 1024, 100 * 1024 * 1024], config_size=0)
+        image = self._image("torch-2")
+        self.registry.requests.clear()
+
+        self.assertTrue(image.check_registry())
+        self.assertEqual((image.registry_digest, image.registry_size), (digest, 400 * 1024 * 1024))
+        self.assertEqual([method for method, _ in self.registry.requests], ["HEAD", "GET"])
+
+        self.assertTrue(Image.objects.get(pk=image.pk).check_registry())
+        self.assertEqual(len(self.registry.requests), 2)
+        # An unchanged digest needs no manifest download.
+        self.assertEqual(Image.refresh_registry([image], force=True), 1)
+        self.assertEqual([method for method, _ in self.registry.requests], ["HEAD", "GET", "HEAD"])
+
+        self.assertEqual(image.estimated_pull_seconds(), 4.0)
+        ServerImage.objects.create(server=self.server, image=image, digest=digest, verified_at=timezone.now())
+        self.assertEqual(image.estimated_pull_seconds(self.server), 0.0)
+
+    def test_launch_of_missing_image_fails_before_any_ssh_work(self):
+        image = self._image("missing")
+        client = APIClient()
+        client.force_authenticate(self.account)
+        execs_before = self.ssh_server.execs
+
+        response = client.post(reverse("create-instance"), {"image_id": image.id, "n_gpus": 1}, format="json")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Job.objects.exists())
+        with self.assertRaises(ImageNotFoundException):
+            Instance.launch(self.account, Server.reserve(1), image.id, 1)
+        self.assertEqual(self.ssh_server.execs, execs_before)
+        self.server.refresh_from_db()
+        self.assertEqual(self.server.available_gpus, 8)
+
+
+@override_settings(PODMAN_SETTINGS=dict(settings.PODMAN_SETTINGS, server_executors={"gpu-01": "api"}))
+class PodmanAPIExecutorTests(FakeHostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api_client = PodmanAPIClient()
+        set_podman_api_client(self.api_client)
+
+    def tearDown(self):
+        set_podman_api_client(None)
+        super().tearDown()
+
+    def test_launch_and_stop_through_api(self):
+        instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+        instance = Instance.objects.get(instance_id=instance_id)
+        self.assertEqual(instance.status, InstanceStatus.RUNNING)
+        self.assertEqual(self.container(instance_id)["status"], "running")
+        self.assertIn(["create", f"alice-{instance_id}"], self.podman.calls)
+
+        instance.stop()
+
+        self.assertEqual(self.container(instance_id)["status"], "exited")
+        self.assertEqual(Instance.objects.get(instance_id=instance_id).status, InstanceStatus.STOPPED)
+
+    def test_requests_reuse_keep_alive_connection(self):
+        execs_before = self.ssh_server.execs
+        instance_id = Instance.launch(self.account, self.server, self.image.id, 1)
+        Instance.objects.get(instance_id=instance_id).stop()
+
+        stats = self.api_client.stats()
+        # Every request shares one connection; writing the container's files on the host is the only other exec.
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertGreater(stats["requests"], stats["connections_opened"])
+        self.assertEqual(self.ssh_server.execs - execs_before, stats["connections_opened"] + 1)
+
+    def test_pull_failure_surfaces_api_error(self):
+        self.podman.failures["pull"] = (125, "Error: manifest unknown")
+
+        with self.assertRaisesMessage(Exception, "manifest unknown"):
+            Instance.launch(self.account, self.server, self.image.id, 1)
+        self.assertFalse(self.podman.containers)
+
+
+class RemoteCommandTests(FakeHostTestCase):
+
+    def test_output_round_trips_unchanged(self):
+        printed = "first\n\n  indented \n\n\nlast"
+        with get_connection_pool().connection(self.server.ip_address) as ssh:
+            result = run_command(ssh, f"printf '%s' '{printed}'; printf 'warn\\r\\n\\r\\n' >&2")
+
+        self.assertEqual((result.exit_status, result.stdout, result.stderr), (0, printed, "warn\n"))
+
+    def test_deadline_stops_long_command(self):
+        started = time.monotonic()
+        with get_connection_pool().connection(self.server.ip_address) as ssh:
+            with self.assertRaises(RemoteCommandTimeoutException):
+                run_command(ssh, "sleep 5", timeout=0.3)
+
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class OrchestratorTests(FakeHostTestCase):
+
+    def test_timeout_stops_remote_command(self):
+        ticks = os.path.join(self.ssh_server.workdir, "ticks")
+        errors = []
+
+        def _tick():
+            try:
+                with get_connection_pool().connection(self.server.ip_address) as ssh:
+                    return run_command(ssh, f"while true; do echo tick; echo tick >> {ticks}; sleep 0.05; done")
+            except Exception as e:
+                errors.append(e)
+                raise
+
+        orchestrator = Orchestrator(max_workers=2)
+        [result] = orchestrator.run_sync(orchestrator.run_many([Operation("tick", "tick", self.server.name, _tick)], timeout=0.5))
+        # Waits for the worker thread, which only returns once its channel is closed.
+        orchestrator.shutdown(wait=True)
+
+        self.assertFalse(result.ok)
+        self.assertIsInstance(result.error, asyncio.TimeoutError)
+        self.assertEqual([type(e) for e in errors], [RemoteCommandCancelledException])
+        time.sleep(0.3)
+        size = os.path.getsize(ticks)
+        time.sleep(0.3)
+        self.assertEqual(os.path.getsize(ticks), size)
+
+
+class JobQueueTests(FakeHostMixin, TransactionTestCase):
+    # Workers commit and recycle their DB connections, so no wrapping transaction.
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.account)
+
+    def test_launch_endpoint_queues_job_and_worker_runs_it(self):
+        response = self.client.post(reverse("create-instance"), {"image_id": self.image.id, "n_gpus": 1}, format="json")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["job_id"]
+        self.assertFalse(Instance.objects.filter(account=self.account).exists())
+
+        self.assertEqual(JobWorkerPool(workers=1).drain(), 1)
+
+        response = self.client.get(reverse("job-status", args=[job_id]))
+        self.assertEqual(response.data["status"], JobStatus.SUCCEEDED)
+        instance = Instance.objects.get(instance_id=response.data["instance_id"])
+        self.assertEqual(instance.status, InstanceStatus.RUNNING)
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        job = Job.enqueue(JobKind.LAUNCH, self.account, payload={"image_id": self.image.id})
+
+        claimed = Job.claim("worker-a")
+
+        self.assertEqual(claimed.job_id, job.job_id)
+        self.assertEqual((claimed.status, claimed.attempts), (JobStatus.RUNNING, 1))
+        self.assertIsNone(Job.claim("worker-b"))
+
+    def test_job_of_lost_worker_is_requeued(self):
+        job = Job.enqueue(JobKind.LAUNCH, self.account, payload={"image_id": self.image.id})
+        Job.claim("worker-a")
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+
+        self.assertEqual(Job.requeue_stale(stale_after=60), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+
+    def _lose_worker_during_launch(self, create_instance: bool) -> Job:
+        job = Job.enqueue(JobKind.LAUNCH, self.account, payload={"image_id": self.image.id, "n_gpus": 2})
+        job = Job.claim("worker-a")
+        server = Server.reserve(2)
+        gpu_indices, host_ports = Instance._claim_devices(server, 2)
+        job._hold_reservation({"server_id": server.id, "n_gpus": 2, "gpu_indices": gpu_indices, "host_ports": host_ports})
+        if create_instance:
+            Instance.launch(self.account, server, self.image.id, 2, devices=(gpu_indices, host_ports))
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        return job
+
+    def test_lost_launch_gives_back_its_reservation(self):
+        job = self._lose_worker_during_launch(create_instance=False)
+
+        self.assertEqual(Job.requeue_stale(stale_after=60), 1)
+
+        job.refresh_from_db()
+        self.server.refresh_from_db()
+        self.assertEqual((job.status, job.reservation), (JobStatus.QUEUED, {}))
+        self.assertEqual((self.server.available_gpus, self.server.allocated_gpu_indices, self.server.allocated_host_ports), (8, [], []))
+
+    def test_lost_launch_that_created_its_instance_is_not_run_again(self):
+        job = self._lose_worker_during_launch(create_instance=True)
+
+        self.assertEqual(Job.requeue_stale(stale_after=60), 0)
+
+        job.refresh_from_db()
+        self.server.refresh_from_db()
+        self.assertEqual((job.status, job.instance.account), (JobStatus.SUCCEEDED, self.account))
+        self.assertEqual((self.server.available_gpus, self.server.allocated_gpu_indices), (6, [0, 1]))
+
+    def test_launch_waits_for_capacity_and_starts_when_gpus_free_up(self):
+        self.client.post(reverse("create-instance"), {"image_id": self.image.id, "n_gpus": 8}, format="json")
+        JobWorkerPool(workers=1).drain()
+        bob = Account.objects.create_user(email="bob@example.com", username="bob", ssh_public_key="ssh-ed25519 AAAA bob")
+        bob_client = APIClient()
+        bob_client.force_authenticate(bob)
+
+        response = bob_client.post(reverse("create-instance"), {"image_id": self.image.id, "n_gpus": 4}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data["status"], response.data["position"]), (JobStatus.WAITING, 1))
+        self.assertEqual(JobWorkerPool(workers=1).drain(), 0)
+
+        Instance.objects.get(account=self.account).stop()
+        self.assertEqual(JobWorkerPool(workers=1).drain(), 1)
+
+        job = Job.objects.get(job_id=response.data["job_id"])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertTrue(Instance.objects.filter(account=bob, status=InstanceStatus.RUNNING).exists())
+
+    def test_start_endpoint_does_not_queue_other_users_instance(self):
+        instance = Instance.objects.get(instance_id=Instance.launch(self.account, Server.reserve(1), self.image.id, 1))
+        instance.stop()
+        bob = Account.objects.create_user(email="bob@example.com", username="bob")
+        bob_client = APIClient()
+        bob_client.force_authenticate(bob)
+
+        response = bob_client.post(reverse("start-instance", args=[instance.id]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Job.objects.filter(kind=JobKind.START).exists())
+
+    def test_waitlist_serves_light_users_before_heavy_backlogs(self):
+        bob = Account.objects.create_user(email="bob@example.com", username="bob")
+        heavy = [Job.enqueue(JobKind.LAUNCH, self.account, payload={"n_gpus": 2}, status=JobStatus.WAITING) for _ in range(2)]
+        light = Job.enqueue(JobKind.LAUNCH, bob, payload={"n_gpus": 2}, status=JobStatus.WAITING)
+
+        self.assertEqual([job.job_id for job in Job.waitlist()], [heavy[0].job_id, light.job_id, heavy[1].job_id])
+
+    def test_dispatch_places_waiting_launches_like_reserve(self):
+        Server.objects.filter(pk=self.server.pk).update(available_gpus=2)
+        bob = Account.objects.create_user(email="bob@example.com", username="bob")
+        first = Job.enqueue(JobKind.LAUNCH, self.account, payload={"image_id": self.image.id, "n_gpus": 2}, status=JobStatus.WAITING)
+        second = Job.enqueue(JobKind.LAUNCH, bob, payload={"image_id": self.image.id, "n_gpus": 2}, status=JobStatus.WAITING)
+
+        self.assertEqual(Job.dispatch_waiting(), 1)
+
+        # The first placement takes the only free GPUs, so the second job keeps waiting.
+        self.assertEqual(sorted(Job.objects.filter(pk__in=[first.pk, second.pk]).values_list("status", flat=True)), [JobStatus.QUEUED, JobStatus.WAITING])
+
+    def test_starved_launch_is_not_passed_by_smaller_ones(self):
+        Server.objects.filter(pk=self.server.pk).update(available_gpus=2)
+        bob = Account.objects.create_user(email="bob@example.com", username="bob")
+        small = Job.enqueue(JobKind.LAUNCH, bob, payload={"n_gpus": 1}, status=JobStatus.WAITING)
+        large = Job.enqueue(JobKind.LAUNCH, self.account, payload={"n_gpus": 4}, status=JobStatus.WAITING)
+        Job.objects.filter(pk=large.pk).update(created_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual([job.job_id for job in Job.waitlist()], [large.job_id, small.job_id])
+        self.assertEqual(Job.dispatch_waiting(), 0)
+
+        Job.objects.filter(pk=large.pk).update(created_at=timezone.now())
+        self.assertEqual(Job.dispatch_waiting(), 1)
+        self.assertEqual(Job.objects.get(pk=small.pk).status, JobStatus.QUEUED)
+
+
+class BulkLaunchTests(FakeHostMixin, TransactionTestCase):
+    # Launches run on orchestrator threads with their own DB connections.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.second_podman = FakePodmanHost()
+        cls.second_ssh_server = FakeSSHServer(cls.second_podman, bind_address="127.0.0.2", port=cls.ssh_server.port).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.second_ssh_server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.second_server = Server.objects.create(
+            name="gpu-02", ip_address=self.second_ssh_server.bind_address, total_gpus=8, available_gpus=8,
+        )
+        self.bob = Account.objects.create_user(email="bob@example.com", username="bob", ssh_public_key="ssh-ed25519 AAAA bob")
+        self.carol = Account.objects.create_user(email="carol@example.com", username="carol", ssh_public_key="ssh-ed25519 AAAA carol")
+
+    def test_bulk_launch_reports_per_item_results(self):
+        specs = [
+            {"account": account, "image_id": self.image.id, "n_gpus": n_gpus}
+            for account, n_gpus in ((self.account, 8), (self.bob, 8), (self.carol, 1))
+        ]
+
+        results = Instance.bulk_launch(specs)
+
+        self.assertEqual([result["ok"] for result in results], [True, True, False])
+        self.assertEqual({results[0]["server"], results[1]["server"]}, {"gpu-01", "gpu-02"})
+        self.assertEqual(results[2]["error"], "No available server")
+        self.assertEqual(Instance.objects.filter(status=InstanceStatus.RUNNING).count(), 2)
+
+    def test_bulk_launch_gives_one_users_instances_their_own_containers(self):
+        results = Instance.bulk_launch([{"account": self.account, "image_id": self.image.id, "n_gpus": 1}] * 2)
+
+        self.assertEqual([(result["ok"], result["server"]) for result in results], [(True, "gpu-01")] * 2)
+        for result in results:
+            self.assertEqual(self.container(result["instance_id"])["status"], "running")
+        self.assertEqual(Instance.objects.filter(status=InstanceStatus.RUNNING).count(), 2)
+
+    def test_bulk_launch_endpoint_records_invalid_items(self):
+        admin = Account.objects.create_user(email="admin@example.com", username="admin")
+        admin.is_superuser = True
+        admin.save()
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post(reverse("bulk-launch-instances"), {"instances": [
+            {"account": "alice", "image_id": self.image.id},
+            {"account": "nobody@example.com", "image_id": self.image.id},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([item["index"] for item in response.data["invalid"]], [1])
+
+        JobWorkerPool(workers=1).drain()
+
+        job = Job.objects.get(job_id=response.data["job_id"])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.error_code, "partial_failure")
+        self.assertEqual((job.result["launched"], job.result["failed"]), (1, 1))
+
+    def test_bulk_stop_streams_progress_for_matching_instances(self):
+        Instance.bulk_launch([
+            {"account": account, "image_id": self.image.id, "n_gpus": 8} for account in (self.bob, self.carol)
+        ])
+        admin = Account.objects.create_user(email="admin@example.com", username="admin")
+        admin.is_superuser = True
+        admin.save()
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post(reverse("bulk-instance-action"), {"action": "stop", "max_concurrency": 1}, format="json")
+        self.assertEqual(response.status_code, 200)
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual([event["event"] for event in events], ["started", "result", "result", "done"])
+        self.assertEqual({event["server"] for event in events[1:3]}, {"gpu-01", "gpu-02"})
+        self.assertEqual(events[-1]["succeeded"], 2)
+        self.assertFalse(Instance.objects.filter(status=InstanceStatus.RUNNING).exists())
+
+    async def test_bulk_stop_streams_progress_under_asgi(self):
+        await sync_to_async(Instance.bulk_launch)([{"account": self.bob, "image_id": self.image.id, "n_gpus": 8}])
+        admin = await sync_to_async(Account.objects.create_user)(email="admin@example.com", username="admin")
+        admin.is_superuser = True
+        await admin.asave()
+        await self.async_client.aforce_login(admin)
+
+        response = await self.async_client.post(reverse("bulk-instance-action"), {"action": "stop"}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        with warnings.catch_warnings():
+            # Django warns when it has to read a synchronous stream to its end first.
+            warnings.simplefilter("error")
+            events = [json.loads(chunk) async for chunk in response.streaming_content]
+        self.assertEqual([event["event"] for event in events], ["started", "result", "done"])
+        self.assertEqual(events[-1]["succeeded"], 1)
+
+
+class ImageDistributionTests(FakeHostMixin, TransactionTestCase):
+    # Copies run on orchestrator threads with their own DB connections.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.peer_servers = [
+            FakeSSHServer(FakePodmanHost(), bind_address=f"127.0.0.{i}", port=cls.ssh_server.port).start() for i in (2, 3, 4)
+        ]
+        hosts = {"127.0.0.1": cls.podman, **{peer.bind_address: peer.podman for peer in cls.peer_servers}}
+        for host in hosts.values():
+            host.peers = hosts
+
+    @classmethod
+    def tearDownClass(cls):
+        for peer in cls.peer_servers:
+            peer.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        for i, peer in enumerate(self.peer_servers, start=2):
+            peer.podman.images.clear()
+            peer.podman.containers.clear()
+            peer.podman.calls.clear()
+            Server.objects.create(name=f"gpu-0{i}", ip_address=peer.bind_address, total_gpus=8, available_gpus=8)
+
+    def test_rollout_pulls_once_and_fans_out_over_peers(self):
+        report = distribute_image(self.image, fanout=1)
+
+        self.assertEqual([stage["kind"] for stage in report["rounds"]], ["seed", "peer", "peer"])
+        self.assertEqual((report["registry_pulls"], report["failed"]), (1, []))
+        for peer in self.peer_servers:
+            self.assertIn("localhost/cuda:12", peer.podman.images)
+            self.assertFalse([call for call in peer.podman.calls if call[0] == "pull"])
+        self.assertEqual(len(ServerImage.locality(self.image)), 4)
+
+    @override_settings(DISTRIBUTION_SETTINGS={"mode": "peer"})
+    def test_launch_copies_image_from_peer(self):
+        pull_server_image(self.server, self.image)
+        target = Server.objects.get(name="gpu-02")
+
+        Instance.launch(self.account, target, self.image.id, 1)
+
+        calls = self.peer_servers[0].podman.calls
+        self.assertIn(["image", "scp", "root@127.0.0.1::localhost/cuda:12"], calls)
+        self.assertNotIn("pull", [call[0] for call in calls])
+        self.assertTrue(ServerImage.is_present(target, self.image))
+
+    @override_settings(DISTRIBUTION_SETTINGS={"mode": "peer"})
+    def test_script_launch_copies_image_from_peer(self):
+        pull_server_image(self.server, self.image)
+        target = Server.objects.get(name="gpu-02")
+
+        with override_settings(PODMAN_SETTINGS=dict(settings.PODMAN_SETTINGS, launch_mode="script")):
+            Instance.launch(self.account, target, self.image.id, 1)
+
+        calls = self.peer_servers[0].podman.calls
+        self.assertIn(["image", "scp", "root@127.0.0.1::localhost/cuda:12"], calls)
+        self.assertNotIn("pull", [call[0] for call in calls])
+
+    def test_peer_copy_reads_root_storage_of_source(self):
+        self.assertEqual(peer_copy_command(self.server, self.image), "sudo podman image scp root@127.0.0.1::localhost/cuda:12")
+
+
+class InstanceEventTests(FakeHostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _subscribe(self, account):
+        async def _subscribe():
+            return get_event_broker().subscribe(account.id, all_accounts=account.is_superuser)
+        subscription = self.loop.run_until_complete(_subscribe())
+        self.addCleanup(get_event_broker().unsubscribe, subscription)
+        return subscription
+
+    def test_status_transitions_reach_owner_subscription(self):
+        subscription = self._subscribe(self.account)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            instance = Instance.create(self.account, self.server, self.image)
+            instance.status = InstanceStatus.RUNNING
+            instance.save()
+            instance.save()
+
+        created = self.loop.run_until_complete(subscription.get(timeout=1))
+        running = self.loop.run_until_complete(subscription.get(timeout=1))
+        self.assertEqual((created["status"], created["previous_status"]), (InstanceStatus.PENDING, None))
+        self.assertEqual((running["status"], running["previous_status"]), (InstanceStatus.RUNNING, InstanceStatus.PENDING))
+        self.assertEqual(running["instance_id"], instance.instance_id)
+        # Saving without a status change publishes nothing.
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_stream_sends_snapshot_first(self):
+        await self.async_client.aforce_login(self.account)
+
+        response = await self.async_client.get(reverse("instance-events"))
+
+        self.assertEqual(response.status_code, 200)
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        self.assertTrue((await anext(chunks)).startswith(b"event: snapshot\ndata: []"))
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.account)
+
+        self.assertEqual(self.client.get(reverse("instance-events")).status_code, 204)
+
+    def test_other_accounts_do_not_receive_events(self):
+        other = Account.objects.create_user(email="bob@example.com", username="bob", ssh_public_key="ssh-ed25519 AAAA bob")
+        subscription = self._subscribe(other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Instance.create(self.account, self.server, self.image)
+
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertTrue(subscription.queue.empty())
+
+
+class SchedulerTests(TestCase):
+
+    def setUp(self):
+        self.small = Server.objects.create(name="small", ip_address="10.0.0.1", total_gpus=8, available_gpus=2)
+        self.large = Server.objects.create(name="large", ip_address="10.0.0.2", total_gpus=8, available_gpus=6)
+
+    def test_best_fit_packs_and_worst_fit_spreads(self):
+        self.assertEqual(Server.reserve(2, policy="best_fit"), self.small)
+        self.assertEqual(Server.reserve(1, policy="worst_fit"), self.large)
+        self.assertEqual(Server.reserve(6), None)
+
+        self.small.refresh_from_db()
+        self.large.refresh_from_db()
+        self.assertEqual((self.small.available_gpus, self.large.available_gpus), (0, 5))
+
+    def test_cached_image_outweighs_tighter_fit(self):
+        image = Image.objects.create(
+            name="cuda", tag="cuda-12", custom_registry_image_name="localhost/cuda:12", cuda_version="12.1", is_available=True,
+        )
+        sibling = Image.objects.create(
+            name="torch", tag="torch-2", custom_registry_image_name="localhost/torch:2", cuda_version="12.1", is_available=True,
+        )
+        ServerImage.objects.create(server=self.large, image=image, digest="sha256:abc", verified_at=timezone.now())
+        spare = Server.objects.create(name="spare", ip_address="10.0.0.3", total_gpus=8, available_gpus=8)
+        ServerImage.objects.create(server=spare, image=sibling, digest="sha256:def", verified_at=timezone.now())
+
+        self.assertEqual(ServerImage.locality(image), {self.large.id: 1.0, spare.id: 0.5})
+        self.assertEqual(Server.get_available_server(1, image=image), self.large)
+        with override_settings(SCHEDULER_SETTINGS={"locality_weight": 0}):
+            self.assertEqual(Server.get_available_server(1, image=image), self.small)
+
+        index = FleetIndex(max_staleness=60)
+        index.reload()
+        set_fleet_index(index)
+        try:
+            self.assertEqual(Server.reserve(1, image=image), self.large)
+        finally:
+            set_fleet_index(None)
+
+    @override_settings(WARM_POOL_SETTINGS={"enabled": True})
+    def test_matching_warm_container_outweighs_cached_image(self):
+        image = Image.objects.create(name="cuda", tag="cuda-12", custom_registry_image_name="localhost/cuda:12", is_available=True)
+        ServerImage.objects.create(server=self.small, image=image, digest="sha256:abc", verified_at=timezone.now())
+        WarmContainer.objects.create(server=self.large, image=image, container_name="synapse-warm-1", n_gpus=1, gpu_indices=[0])
+
+        self.assertEqual(Server.reserve(1, image=image), self.large)
+        # A launch of another GPU count can't take the warm container over.
+        self.assertEqual(Server.get_available_server(2, image=image), self.small)
+
+    def test_release_never_exceeds_total(self):
+        self.large.release_gpus(5)
+
+        self.large.refresh_from_db()
+        self.assertEqual(self.large.available_gpus, 8)
+
+    def test_fleet_index_places_and_follows_reservations(self):
+        index = FleetIndex(max_staleness=60)
+        index.reload()
+        set_fleet_index(index)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(Server.reserve(2), self.small)
+            self.assertEqual(index.pick(1), self.large.id)
+            self.assertEqual(index.pick(1, exclude=[self.large.id]), None)
+            self.assertEqual(index.stats()["events_applied"], 1)
+        finally:
+            set_fleet_index(None)
+
+    def test_stale_fleet_index_falls_back_to_database(self):
+        index = FleetIndex(max_staleness=60)
+        set_fleet_index(index)
+        try:
+            self.assertEqual(Server.reserve(6), self.large)
+            self.assertEqual(index.stats()["fallbacks"], 1)
+            self.assertIsNone(index.stats()["refresh_lag_seconds"])
+        finally:
+            set_fleet_index(None)
+
+
+class PlacementSimulationTests(TestCase):
+
+    def test_replay_queues_launches_until_gpus_free_up(self):
+        trace = [
+            {"t": 0, "op": "launch", "key": "a", "n_gpus": 4},
+            {"t": 10, "op": "launch", "key": "b", "n_gpus": 4},
+            {"t": 100, "op": "stop", "key": "a"},
+            {"t": 200, "op": "stop", "key": "b"},
+        ]
+
+        report = replay_trace(trace, [4])
+
+        self.assertEqual((report["placed"], report["queued"], report["never_placed"]), (2, 1, 0))
+        self.assertEqual(report["queue_wait_seconds"]["max"], 90)
+        self.assertEqual(report["makespan_seconds"], 290)
+        self.assertEqual(Server.objects.filter(name__startswith="sim-", available_gpus=4).count(), 1)
+
+    def test_exported_trace_replays_recorded_history(self):
+        account = Account.objects.create_user(email="dave@example.com", username="dave")
+        server = Server.objects.create(name="gpu-01", ip_address="10.0.0.1", total_gpus=8, available_gpus=8)
+        image = Image.objects.create(name="cuda", tag="cuda-12", custom_registry_image_name="localhost/cuda:12")
+        Instance.objects.create(account=account, server=server, image=image, n_gpus=2, status=InstanceStatus.STOPPED)
+        Instance.objects.create(account=account, server=server, image=image, n_gpus=1, status=InstanceStatus.RUNNING)
+
+        trace = export_instance_trace()
+
+        self.assertEqual([event["op"] for event in trace].count("launch"), 2)
+        self.assertEqual([event["op"] for event in trace].count("stop"), 1)
+        self.assertEqual(replay_trace(trace, [8, 8], policy="worst_fit")["placed"], 2)
+
+
+class LaunchBenchmarkTests(TestCase):
+
+    def test_benchmark_reports_every_launch_phase(self):
+        report = run_launch_benchmark(iterations=2)
+
+        self.assertEqual(report["failures"], [])
+        for phase in ("connect", "inspect", "pull", "run", "db_save", "launch"):
+            self.assertIn(phase, report["phases"])
+        self.assertEqual(report["phases"]["launch"]["count"], 2)
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 11))
+
+        self.assertEqual([percentile(values, pct) for pct in (0, 10, 50, 95, 100)], [1, 1, 5, 10, 10])
+        self.assertEqual(percentile([1, 2], 50), 1)
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile([], 50), 0.0)
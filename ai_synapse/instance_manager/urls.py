@@ -3,20 +3,36 @@ from .views import (
     LaunchInstanceView, 
     StopInstanceView, 
     StartInstanceView, 
+    SuspendInstanceView,
     ListInstancesView, 
+    InstanceEventsView,
+    BulkLaunchInstancesView,
+    BulkInstanceActionView,
+    LaunchWaitlistView,
     ListImagesView,
     CreateImageView,
     ListServersView,
     CreateServerView,
+    SSHPoolStatsView,
+    FleetIndexStatsView,
+    JobStatusView,
 )
 
 urlpatterns = [
     path('api/instance/launch/', LaunchInstanceView.as_view(), name='create-instance'),
+    path('api/instance/bulk-launch/', BulkLaunchInstancesView.as_view(), name='bulk-launch-instances'),
+    path('api/instance/bulk-action/', BulkInstanceActionView.as_view(), name='bulk-instance-action'),
+    path('api/instance/waitlist/', LaunchWaitlistView.as_view(), name='launch-waitlist'),
     path('api/instance/<int:instance_id>/stop/', StopInstanceView.as_view(), name='stop-instance'),
     path('api/instance/<int:instance_id>/start/', StartInstanceView.as_view(), name='start-instance'),
+    path('api/instance/<int:instance_id>/suspend/', SuspendInstanceView.as_view(), name='suspend-instance'),
     path('api/instance/list/', ListInstancesView.as_view(), name='list-instance'),
+    path('api/instance/events/', InstanceEventsView.as_view(), name='instance-events'),
     path('api/image/create/', CreateImageView.as_view(), name='create-image'),
     path('api/image/list/', ListImagesView.as_view(), name='list-image'),
     path('api/server/create/', CreateServerView.as_view(), name='create-server'),
     path('api/server/list/', ListServersView.as_view(), name='list-server'),
+    path('api/server/ssh-pool/', SSHPoolStatsView.as_view(), name='ssh-pool-stats'),
+    path('api/server/fleet-index/', FleetIndexStatsView.as_view(), name='fleet-index-stats'),
+    path('api/job/<str:job_id>/', JobStatusView.as_view(), name='job-status'),
 ]
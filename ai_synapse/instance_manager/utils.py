@@ -0,0 +1,78 @@
+import math
+import time
+import threading
+import contextlib
+
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Sequence
+
+
+_local = threading.local()
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty sequence)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class PhaseTimer:
+    """Collects wall-clock samples for named phases of an operation."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.samples[name].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-phase count, total and latency distribution in milliseconds."""
+        report = {}
+        for name, values in self.samples.items():
+            report[name] = {
+                "count": len(values),
+                "total_ms": round(sum(values) * 1000, 3),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+        return report
+
+
+@contextlib.contextmanager
+def collect_phases(timer: PhaseTimer) -> Iterator[PhaseTimer]:
+    """Routes timed_phase()/record_phase() calls on this thread into ``timer``."""
+    previous = getattr(_local, "timer", None)
+    _local.timer = timer
+    try:
+        yield timer
+    finally:
+        _local.timer = previous
+
+
+def current_phase_timer() -> Optional[PhaseTimer]:
+    return getattr(_local, "timer", None)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timer = current_phase_timer()
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+@contextlib.contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """Times the enclosed block as phase ``name`` when a PhaseTimer is collecting."""
+    timer = current_phase_timer()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - started)
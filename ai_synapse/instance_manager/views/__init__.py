@@ -1,3 +1,4 @@
-from .instance import ListInstancesView, LaunchInstanceView, StopInstanceView, StartInstanceView
+from .instance import ListInstancesView, LaunchInstanceView, StopInstanceView, StartInstanceView, SuspendInstanceView, InstanceEventsView, BulkLaunchInstancesView, BulkInstanceActionView, LaunchWaitlistView
 from .image import ListImagesView, CreateImageView
-from .server import ListServersView, CreateServerView
\ No newline at end of file
+from .server import ListServersView, CreateServerView, SSHPoolStatsView, FleetIndexStatsView
+from .job import JobStatusView
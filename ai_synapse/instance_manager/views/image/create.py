@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from instance_manager.models import Image
+from instance_manager.models.image import ImageFormat
 from user_manager.permissions import IsAuthenticatedUser
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,10 @@ class CreateImageView(APIView):
             cuda_version = data.get("cuda_version", "")
             cudnn_version = data.get("cudnn_version", "")
             is_available = data.get("is_available", False)
+            image_format = data.get("image_format", ImageFormat.OCI)
+            prefetch_files = data.get("prefetch_files", [])
+            if image_format not in ImageFormat.values:
+                return Response({"error": f"Unknown image_format '{image_format}'"}, status=status.HTTP_400_BAD_REQUEST)
             Image.create(
                 name=name,
                 tag=tag,
@@ -31,7 +36,9 @@ class CreateImageView(APIView):
                 os_version=os_version,
                 cuda_version=cuda_version,
                 cudnn_version=cudnn_version,
-                is_available=is_available
+                is_available=is_available,
+                image_format=image_format,
+                prefetch_files=prefetch_files,
             )
             return Response(status=status.HTTP_201_CREATED)
         except Exception:
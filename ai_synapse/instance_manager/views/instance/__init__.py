@@ -1,4 +1,9 @@
 from .list import ListInstancesView
 from .launch import LaunchInstanceView
 from .stop import StopInstanceView
-from .start import StartInstanceView
\ No newline at end of file
+from .start import StartInstanceView
+from .suspend import SuspendInstanceView
+from .events import InstanceEventsView
+from .bulk_launch import BulkLaunchInstancesView
+from .bulk_action import BulkInstanceActionView
+from .waitlist import LaunchWaitlistView
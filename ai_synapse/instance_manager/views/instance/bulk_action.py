@@ -0,0 +1,157 @@
+import json
+import queue
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.models import Instance
+from instance_manager.models.instance import InstanceStatus
+from instance_manager.exceptions import InstanceAlreadyRunningException, InstanceAlreadyStoppedException
+from user_manager.permissions import IsAdminUser
+
+logger = logging.getLogger(__name__)
+
+# Instances an action applies to when the request does not filter on status.
+DEFAULT_STATUS = {"start": InstanceStatus.STOPPED, "stop": InstanceStatus.RUNNING}
+
+_DONE = object()
+
+
+def _line(event: dict) -> str:
+    return json.dumps(event, cls=DjangoJSONEncoder) + "\n"
+
+
+async def _iterate_async(lines):
+    # Under ASGI a synchronous iterator is read to its end before anything is
+    # sent, so each line is pulled off a worker thread as it becomes ready.
+    next_line = sync_to_async(next, thread_sensitive=False)
+    while True:
+        line = await next_line(lines, _DONE)
+        if line is _DONE:
+            return
+        yield line
+
+
+class BulkInstanceActionView(APIView):
+    """
+    Starts or stops every instance matching a filter, in parallel across servers.
+    Body: {"action": "start" | "stop", "server": "<name>", "image": "<name or id>",
+           "status": "running", "account": "<email or username>", "max_concurrency": 16}.
+    All filters are optional. Progress is streamed as newline-delimited JSON:
+    a "started" line, one "result" line per instance as it finishes and a
+    final "done" summary.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        try:
+            bulk_settings = getattr(settings, 'BULK_OPERATION_SETTINGS', {})
+            action = request.data.get("action")
+            if action not in DEFAULT_STATUS:
+                return Response({"error": "'action' must be 'start' or 'stop'"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                max_concurrency = int(request.data.get("max_concurrency") or bulk_settings.get('max_concurrency', 16))
+            except (TypeError, ValueError):
+                return Response({"error": "'max_concurrency' must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            max_concurrency = max(1, min(max_concurrency, bulk_settings.get('max_concurrency_limit', 64)))
+
+            instances = self._filter_instances(request.data, action)
+            if instances is None:
+                return Response({"error": f"'status' must be one of {list(InstanceStatus.values)}"}, status=status.HTTP_400_BAD_REQUEST)
+            instances = list(instances.select_related("account", "server", "image"))
+
+            logger.info(
+                f"Bulk {action} of {len(instances)} instances by {request.user.username} "
+                f"(max concurrency {max_concurrency})"
+            )
+            lines = self._stream(instances, action, max_concurrency, request.user.username)
+            if isinstance(request._request, ASGIRequest):
+                lines = _iterate_async(lines)
+            response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"
+            return response
+        except Exception as e:
+            logger.exception(f"Unexpected error while starting bulk instance action: {str(e)}")
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    def _filter_instances(data, action):
+        instance_status = data.get("status") or DEFAULT_STATUS[action]
+        if instance_status not in InstanceStatus.values:
+            return None
+        instances = Instance.objects.filter(status=instance_status)
+        if data.get("server"):
+            instances = instances.filter(server__name=data["server"])
+        if data.get("image"):
+            image = str(data["image"])
+            image_filter = Q(image__name=image)
+            if image.isdigit():
+                image_filter |= Q(image_id=int(image))
+            instances = instances.filter(image_filter)
+        if data.get("account"):
+            instances = instances.filter(Q(account__email=data["account"]) | Q(account__username=data["account"]))
+        return instances.order_by("server_id", "id")
+
+    @staticmethod
+    def _stream(instances, action, max_concurrency, username):
+        by_key = {instance.instance_id: instance for instance in instances}
+        results: queue.Queue = queue.Queue()
+        counts = {"succeeded": 0, "skipped": 0, "failed": 0}
+
+        def _run():
+            try:
+                Instance.run_many(instances, action, on_result=results.put, max_concurrency=max_concurrency)
+            except Exception as e:
+                logger.exception(f"Bulk {action} by {username} failed: {e}")
+                results.put(e)
+            finally:
+                results.put(_DONE)
+
+        yield _line({
+            "event": "started",
+            "action": action,
+            "total": len(instances),
+            "max_concurrency": max_concurrency,
+            "instances": [instance.instance_id for instance in instances],
+        })
+        threading.Thread(target=_run, name=f"bulk-{action}", daemon=True).start()
+
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                yield _line({"event": "error", "error": str(item)})
+                continue
+            if item.ok:
+                outcome = "succeeded"
+            elif isinstance(item.error, (InstanceAlreadyRunningException, InstanceAlreadyStoppedException)):
+                outcome = "skipped"
+            else:
+                outcome = "failed"
+            counts[outcome] += 1
+            instance = by_key.get(item.key)
+            event = item.serialize()
+            event.update({
+                "event": "result",
+                "instance_id": item.key,
+                "server": instance.server.name if instance else None,
+                "account": instance.account.username if instance else None,
+                "outcome": outcome,
+                "completed": sum(counts.values()),
+                "total": len(instances),
+            })
+            yield _line(event)
+
+        logger.info(f"Bulk {action} by {username} finished: {counts}")
+        yield _line({"event": "done", "action": action, "total": len(instances), **counts})
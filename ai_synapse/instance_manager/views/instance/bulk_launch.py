@@ -0,0 +1,76 @@
+import logging
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.models import Image, Job
+from instance_manager.models.job import JobKind
+from user_manager.models import Account
+from user_manager.permissions import IsAdminUser
+
+logger = logging.getLogger(__name__)
+
+
+class BulkLaunchInstancesView(APIView):
+    """
+    Launches many instances in one request, e.g. to onboard a course or team.
+    Body: {"instances": [{"account": "<email or username>", "image_id": 1, "n_gpus": 1}, ...]}.
+    Items are validated individually; invalid ones are reported as failed
+    items of the job instead of rejecting the whole batch.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        try:
+            specs = request.data.get("instances")
+            max_items = getattr(settings, 'BULK_OPERATION_SETTINGS', {}).get('max_launch_items', 200)
+            if not isinstance(specs, list) or not specs:
+                return Response({"error": "'instances' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+            if len(specs) > max_items:
+                return Response({"error": f"At most {max_items} instances per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+            identifiers = {str(spec.get("account", "")) for spec in specs if isinstance(spec, dict)}
+            accounts = {}
+            for account in Account.objects.filter(Q(email__in=identifiers) | Q(username__in=identifiers)):
+                accounts[account.email] = account
+                accounts[account.username] = account
+            image_ids = set(Image.objects.filter(is_available=True).values_list("id", flat=True))
+
+            items = []
+            for spec in specs:
+                spec = spec if isinstance(spec, dict) else {}
+                identifier = str(spec.get("account", ""))
+                try:
+                    image_id = int(spec.get("image_id"))
+                    n_gpus = int(spec.get("n_gpus") or 1)
+                except (TypeError, ValueError):
+                    image_id, n_gpus = None, 1
+                item = {"account": identifier, "image_id": image_id, "n_gpus": n_gpus}
+                account = accounts.get(identifier)
+                if account is None:
+                    item["error"] = f"Unknown account '{identifier}'"
+                elif item["image_id"] not in image_ids:
+                    item["error"] = f"Image '{item['image_id']}' not found or not available"
+                else:
+                    item["account_id"] = account.id
+                items.append(item)
+
+            job = Job.enqueue(JobKind.BULK_LAUNCH, request.user, payload={"items": items}, max_attempts=1)
+            invalid = sum(1 for item in items if "error" in item)
+            logger.info(f"Bulk launch job {job.job_id} queued by {request.user.username} for {len(items)} instances ({invalid} invalid)")
+            return Response(
+                {
+                    "job_id": job.job_id,
+                    "status": job.status,
+                    "requested": len(items),
+                    "invalid": [{"index": i, "error": item["error"]} for i, item in enumerate(items) if "error" in item],
+                    "message": f"Bulk launch of {len(items)} instances queued (job {job.job_id}).",
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+        except Exception as e:
+            logger.exception(f"Unexpected error while queueing bulk launch: {str(e)}")
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,63 @@
+import json
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+
+from instance_manager.models import Instance
+from instance_manager.events import RESYNC, get_event_broker
+
+logger = logging.getLogger(__name__)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class InstanceEventsView(View):
+    """
+    Server-sent events stream of the account's instance status changes.
+    Sends a `snapshot` of the instance list first, then one `status` event
+    per transition. The backend is served from asgi.py (see docker-compose.yml);
+    under WSGI, e.g. `runserver`, the stream would be read to its (never
+    reached) end before anything is sent, holding a worker forever, so
+    clients get a 204 there and keep polling.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # EventSource treats 204 as "don't reconnect".
+            return HttpResponse(status=204)
+        user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+        if user is None:
+            return HttpResponse(status=403)
+
+        subscription = get_event_broker().subscribe(user.id, all_accounts=user.is_superuser)
+        response = StreamingHttpResponse(self._stream(user, subscription), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def _stream(self, user, subscription):
+        heartbeat_interval = getattr(settings, 'INSTANCE_EVENTS_SETTINGS', {}).get('heartbeat_interval', 15)
+        try:
+            yield "retry: 3000\n\n"
+            yield _sse("snapshot", await sync_to_async(Instance.list_all)(user))
+            while True:
+                try:
+                    event = await subscription.get(timeout=heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    yield _sse("snapshot", await sync_to_async(Instance.list_all)(user))
+                else:
+                    yield _sse("status", event)
+        finally:
+            get_event_broker().unsubscribe(subscription)
+            logger.debug(f"Instance event stream closed for user {user.username}")
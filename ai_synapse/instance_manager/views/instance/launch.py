@@ -4,7 +4,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from instance_manager.models import Server, Instance
+from django.conf import settings
+
+from instance_manager.models import Image, Server, Job
+from instance_manager.models.job import JobKind, JobStatus
 from user_manager.permissions import IsAuthenticatedUser
 
 logger = logging.getLogger(__name__)
@@ -22,17 +25,65 @@ class LaunchInstanceView(APIView):
             if image_id is None:
                 logger.error(f"Image not provided for user {email}")
                 return Response({"error": "Image not provided"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                n_gpus = int(n_gpus)
+            except (TypeError, ValueError):
+                return Response({"error": "n_gpus must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            if n_gpus < 1:
+                return Response({"error": "n_gpus must be at least 1"}, status=status.HTTP_400_BAD_REQUEST)
             logger.info(f"User {account.username} requested an instance with image '{image_id}' and {n_gpus} GPUs.")
 
-            available_server = Server.get_available_server()
+            if not Server.objects.filter(is_active=True, total_gpus__gte=n_gpus).exists():
+                return Response({"error": f"No server has {n_gpus} GPUs"}, status=status.HTTP_400_BAD_REQUEST)
+
+            image = Image.objects.filter(id=image_id).first() if str(image_id).isdigit() else None
+            if image is None:
+                return Response({"error": f"Image {image_id} does not exist"}, status=status.HTTP_404_NOT_FOUND)
+            # A cached registry answer, so missing images are refused before any job or SSH work.
+            if image.check_registry() is False:
+                logger.error(f"User {email} requested image '{image.custom_registry_image_name}' which is not in the registry")
+                return Response(
+                    {"error": f"Image '{image.name}' is not available in the registry"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
 
-            if not available_server:
-                logger.error(f"No available servers for user {email} to start instance")
-                return Response(status=status.HTTP_409_CONFLICT)
+            # When no server has the GPUs free the launch waits for capacity instead
+            # of failing; the worker reserves them when the job runs.
+            server = Server.get_available_server(n_gpus, image=image)
+            if not server:
+                max_waiting = getattr(settings, 'WAITLIST_SETTINGS', {}).get('max_waiting_per_account', 3)
+                waiting = Job.objects.filter(account=account, kind=JobKind.LAUNCH, status=JobStatus.WAITING).count()
+                if waiting >= max_waiting:
+                    logger.error(f"User {email} already has {waiting} launches waiting for capacity")
+                    return Response(
+                        {"error": f"You already have {waiting} launches waiting for free GPUs"},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                job = Job.enqueue(JobKind.LAUNCH, account, payload={"image_id": image_id, "n_gpus": n_gpus}, status=JobStatus.WAITING)
+                entry = job.waitlist_entry() or {}
+                logger.info(f"Launch job {job.job_id} for user {email} is waiting for capacity at position {entry.get('position')}")
+                return Response(
+                    {
+                        "job_id": job.job_id,
+                        "status": job.status,
+                        "position": entry.get("position"),
+                        "estimated_wait_seconds": entry.get("estimated_wait_seconds"),
+                        "message": f"No free GPUs right now, launch is waiting for capacity (job {job.job_id}).",
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
 
-            instance_id: str = Instance.launch(account, available_server, image_id, n_gpus)
-            logger.info(f"Instance {instance_id} launched successfully for user {email}")
-            return Response(status=status.HTTP_201_CREATED)
+            job = Job.enqueue(JobKind.LAUNCH, account, payload={"image_id": image_id, "n_gpus": n_gpus})
+            logger.info(f"Launch job {job.job_id} queued for user {email}")
+            return Response(
+                {
+                    "job_id": job.job_id,
+                    "status": job.status,
+                    "estimated_pull_seconds": image.estimated_pull_seconds(server),
+                    "message": f"Instance launch queued (job {job.job_id}).",
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
         except Exception:
             logger.exception(f"Unexpected error occurred")
-            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
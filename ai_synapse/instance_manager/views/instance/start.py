@@ -4,7 +4,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from instance_manager.models import Instance
+from instance_manager.models import Instance, Job
+from instance_manager.models.instance import InstanceStatus
+from instance_manager.models.job import JobKind
 from user_manager.permissions import IsAuthenticatedUser
 from instance_manager.exceptions import InstanceAlreadyRunningException
 
@@ -17,9 +19,17 @@ class StartInstanceView(APIView):
     def post(self, request, instance_id):
         try:
             account = request.user
-            instance = Instance.objects.get(id=instance_id)
-            instance.start()
-            return Response(status=status.HTTP_200_OK)
+            instances = Instance.objects.all()
+            if not account.is_superuser:
+                instances = instances.filter(account=account)
+            instance = instances.get(id=instance_id)
+            if instance.status == InstanceStatus.RUNNING:
+                raise InstanceAlreadyRunningException
+            job = Job.enqueue(JobKind.START, account, instance=instance)
+            return Response(
+                {"job_id": job.job_id, "status": job.status, "message": f"Instance start queued (job {job.job_id})."},
+                status=status.HTTP_202_ACCEPTED,
+            )
         except InstanceAlreadyRunningException:
             logger.error(f"Instance with ID {instance_id} is already running for user {account.username}")
             return Response(status=status.HTTP_409_CONFLICT)
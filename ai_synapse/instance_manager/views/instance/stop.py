@@ -4,7 +4,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from instance_manager.models import Instance
+from instance_manager.models import Instance, Job
+from instance_manager.models.job import JobKind
 from instance_manager.exceptions import InstanceAlreadyStoppedException
 from user_manager.permissions import IsAuthenticatedUser
 
@@ -17,9 +18,15 @@ class StopInstanceView(APIView):
     def post(self, request, instance_id):
         try:
             account = request.user
-            instance = Instance.objects.get(id=instance_id, account=account, status="running")
-            instance.stop()
-            return Response(status=status.HTTP_200_OK)
+            instances = Instance.objects.filter(status__in=["running", "suspended"])
+            if not account.is_superuser:
+                instances = instances.filter(account=account)
+            instance = instances.get(id=instance_id)
+            job = Job.enqueue(JobKind.STOP, account, instance=instance)
+            return Response(
+                {"job_id": job.job_id, "status": job.status, "message": f"Instance stop queued (job {job.job_id})."},
+                status=status.HTTP_202_ACCEPTED,
+            )
         except Instance.DoesNotExist:
             logger.error(f"Instance with ID {instance_id} not found for user {account.username}")
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,38 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.models import Instance, Job
+from instance_manager.models.job import JobKind
+from instance_manager.exceptions import InstanceAlreadyStoppedException
+from user_manager.permissions import IsAuthenticatedUser
+
+logger = logging.getLogger(__name__)
+
+
+class SuspendInstanceView(APIView):
+    permission_classes = [IsAuthenticatedUser]
+
+    def post(self, request, instance_id):
+        try:
+            account = request.user
+            instances = Instance.objects.filter(status="running")
+            if not account.is_superuser:
+                instances = instances.filter(account=account)
+            instance = instances.get(id=instance_id)
+            job = Job.enqueue(JobKind.SUSPEND, account, instance=instance)
+            return Response(
+                {"job_id": job.job_id, "status": job.status, "message": f"Instance suspend queued (job {job.job_id})."},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        except Instance.DoesNotExist:
+            logger.error(f"Instance with ID {instance_id} not found for user {account.username}")
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except InstanceAlreadyStoppedException:
+            logger.error(f"Instance with ID {instance_id} is already stopped for user {account.username}")
+            return Response(status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.exception(f"Unexpected error while suspending instance: {str(e)}")
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
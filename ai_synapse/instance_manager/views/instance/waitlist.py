@@ -0,0 +1,29 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.models import Job
+from user_manager.permissions import IsAuthenticatedUser
+
+logger = logging.getLogger(__name__)
+
+
+class LaunchWaitlistView(APIView):
+    """
+    Launches waiting for free GPUs with their position and estimated wait.
+    Users see their own entries, admins the whole waitlist.
+    """
+    permission_classes = [IsAuthenticatedUser]
+
+    def get(self, request):
+        try:
+            account = request.user
+            entries = Job.waitlist_report()
+            if not account.is_superuser:
+                entries = [entry for entry in entries if entry["account"] == account.username]
+            return Response({"waiting": entries}, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.exception(f"Unexpected error while fetching the launch waitlist: {str(e)}")
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
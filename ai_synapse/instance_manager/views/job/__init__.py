@@ -0,0 +1 @@
+from .status import JobStatusView
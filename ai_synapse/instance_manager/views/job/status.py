@@ -0,0 +1,29 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.models import Job
+from user_manager.permissions import IsAuthenticatedUser
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatusView(APIView):
+    permission_classes = [IsAuthenticatedUser]
+
+    def get(self, request, job_id):
+        try:
+            account = request.user
+            jobs = Job.objects.select_related("instance")
+            if not account.is_superuser:
+                jobs = jobs.filter(account=account)
+            job = jobs.get(job_id=job_id)
+            return Response(job.serialize(), status=status.HTTP_200_OK)
+        except Job.DoesNotExist:
+            logger.error(f"Job {job_id} not found for user {request.user.username}")
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            logger.exception(f"Unexpected error while fetching job status: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,2 +1,4 @@
 from .create import CreateServerView
-from .list import ListServersView
\ No newline at end of file
+from .list import ListServersView
+from .pool_stats import SSHPoolStatsView
+from .fleet_index import FleetIndexStatsView
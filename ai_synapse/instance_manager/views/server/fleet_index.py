@@ -0,0 +1,22 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.fleet import get_fleet_index
+from user_manager.permissions import IsAdminUser
+
+logger = logging.getLogger(__name__)
+
+class FleetIndexStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            index = get_fleet_index()
+            stats = dict(index.stats(), enabled=True) if index else {"enabled": False}
+            return Response(stats, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.exception(f"Unexpected error occurred: {str(e)}")
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,21 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from instance_manager.remote import get_connection_pool
+from user_manager.permissions import IsAdminUser
+
+logger = logging.getLogger(__name__)
+
+class SSHPoolStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            stats = get_connection_pool().stats()
+            return Response(stats, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.exception(f"Unexpected error occurred: {str(e)}")
+            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,392 @@
+import math
+import shlex
+import uuid
+import logging
+import threading
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+from paramiko import SSHClient
+from typing import Dict, List, Optional, Tuple
+
+from .exceptions import NoAvailableServerException
+from .image_cache import idle_servers
+from .remote import get_connection_pool
+from .remote.streaming import run_command
+
+
+logger = logging.getLogger(__name__)
+
+WARM_CONTAINER_PREFIX = "synapse-warm-"
+WARM_LABEL = "synapse.warm"
+# Warm containers mount an empty host directory here for each per-user volume;
+# the claiming user's directory is bound onto it on the host at adoption and
+# propagates into the container, which binds it to its target.
+WARM_STAGING_DIR = "/run/synapse-volumes"
+
+
+def _warm_pool_settings() -> Dict:
+    return getattr(settings, 'WARM_POOL_SETTINGS', {})
+
+
+def warm_pool_enabled() -> bool:
+    return _warm_pool_settings().get('enabled', False)
+
+
+def _user_volumes() -> List[Tuple[int, str, str, str]]:
+    """(index, host path, target, options) of the '{username}' mounts of PODMAN_SETTINGS['mount_paths']."""
+    volumes = []
+    for i, template in enumerate(getattr(settings, 'PODMAN_SETTINGS', {}).get('mount_paths', [])):
+        host_path, _, rest = template.partition(":")
+        target, _, options = rest.partition(":")
+        if "{username}" in host_path:
+            volumes.append((i, host_path, target, options))
+    return volumes
+
+
+def _host_staging_dir(container_name: str) -> str:
+    """Host directory holding the staging directories of a warm container."""
+    config_dir = getattr(settings, 'PODMAN_SETTINGS', {}).get('config_dir', '/var/lib/synapse/containers')
+    return f"{config_dir.rstrip('/')}/{container_name}/volumes"
+
+
+def staged_volume_mounts(container_name: str) -> List[str]:
+    """
+    The `--volume` args of a warm container: mounts shared by all users as
+    they are and, for each '{username}' mount, an empty host staging
+    directory. No user's data is in a warm container before it is claimed.
+    """
+    volume_args = [
+        f"--volume {template}" for template in getattr(settings, 'PODMAN_SETTINGS', {}).get('mount_paths', [])
+        if "{username}" not in template.partition(":")[0]
+    ]
+    staging = _host_staging_dir(container_name)
+    # rslave: mounts made under the staging directory on the host show up in the container.
+    volume_args += [f"--volume {staging}/{i}:{WARM_STAGING_DIR}/{i}:rslave" for i, _, _, _ in _user_volumes()]
+    return volume_args
+
+
+def staging_prepare_command(container_name: str) -> str:
+    """Host shell creating the staging directories of a warm container, or '' when it has none."""
+    dirs = [shlex.quote(f"{_host_staging_dir(container_name)}/{i}") for i, _, _, _ in _user_volumes()]
+    return f"sudo mkdir -p {' '.join(dirs)}" if dirs else ""
+
+
+def release_staging_command(container_name: str) -> str:
+    """
+    Host shell unmounting and removing the staging directories of a warm
+    container. Only `rmdir` is used, so a directory still holding a user's
+    data is never removed.
+    """
+    staging = _host_staging_dir(container_name)
+    dirs = [shlex.quote(f"{staging}/{i}") for i, _, _, _ in _user_volumes()]
+    if not dirs:
+        return ""
+    parent = shlex.quote(staging.rpartition("/")[0])
+    return f"sudo umount -l {' '.join(dirs)} 2>/dev/null; sudo rmdir {' '.join(dirs)} {shlex.quote(staging)} {parent}"
+
+
+def claim_setup_command(hostname: str) -> str:
+    """Shell run as root in a claimed warm container: binds the staged user volumes to their targets and sets the hostname."""
+    steps = []
+    for i, _, target, options in _user_volumes():
+        staging, target = f"{WARM_STAGING_DIR}/{i}", shlex.quote(target)
+        steps.append(f"mkdir -p {target} && mount --bind {staging} {target}")
+        if "ro" in options.split(","):
+            steps.append(f"mount -o remount,bind,ro {target}")
+        steps.append(f"umount -l {staging}")
+    steps.append(f"hostname {shlex.quote(hostname)}")
+    return " && ".join(steps)
+
+
+def adopt_warm_container(ssh: SSHClient, warm, container_name: str, username: str) -> None:
+    """
+    Renames a claimed warm container to the user's container name, replacing
+    a stopped container of that name, and binds `username`'s directories onto
+    its staging directories (see claim_setup_command()).
+    """
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+    run_command(ssh, f"sudo podman rm -f {container_name}", timeout=timeout)
+    result = run_command(ssh, f"sudo podman rename {warm.container_name} {container_name}", timeout=timeout)
+    if result.exit_status != 0:
+        raise Exception(f"Failed to take over warm container {warm.container_name} on {warm.server.name}: {result.stderr.strip()}")
+
+    staging = _host_staging_dir(warm.container_name)
+    binds = [
+        f"sudo mount --bind {shlex.quote(host_path.format(username=username))} {shlex.quote(f'{staging}/{i}')}"
+        for i, host_path, _, _ in _user_volumes()
+    ]
+    if not binds:
+        return
+    result = run_command(ssh, " && ".join(binds), timeout=timeout)
+    if result.exit_status != 0:
+        raise Exception(f"Failed to attach {username}'s volumes to {container_name} on {warm.server.name}: {result.stderr.strip()}")
+
+
+def discard_claimed_warm_container(ssh: SSHClient, warm, container_name: str) -> None:
+    """
+    Removes a claimed warm container whose takeover failed, under either
+    name: it may hold the user's volumes by now, so it can't go back to the
+    pool. Its pool entry comes back when the launch's transaction rolls back
+    and is deleted by drop_warm_container() after that.
+    """
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+    run_command(ssh, f"sudo podman rm -f {warm.container_name}; sudo podman rm -f {container_name}", timeout=timeout)
+
+
+def drop_warm_container(warm) -> bool:
+    """Deletes the pool entry of a removed warm container and gives its GPUs and host ports back. False if it was gone."""
+    from .models import WarmContainer
+
+    # Claiming deleted `warm`, which cleared its pk.
+    deleted, _ = WarmContainer.objects.filter(container_name=warm.container_name).delete()
+    if not deleted:
+        return False
+    warm.server.release_gpus(warm.n_gpus, warm.gpu_indices, list(warm.host_ports.values()))
+    return True
+
+
+def release_staging(ssh: SSHClient, warm) -> None:
+    """Removes the host staging directories of a claimed warm container, once its volumes are bound to their targets."""
+    command = release_staging_command(warm.container_name)
+    if command:
+        run_command(ssh, command, timeout=getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60))
+
+
+def launch_rates(window: float) -> Dict[int, float]:
+    """Instances created per second over the last `window` seconds, by image id."""
+    from .models import Instance
+
+    since = timezone.now() - timedelta(seconds=window)
+    launches = Instance.objects.filter(created_at__gte=since).values("image_id").annotate(n=Count("id"))
+    return {row["image_id"]: row["n"] / window for row in launches}
+
+
+def _template_instance(server, image, gpu_indices: Optional[List[int]] = None, host_ports: Optional[Dict[str, int]] = None):
+    """An unsaved Instance, to build and run warm containers with the same spec as real ones."""
+    from .models import Instance
+
+    gpu_indices = gpu_indices or []
+    return Instance(server=server, image=image, n_gpus=len(gpu_indices), gpu_indices=gpu_indices, host_ports=host_ports or {})
+
+
+def start_warm_container(server, image):
+    """
+    Runs a container of `image` on `server`, waits for it to boot and adds it
+    to the pool. It reserves WARM_POOL_SETTINGS['gpus'] GPUs of the server
+    and is created with only those devices.
+    """
+    from .models import Instance, WarmContainer
+
+    n_gpus = _warm_pool_settings().get('gpus', 1)
+    if not server.reserve_gpus(n_gpus):
+        raise NoAvailableServerException(f"Server {server.name} has no {n_gpus} free GPUs")
+    try:
+        gpu_indices, host_ports = Instance._claim_devices(server, n_gpus)
+    except Exception:
+        server.release_gpus(n_gpus)
+        raise
+    container_name = f"{WARM_CONTAINER_PREFIX}{uuid.uuid4().hex[:12]}"
+    template = _template_instance(server, image, gpu_indices, host_ports)
+    volume_args = staged_volume_mounts(container_name)
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout_pull', 300)
+
+    with get_connection_pool().connection(server.ip_address) as ssh:
+        try:
+            container_id = template._run_podman_container(
+                ssh, container_name, image, volume_args, container_name, server, labels={WARM_LABEL: str(image.id)},
+                prepare_command=staging_prepare_command(container_name),
+            )
+            # Reports 'degraded' with a non-zero exit in many images, only waiting for the boot matters.
+            run_command(ssh, f"sudo podman exec {container_name} systemctl is-system-running --wait", timeout=timeout)
+        except Exception:
+            run_command(ssh, f"sudo podman rm -f {container_name}; {release_staging_command(container_name)}", timeout=timeout)
+            server.release_gpus(n_gpus, gpu_indices, list(host_ports.values()))
+            raise
+    warm = WarmContainer.objects.create(
+        server=server, image=image, container_name=container_name, container_id=container_id,
+        n_gpus=n_gpus, gpu_indices=gpu_indices, host_ports=host_ports,
+    )
+    logger.info(f"Started warm container {container_name} of '{image.custom_registry_image_name}' on {server.name}")
+    return warm
+
+
+def retire_warm_container(warm, ssh: Optional[SSHClient] = None) -> bool:
+    """Takes `warm` out of the pool and removes its container. False if a launch claimed it first."""
+    from .models import WarmContainer
+
+    deleted, _ = WarmContainer.objects.filter(pk=warm.pk).delete()
+    if not deleted:
+        return False
+    command = f"sudo podman rm -f {warm.container_name}; {release_staging_command(warm.container_name)}"
+    timeout = getattr(settings, 'PODMAN_SETTINGS', {}).get('ssh_exec_timeout', 60)
+    if ssh is None:
+        with get_connection_pool().connection(warm.server.ip_address) as ssh:
+            run_command(ssh, command, timeout=timeout)
+    else:
+        run_command(ssh, command, timeout=timeout)
+    warm.server.release_gpus(warm.n_gpus, warm.gpu_indices, list(warm.host_ports.values()))
+    return True
+
+
+def reconcile_server(server) -> int:
+    """Drops pool entries of `server` whose container is no longer running. Returns how many."""
+    removed = 0
+    warm_containers = list(server.warm_containers.all())
+    if not warm_containers:
+        return 0
+    with get_connection_pool().connection(server.ip_address) as ssh:
+        for warm in warm_containers:
+            if _template_instance(server, warm.image)._check_user_container_running(ssh, warm.container_name, server.name):
+                continue
+            logger.warning(f"Warm container {warm.container_name} is gone from {server.name}, dropping it from the pool")
+            removed += retire_warm_container(warm, ssh)
+    return removed
+
+
+class WarmPool:
+    """
+    Keeps booted, unowned containers of frequently launched images on idle
+    servers, so Instance.launch() can take one over (see
+    WarmContainer.claim()) instead of running and booting a container. Each
+    image gets as many as the launches expected within `cover_seconds` at its
+    rate over the last `rate_window` seconds, capped at `max_per_image`;
+    claimed containers are replaced on the next cycle.
+    """
+
+    def __init__(
+        self,
+        interval: float = 15.0,
+        rate_window: float = 3600.0,
+        cover_seconds: float = 600.0,
+        max_per_image: int = 4,
+        max_per_server: int = 2,
+        max_starts: int = 4,
+    ):
+        self.interval = interval
+        self.rate_window = rate_window
+        self.cover_seconds = cover_seconds
+        self.max_per_image = max_per_image
+        self.max_per_server = max_per_server
+        self.max_starts = max_starts
+        self.starts = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "WarmPool":
+        pool_settings = _warm_pool_settings()
+        options = {
+            "interval": pool_settings.get('interval', 15.0),
+            "rate_window": pool_settings.get('rate_window', 3600.0),
+            "cover_seconds": pool_settings.get('cover_seconds', 600.0),
+            "max_per_image": pool_settings.get('max_per_image', 4),
+            "max_per_server": pool_settings.get('max_per_server', 2),
+            "max_starts": pool_settings.get('max_starts', 4),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    def target_sizes(self) -> Dict[int, int]:
+        """Warm containers wanted per image id."""
+        return {
+            image_id: min(self.max_per_image, math.ceil(rate * self.cover_seconds))
+            for image_id, rate in launch_rates(self.rate_window).items()
+        }
+
+    def shrink(self, targets: Dict[int, int]) -> int:
+        """Retires the oldest warm containers of images above their target. Returns how many."""
+        from .models import WarmContainer
+
+        retired = 0
+        for image_id, count in WarmContainer.counts().items():
+            surplus = count - targets.get(image_id, 0)
+            for warm in WarmContainer.objects.filter(image_id=image_id).select_related("server")[:max(surplus, 0)]:
+                try:
+                    retired += retire_warm_container(warm)
+                except Exception as e:
+                    logger.warning(f"Could not retire warm container {warm.container_name}: {e}")
+        return retired
+
+    def grow(self, targets: Dict[int, int]) -> int:
+        """
+        Starts warm containers of images below their target on idle servers.
+        Returns how many. Nothing is started while launches wait for GPUs, as
+        warm containers would take the capacity they are waiting for.
+        """
+        from .models import Image, Job, ServerImage, WarmContainer
+        from .models.job import JobKind, JobStatus
+
+        if Job.objects.filter(kind=JobKind.LAUNCH, status=JobStatus.WAITING).exists():
+            logger.info("Launches are waiting for free GPUs, not growing the warm pool")
+            return 0
+        counts = WarmContainer.counts()
+        n_gpus = _warm_pool_settings().get('gpus', 1)
+        servers = [server for server in idle_servers() if server.available_gpus >= n_gpus]
+        per_server = dict(
+            WarmContainer.objects.order_by().values("server_id").annotate(n=Count("id")).values_list("server_id", "n")
+        )
+        started = 0
+        for image in Image.objects.filter(id__in=[image_id for image_id, target in targets.items() if target > counts.get(image_id, 0)]):
+            for _ in range(targets[image.id] - counts.get(image.id, 0)):
+                candidates = [server for server in servers if per_server.get(server.id, 0) < self.max_per_server]
+                if started >= self.max_starts or not candidates:
+                    return started
+                # Servers that hold the image start it without a pull.
+                server = min(candidates, key=lambda s: (not ServerImage.is_present(s, image), per_server.get(s.id, 0)))
+                try:
+                    start_warm_container(server, image)
+                except Exception as e:
+                    logger.warning(f"Could not start a warm container of '{image.custom_registry_image_name}' on {server.name}: {e}")
+                    servers.remove(server)
+                    continue
+                per_server[server.id] = per_server.get(server.id, 0) + 1
+                started += 1
+                self.starts += 1
+        return started
+
+    def run_once(self) -> Dict[str, int]:
+        from .models import Server
+
+        reconciled = 0
+        for server in Server.objects.filter(warm_containers__isnull=False).distinct():
+            try:
+                reconciled += reconcile_server(server)
+            except Exception as e:
+                logger.warning(f"Could not check warm containers on {server.name}: {e}")
+        targets = self.target_sizes()
+        return {"reconciled": reconciled, "retired": self.shrink(targets), "started": self.grow(targets)}
+
+    def start(self) -> "WarmPool":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="warm-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait(self) -> None:
+        while not self._stop.wait(1.0):
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                result = self.run_once()
+                logger.info(
+                    f"Warm pool dropped {result['reconciled']} lost containers, retired {result['retired']} "
+                    f"and started {result['started']}"
+                )
+            except Exception as e:
+                logger.exception(f"Warm pool cycle failed: {e}")
+            finally:
+                close_old_connections()
+            self._stop.wait(self.interval)
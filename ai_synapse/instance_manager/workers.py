@@ -0,0 +1,126 @@
+import os
+import socket
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from typing import Dict, List, Optional
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """
+    Runs queued Jobs on a pool of worker threads in this process. Each
+    thread claims one job at a time from Postgres, so scaling out is a
+    matter of starting more `run_job_workers` processes on any host.
+    A maintenance thread heartbeats running jobs, requeues jobs whose
+    worker process died and dispatches launches waiting for capacity.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 15.0,
+        stale_after: float = 120.0,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self._running: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "JobWorkerPool":
+        job_settings = dict(getattr(settings, 'JOB_QUEUE_SETTINGS', {}))
+        job_settings.pop('max_attempts', None)
+        job_settings.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**job_settings)
+
+    def run_once(self, worker_id: Optional[str] = None) -> bool:
+        """Claims and runs a single job. Returns False when the queue is empty."""
+        worker_id = worker_id or f"{self.worker_prefix}/0"
+        close_old_connections()
+        try:
+            job = Job.claim(worker_id)
+            if job is None:
+                return False
+            with self._lock:
+                self._running[worker_id] = job.job_id
+            try:
+                job.run()
+            finally:
+                with self._lock:
+                    self._running.pop(worker_id, None)
+                    self.processed += 1
+            return True
+        finally:
+            close_old_connections()
+
+    def drain(self) -> int:
+        """Runs queued jobs on the calling thread until the queue is empty."""
+        processed = 0
+        while self.run_once():
+            processed += 1
+        return processed
+
+    def start(self) -> "JobWorkerPool":
+        self._stop.clear()
+        for n in range(self.workers):
+            self._spawn(self._worker_loop, f"{self.worker_prefix}/{n}")
+        self._spawn(self._maintenance_loop)
+        logger.info(f"Started {self.workers} job workers as {self.worker_prefix}")
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stops claiming new jobs and waits for the running ones to finish."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wait(self) -> None:
+        while not self._stop.wait(1.0):
+            pass
+
+    def _spawn(self, target, *args) -> None:
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _worker_loop(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self.run_once(worker_id):
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.exception(f"Job worker {worker_id} failed to claim a job: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _maintenance_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            close_old_connections()
+            try:
+                with self._lock:
+                    running = dict(self._running)
+                for worker_id, job_id in running.items():
+                    Job.heartbeat([job_id], worker_id)
+                requeued = Job.requeue_stale(self.stale_after)
+                if requeued:
+                    logger.warning(f"Requeued {requeued} jobs from unresponsive workers")
+                # Capacity freed in ways that don't go through a Server save is picked up here.
+                Job.dispatch_waiting()
+            except Exception as e:
+                logger.exception(f"Job maintenance failed: {e}")
+            finally:
+                close_old_connections()
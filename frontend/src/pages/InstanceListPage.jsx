@@ -124,11 +124,52 @@ function InstanceListPage() {
     }
   }, []); // useCallback dependency array is empty
 
-  // Initial fetch and polling effect
+  // Live updates: the events stream sends a snapshot on connect, then one event per status change.
+  // Polls until the first snapshot arrives, and again whenever the stream is unavailable
+  // (the backend answers 204 when it isn't served over ASGI).
   useEffect(() => {
-    fetchInstances(true); // Initial load
-    const intervalId = setInterval(() => fetchInstances(false), 10000); // Poll every 10 seconds
-    return () => clearInterval(intervalId); // Cleanup on unmount
+    let pollId = null;
+    const startPolling = () => {
+      if (pollId) return;
+      fetchInstances(false);
+      pollId = setInterval(() => fetchInstances(false), 10000); // Poll every 10 seconds
+    };
+    const stopPolling = () => {
+      if (pollId) { clearInterval(pollId); pollId = null; }
+    };
+
+    startPolling();
+    if (typeof window.EventSource === 'undefined') {
+      return stopPolling;
+    }
+
+    const source = new EventSource('/api/instance/events/');
+    source.addEventListener('snapshot', (e) => {
+      try {
+        const data = JSON.parse(e.data);
+        setInstances(Array.isArray(data) ? data : []);
+        setError(null);
+        stopPolling();
+      } catch (err) { console.warn("Could not parse instance snapshot:", err); }
+      setIsLoading(false);
+    });
+    source.addEventListener('status', (e) => {
+      let event = null;
+      try { event = JSON.parse(e.data); } catch (err) { console.warn("Could not parse instance event:", err); return; }
+      setInstances(prevInstances => {
+        const exists = prevInstances.some(inst => inst.instance_id === event.instance_id);
+        if (!exists) return [event, ...prevInstances];
+        return prevInstances.map(inst => inst.instance_id === event.instance_id ? { ...inst, ...event } : inst);
+      });
+    });
+    source.onerror = () => {
+      // EventSource reconnects on its own, poll meanwhile so the list doesn't go stale.
+      console.warn("Instance events stream interrupted, polling until it reconnects.");
+      setIsLoading(false);
+      startPolling();
+    };
+
+    return () => { source.close(); stopPolling(); }; // Cleanup on unmount
   }, [fetchInstances]);
 
   // --- Action Handler - Implemented ---
@@ -176,8 +217,7 @@ function InstanceListPage() {
                console.log(`${action} successful for ${instanceId}:`, data || response.statusText);
                resultMessage = data?.message || data?.detail || resultMessage;
                setSuccessMessage(resultMessage); // Show success feedback
-               // Refresh the list after a short delay to get confirmed status from backend
-               setTimeout(() => fetchInstances(false), 3000);
+               // The confirmed status arrives on the instance events stream
           } else { // Handle 4xx, 5xx errors
                errorDetail = data?.detail || data?.error || `Action failed: ${response.statusText}`;
                console.error(`Failed to ${action} instance ${instanceId}:`, errorDetail);
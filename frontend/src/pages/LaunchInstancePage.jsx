@@ -110,7 +110,12 @@ function LaunchInstancePage() {
       if (response.ok || response.status === 201 || response.status === 202) { // Check for Created or Accepted
         console.log('Instance launch request successful:', data);
         // Redirect to instance list page with a success message
-        navigate('/', { state: { message: `Instance launch initiated successfully (ID: ${data?.instance_id || 'N/A'}). Check dashboard for status.` } });
+        if (data?.status === 'waiting') {
+          const eta = data.estimated_wait_seconds != null ? `, estimated wait ~${Math.ceil(data.estimated_wait_seconds / 60)} min` : '';
+          navigate('/', { state: { message: `No free GPUs right now. Your launch is queued at position ${data.position ?? '?'}${eta} and will start automatically.` } });
+        } else {
+          navigate('/', { state: { message: `Instance launch initiated successfully (Job: ${data?.job_id || 'N/A'}). Check dashboard for status.` } });
+        }
       } else {
         // Handle validation errors or other failures
         console.error('Instance launch failed:', data || response.statusText);